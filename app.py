@@ -7,7 +7,6 @@ import streamlit as st
 st.set_page_config(page_title="이삿날 포장이사 견적서", layout="wide", page_icon="🚚")
 
 # 3. Import standard libraries
-import pandas as pd
 from datetime import datetime, date
 import pytz
 import math
@@ -19,10 +18,9 @@ try:
     import data
     import utils
     import calculations
-    import google_drive_helper as gdrive # google_drive_helper 사용 (gdrive_utils 대신)
-    import pdf_generator
-    import excel_filler
-    # excel_summary_generator는 pdf_generator 또는 ui_tab3에서 직접 호출될 수 있으므로 여기서는 제외 가능
+    # google_drive_helper, pdf_generator, excel_filler, mms_utils, email_utils (와 pandas, reportlab, openpyxl,
+    # googleapiclient, requests)는 불러오는 데 오래 걸리므로 여기서 불러오지 않고 각 탭에서 기능을 처음 쓸 때 불러옵니다.
+    # 첫 화면 모듈 로딩 시간 확인: python benchmarks/import_budget.py
 except ImportError as ie:
     st.error(f"메인 앱: 필수 유틸리티 모듈 로딩 실패 - {ie}.")
     st.stop()
@@ -35,12 +33,12 @@ except Exception as e:
 # 5. Import the NEWLY CREATED modules
 try:
     import state_manager
+    import perf_monitor # 실행 시간 측정 (?perf=1 로 켠 세션만)
+    import session_recorder # 세션 이벤트 기록 (?record=1 로 켠 세션만)
     import callbacks # callbacks must be imported before being passed
     import ui_tab1
     import ui_tab2
     import ui_tab3
-    import mms_utils # ui_tab3에서 사용
-    import email_utils # ui_tab3에서 사용
 except ImportError as ie:
     st.error(f"메인 앱: 필수 UI/상태 모듈 로딩 실패 - {ie}.")
     # 실패한 모듈 이름 출력 (디버깅에 도움)
@@ -55,54 +53,85 @@ except Exception as e:
 
 # --- Main Application ---
 
-st.markdown("<h1 style='text-align: center; color: #1E90FF;'>🚚 이삿날 스마트 견적 🚚</h1>", unsafe_allow_html=True)
-st.write("")
-
-# Initialize session state.
-# Pass the callback function for initial basket quantity setup.
-# Ensure this runs only once per session to avoid re-initializing over reruns.
-if not st.session_state.get("_app_initialized", False):
-    # # # print("DEBUG APP: Initializing session state for the first time.")
-    # state_manager.initialize_session_state 호출 시 update_basket_quantities 콜백 전달
-    if hasattr(callbacks, 'update_basket_quantities') and callable(callbacks.update_basket_quantities):
-        state_manager.initialize_session_state(update_basket_callback=callbacks.update_basket_quantities)
-    else:
-        st.error("초기화 오류: callbacks.update_basket_quantities 함수를 찾을 수 없습니다.")
-        state_manager.initialize_session_state() # 콜백 없이 초기화
-    st.session_state._app_initialized = True
-# # else:
-    # # # print("DEBUG APP: Session state already initialized or app rerun.")
-
-
-# All calculations and state updates (total volume, weight, recommended vehicle,
-# final selected vehicle, basket quantities) are now handled by callbacks
-# triggered by widget interactions (on_change events in ui_tab1, ui_tab2, ui_tab3).
-# The app will simply re-render with the latest state after a callback execution.
-
-# --- Define and Render Tabs ---
-# Tabs will render using the most current session state, which is updated by callbacks.
-tab1_title = "👤 고객 정보"
-tab2_title = "📋 물품 선택"
-tab3_title = "💰 견적 및 비용"
-
-tab1, tab2, tab3 = st.tabs([tab1_title, tab2_title, tab3_title])
-
-with tab1:
-    if hasattr(ui_tab1, 'render_tab1') and callable(ui_tab1.render_tab1):
-        ui_tab1.render_tab1()
-    else:
-        st.error("Tab 1 UI를 로드할 수 없습니다.")
-
-with tab2:
-    if hasattr(ui_tab2, 'render_tab2') and callable(ui_tab2.render_tab2):
-        ui_tab2.render_tab2()
-    else:
-        st.error("Tab 2 UI를 로드할 수 없습니다.")
-
-with tab3:
-    if hasattr(ui_tab3, 'render_tab3') and callable(ui_tab3.render_tab3):
-        ui_tab3.render_tab3()
-    else:
-        st.error("Tab 3 UI를 로드할 수 없습니다.")
-
-# Optional: Footer or other elements outside tabs can go here
\ No newline at end of file
+def main():
+    """앱 본문 (한 번의 전체 실행). 프로파일 요청이 있으면 perf_monitor.run_maybe_profiled가 cProfile로 감싸 실행합니다."""
+    perf_monitor.begin_run(st.session_state)
+
+    st.markdown("<h1 style='text-align: center; color: #1E90FF;'>🚚 이삿날 스마트 견적 🚚</h1>", unsafe_allow_html=True)
+    st.write("")
+
+    # Initialize session state.
+    # Pass the callback function for initial basket quantity setup.
+    # Ensure this runs only once per session to avoid re-initializing over reruns.
+    if not st.session_state.get("_app_initialized", False):
+        # # # print("DEBUG APP: Initializing session state for the first time.")
+        # state_manager.initialize_session_state 호출 시 update_basket_quantities 콜백 전달
+        if hasattr(callbacks, 'update_basket_quantities') and callable(callbacks.update_basket_quantities):
+            state_manager.initialize_session_state(update_basket_callback=callbacks.update_basket_quantities)
+        else:
+            st.error("초기화 오류: callbacks.update_basket_quantities 함수를 찾을 수 없습니다.")
+            state_manager.initialize_session_state() # 콜백 없이 초기화
+        st.session_state._app_initialized = True
+    perf_monitor.checkpoint("app.init")
+    # # else:
+        # # # print("DEBUG APP: Session state already initialized or app rerun.")
+
+
+    # All calculations and state updates (total volume, weight, recommended vehicle,
+    # final selected vehicle, basket quantities) are now handled by callbacks
+    # triggered by widget interactions (on_change events in ui_tab1, ui_tab2, ui_tab3).
+    # 품목 수량/이사 유형 콜백은 변경 표시만 하고, 파생값은 탭을 그리기 전에 여기서 한 번만 계산합니다.
+    if hasattr(callbacks, 'ensure_derived_state') and callable(callbacks.ensure_derived_state):
+        callbacks.ensure_derived_state()
+    perf_monitor.checkpoint("app.derived_state")
+    # 탭 2 품목 입력과 탭 3 비용 패널은 fragment라서 그 안의 위젯이 바뀌면 그 부분만 다시 실행됩니다.
+    # 아래 호출로 fragment가 전체 실행 중인지 부분 재실행 중인지 구분합니다.
+    if hasattr(callbacks, 'begin_app_run') and callable(callbacks.begin_app_run):
+        callbacks.begin_app_run()
+
+    # --- Define and Render Tabs ---
+    # Tabs will render using the most current session state, which is updated by callbacks.
+    tab1_title = "👤 고객 정보"
+    tab2_title = "📋 물품 선택"
+    tab3_title = "💰 견적 및 비용"
+
+    tab1, tab2, tab3 = st.tabs([tab1_title, tab2_title, tab3_title])
+
+    with tab1, perf_monitor.section("tab1"):
+        if hasattr(ui_tab1, 'render_tab1') and callable(ui_tab1.render_tab1):
+            ui_tab1.render_tab1()
+        else:
+            st.error("Tab 1 UI를 로드할 수 없습니다.")
+
+    with tab2, perf_monitor.section("tab2"):
+        if hasattr(ui_tab2, 'render_tab2') and callable(ui_tab2.render_tab2):
+            ui_tab2.render_tab2()
+        else:
+            st.error("Tab 2 UI를 로드할 수 없습니다.")
+
+    with tab3, perf_monitor.section("tab3"):
+        if hasattr(ui_tab3, 'render_tab3') and callable(ui_tab3.render_tab3):
+            ui_tab3.render_tab3()
+        else:
+            st.error("Tab 3 UI를 로드할 수 없습니다.")
+
+    # Optional: Footer or other elements outside tabs can go here
+
+    # 현재 견적을 로컬 저널에 기록하고, 자동 저장이 켜져 있으면 Drive 저장을 예약
+    # (직전과 내용이 같으면 아무것도 하지 않음. 실제 업로드는 백그라운드에서, 파일마다 일정 간격 이상으로)
+    if hasattr(callbacks, 'persist_session_state') and callable(callbacks.persist_session_state):
+        callbacks.persist_session_state()
+    perf_monitor.checkpoint("app.persist")
+
+    perf_monitor.end_run(st.session_state)
+
+# 실행 시간 측정: 주소 뒤에 ?perf=1 을 붙이면 이 세션의 탭/구역/콜백별 소요 시간을 사이드바에 표시하고 로그에 남깁니다.
+# ?profile=N 은 이 세션의 다음 N회 실행을 cProfile로 수집합니다 (.prof 파일 + 사이드바 요약).
+# ?record=1 은 이 세션의 입력/버튼/콜백을 실행마다 기록합니다 (benchmarks/replay_session.py로 재현).
+perf_monitor.enable_from_query_params(st.session_state, st.query_params)
+session_recorder.enable_from_query_params(st.session_state, st.query_params)
+with session_recorder.recording(st.session_state):
+    perf_monitor.run_maybe_profiled(main, st.session_state)
+perf_monitor.render_debug_panel(st.session_state)
+perf_monitor.render_profile_panel(st.session_state)
+session_recorder.render_status(st.session_state)
@@ -0,0 +1,138 @@
+# autosave.py (Google Drive 자동 저장 — 백그라운드 작업 스레드)
+# 화면 실행이 끝날 때마다 현재 견적을 대기열에 넣고(같은 견적 파일은 마지막 내용으로 합침),
+# 백그라운드 스레드가 견적 파일마다 최대 AUTOSAVE_INTERVAL_SECONDS에 한 번 Drive에 저장합니다.
+# 직전에 저장한 내용과 해시가 같으면 업로드하지 않습니다. 화면은 Drive 응답을 기다리지 않습니다.
+# 작업 스레드는 Streamlit(st.secrets, st.cache_resource, st.error 등)을 쓰지 않습니다. 서비스 계정 정보는 예약할 때
+# 함께 받아 스레드가 자기 Drive 클라이언트를 만들고, 실패는 get_status()의 상태(error)로만 남깁니다 (ui_tab1에 표시).
+import hashlib
+import json
+import threading
+import time
+
+import state_manager
+import utils
+
+AUTOSAVE_INTERVAL_SECONDS = 15.0 # 같은 견적 파일을 다시 저장하기까지 최소 간격
+AUTOSAVE_DEBOUNCE_SECONDS = 2.0  # 첫 변경 후 이만큼 더 기다렸다가 저장 (연속 입력을 한 번에)
+AUTOSAVE_ENABLED_KEY = "autosave_enabled"
+_LAST_QUEUED_HASH_KEY = "_autosave_last_queued" # 세션에서 마지막으로 대기열에 넣은 (파일명, 해시)
+
+_condition = threading.Condition()
+_pending = {}       # {파일명: {"payload", "hash", "folder_id", "encoding", "due"}}
+_saved_hashes = {}  # {파일명: Drive에 마지막으로 저장한 내용의 해시}
+_last_flush = {}    # {파일명: 마지막 저장 시도 시각 (time.monotonic)}
+_status = {}        # {파일명: {"state", "updated_at", "error"}} — state: pending/saving/saved/unchanged/error
+_worker = None
+_worker_services = {} # {서비스 계정 정보 키: Drive 클라이언트} — 작업 스레드에서만 사용
+
+def payload_hash(payload):
+    text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def _set_status(file_name, state, error=None):
+    _status[file_name] = {"state": state, "updated_at": time.time(), "error": error}
+
+def get_status(file_name):
+    """{"state", "updated_at"(epoch 초), "error"} 또는 None (아직 자동 저장한 적 없음)."""
+    with _condition:
+        status = _status.get(file_name)
+        return dict(status) if status else None
+
+def mark_saved(file_name, payload):
+    """수동 저장 등 다른 경로로 저장한 내용을 알려 같은 내용을 다시 업로드하지 않게 합니다."""
+    with _condition:
+        _saved_hashes[file_name] = payload_hash(payload)
+        _pending.pop(file_name, None)
+        _set_status(file_name, "saved")
+
+def schedule_save(file_name, payload, folder_id=None, encoding="json", digest=None, service_account_info=None):
+    """
+    저장을 예약합니다. 같은 파일이 이미 대기 중이면 내용만 최신으로 바꿉니다.
+    service_account_info: Drive 서비스 계정 정보 딕셔너리 (secrets의 gcp_service_account). 없으면 저장 시 오류 상태가 됩니다.
+    """
+    digest = digest or payload_hash(payload)
+    now = time.monotonic()
+    with _condition:
+        if digest == _saved_hashes.get(file_name) and file_name not in _pending: return False
+        entry = _pending.get(file_name)
+        due = entry["due"] if entry else max(now + AUTOSAVE_DEBOUNCE_SECONDS,
+                                              _last_flush.get(file_name, 0.0) + AUTOSAVE_INTERVAL_SECONDS)
+        _pending[file_name] = {"payload": payload, "hash": digest, "folder_id": folder_id, "encoding": encoding, "due": due,
+                               "service_account_info": service_account_info}
+        _set_status(file_name, "pending")
+        _ensure_worker()
+        _condition.notify()
+    return True
+
+def _ensure_worker():
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        _worker = threading.Thread(target=_worker_loop, name="quote-autosave", daemon=True)
+        _worker.start()
+
+def _take_due_entries():
+    """대기열에서 저장할 때가 된 항목을 꺼냅니다. 없으면 다음 예정 시각까지 기다립니다. (_condition 안에서 호출)"""
+    while True:
+        now = time.monotonic()
+        due_items = [(name, entry) for name, entry in _pending.items() if entry["due"] <= now]
+        if due_items:
+            for name, _entry in due_items:
+                del _pending[name]
+                _last_flush[name] = now
+            return due_items
+        next_due = min((entry["due"] for entry in _pending.values()), default=None)
+        _condition.wait(timeout=None if next_due is None else max(0.05, next_due - now))
+
+def _drive_service(gdrive, service_account_info):
+    """작업 스레드 전용 Drive 클라이언트 (서비스 계정 정보별로 한 번 만듦)."""
+    if not service_account_info: raise ValueError("Drive 서비스 계정 정보(gcp_service_account)가 없습니다.")
+    key = tuple(sorted((name, str(value)) for name, value in service_account_info.items()))
+    if key not in _worker_services:
+        _worker_services[key] = gdrive.build_drive_service(service_account_info)
+    return _worker_services[key]
+
+def _worker_loop():
+    import google_drive_helper as gdrive # Drive 클라이언트는 실제로 저장할 때만 불러옴 (Streamlit 없이 쓰는 함수만 사용)
+    while True:
+        with _condition:
+            due_items = _take_due_entries()
+        for file_name, entry in due_items:
+            with _condition:
+                if entry["hash"] == _saved_hashes.get(file_name):
+                    _set_status(file_name, "unchanged")
+                    continue
+                _set_status(file_name, "saving")
+            try:
+                service = _drive_service(gdrive, entry["service_account_info"])
+                result = gdrive.upload_json_file(service, file_name, entry["payload"], folder_id=entry["folder_id"],
+                                                 encoding=entry["encoding"])
+                error = None if result and result.get("id") else "Drive 저장 결과 없음"
+            except Exception as e:
+                error = str(e)
+            with _condition:
+                if error is None: _saved_hashes[file_name] = entry["hash"]
+                _set_status(file_name, "error" if error else "saved", error)
+            if error: print(f"ERROR [autosave]: '{file_name}' 자동 저장 실패 - {error}")
+
+def quote_file_name_for_session(session_state, encoding="json"):
+    """세션의 고객 전화번호로 만든 견적 파일명. 유효한 번호가 아니면 None. (수동 저장과 같은 규칙)"""
+    phone = utils.quote_phone_number(session_state.get("customer_phone", ""))
+    if not phone: return None
+    return utils.quote_file_name(phone, encoding)
+
+def schedule_session_save(session_state, folder_id=None, encoding="json", service_account_info=None):
+    """
+    자동 저장이 켜진 세션의 현재 견적을 예약합니다 (app.py에서 매 실행 끝에 호출).
+    service_account_info는 schedule_save와 같습니다 (화면 스레드에서 st.secrets로 읽어 넘겨 주세요).
+    직전에 예약한 내용과 같으면 아무것도 하지 않습니다. 예약했으면 True.
+    """
+    if not session_state.get(AUTOSAVE_ENABLED_KEY): return False
+    encoding = utils.resolve_save_encoding(encoding)
+    file_name = quote_file_name_for_session(session_state, encoding)
+    if file_name is None: return False
+    payload = state_manager.serialize_state_for_save(session_state)
+    payload["customer_phone"] = utils.sanitize_phone_number(payload.get("customer_phone", "")) # 수동 저장처럼 숫자만
+    digest = payload_hash(payload)
+    if session_state.get(_LAST_QUEUED_HASH_KEY) == (file_name, digest): return False
+    session_state[_LAST_QUEUED_HASH_KEY] = (file_name, digest)
+    return schedule_save(file_name, payload, folder_id, encoding, digest, service_account_info)
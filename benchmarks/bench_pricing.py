@@ -0,0 +1,157 @@
+# benchmarks/bench_pricing.py (calculations 모듈 가격 계산 마이크로벤치마크)
+# 사용법:
+#   python benchmarks/bench_pricing.py                    # 측정 후 기준 파일과 비교
+#   python benchmarks/bench_pricing.py --save-baseline    # 현재 결과를 기준 파일로 저장
+#   python benchmarks/bench_pricing.py --count 20000 --seed 1
+# 함수별 호출 지연 시간(백분위수)과 호출당 메모리 할당량(tracemalloc)을 측정합니다.
+# 기준 파일보다 p50이 --threshold 이상 느려진 항목이 있으면 종료 코드 1을 반환합니다.
+# (기준 파일은 측정한 컴퓨터에서만 의미가 있습니다)
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calculations
+from quote_generator import generate_quote_states
+
+# 기준 파일은 컴퓨터마다 다르므로 저장소에 올리지 않는 metrics/ 폴더에 둡니다 (.gitignore)
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "metrics", "pricing_baseline.json")
+PERCENTILES = (50, 90, 99)
+ALLOCATION_SAMPLE_SIZE = 1000 # tracemalloc은 느리므로 일부 호출만 측정
+
+def build_benchmarks(states):
+    """[(이름, 함수, 인자 튜플 목록, 측정 전 준비 함수)] — 인자는 미리 만들어 두어 측정에서 제외합니다."""
+    volume_weight_args = [(state, state["base_move_type"]) for state in states]
+    totals = [calculations.calculate_total_volume_weight(*args) for args in volume_weight_args]
+    recommend_args = [(vol, wt, state["base_move_type"]) for (vol, wt), state in zip(totals, states)]
+    ladder_args = [(calculations.get_floor_num(state.get(floor_key)), state.get("final_selected_vehicle"))
+                   for state in states for floor_key in ("from_floor", "to_floor")]
+    cost_args = [(state,) for state in states]
+    # 캐시 적중 측정: 캐시 크기 안의 견적만 반복해서 계산 (미리 한 번씩 계산해 캐시를 채움)
+    cached_args = cost_args[:calculations.QUOTE_COST_CACHE_SIZE]
+    hit_args = (cached_args * (len(cost_args) // max(1, len(cached_args)) + 1))[:len(cost_args)]
+    def warm_cost_cache():
+        calculations.clear_quote_cost_cache()
+        for args in cached_args: calculations.calculate_total_moving_cost(*args)
+    return [
+        ("calculate_total_volume_weight", calculations.calculate_total_volume_weight, volume_weight_args, None),
+        ("recommend_vehicle", calculations.recommend_vehicle, recommend_args, None),
+        ("get_ladder_cost", calculations.get_ladder_cost, ladder_args, None),
+        ("calculate_total_moving_cost (cache miss)", calculations.calculate_total_moving_cost, cost_args,
+         calculations.clear_quote_cost_cache),
+        ("calculate_total_moving_cost (cache hit)", calculations.calculate_total_moving_cost, hit_args, warm_cost_cache),
+    ]
+
+def _percentile(sorted_values, pct):
+    if not sorted_values: return 0.0
+    idx = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+def measure_latency(func, args_list, prepare=None):
+    if prepare: prepare()
+    perf_counter_ns = time.perf_counter_ns
+    elapsed = []
+    for args in args_list:
+        started = perf_counter_ns()
+        func(*args)
+        elapsed.append(perf_counter_ns() - started)
+    elapsed_us = sorted(ns / 1000 for ns in elapsed)
+    result = {"calls": len(elapsed_us), "mean_us": sum(elapsed_us) / len(elapsed_us) if elapsed_us else 0.0,
+              "max_us": elapsed_us[-1] if elapsed_us else 0.0}
+    for pct in PERCENTILES: result[f"p{pct}_us"] = _percentile(elapsed_us, pct)
+    result["ops_per_sec"] = 1e6 / result["mean_us"] if result["mean_us"] else 0.0
+    return result
+
+def measure_allocations(func, args_list, prepare=None):
+    """호출당 최대 추가 메모리(peak)와 호출 후 남은 메모리(net)의 평균 (bytes)."""
+    if prepare: prepare()
+    sample = args_list[:ALLOCATION_SAMPLE_SIZE]
+    peak_total = net_total = 0
+    tracemalloc.start()
+    try:
+        for args in sample:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            func(*args)
+            current, peak = tracemalloc.get_traced_memory()
+            peak_total += peak - before
+            net_total += current - before
+    finally:
+        tracemalloc.stop()
+    count = max(1, len(sample))
+    return {"alloc_peak_bytes": peak_total / count, "alloc_net_bytes": net_total / count}
+
+def run_benchmarks(count, seed):
+    states = generate_quote_states(count, seed)
+    results = {}
+    for name, func, args_list, prepare in build_benchmarks(states):
+        func(*args_list[0]) # 조회 테이블 생성 등 1회성 비용 제외
+        results[name] = measure_latency(func, args_list, prepare)
+        results[name].update(measure_allocations(func, args_list, prepare))
+    return results
+
+def print_results(results, baseline_results=None):
+    header = f"{'function':<42} {'calls':>7} {'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>9} {'peak B':>8} {'net B':>7}"
+    if baseline_results: header += f" {'p50 vs base':>12}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        line = (f"{name:<42} {r['calls']:>7} {r['mean_us']:>7.1f}µ {r['p50_us']:>7.1f}µ {r['p90_us']:>7.1f}µ "
+                f"{r['p99_us']:>7.1f}µ {r['max_us']:>8.1f}µ {r['alloc_peak_bytes']:>8.0f} {r['alloc_net_bytes']:>7.0f}")
+        base = (baseline_results or {}).get(name)
+        if base and base.get("p50_us"):
+            line += f" {(r['p50_us'] / base['p50_us'] - 1) * 100:>+11.1f}%"
+        print(line)
+
+def find_regressions(results, baseline_results, threshold):
+    regressions = []
+    for name, r in results.items():
+        base = baseline_results.get(name)
+        if base and base.get("p50_us") and r["p50_us"] > base["p50_us"] * (1 + threshold):
+            regressions.append(f"{name}: p50 {base['p50_us']:.1f}µs → {r['p50_us']:.1f}µs")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="calculations 모듈 가격 계산 벤치마크")
+    parser.add_argument("--count", type=int, default=5000, help="가상 견적 수 (기본 5000)")
+    parser.add_argument("--seed", type=int, default=0, help="가상 견적 생성 seed")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="기준 결과 JSON 경로")
+    parser.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준 파일로 저장")
+    parser.add_argument("--threshold", type=float, default=0.2, help="회귀로 판단할 p50 증가 비율 (기본 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.count, args.seed)
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f: baseline = json.load(f)
+    print(f"견적 {args.count}건, seed {args.seed}, Python {platform.python_version()}")
+    print_results(results, baseline and baseline.get("results"))
+
+    if args.save_baseline:
+        payload = {"created_at": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                   "platform": platform.platform(), "count": args.count, "seed": args.seed, "results": results}
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f: json.dump(payload, f, ensure_ascii=False, indent=2)
+        print(f"기준 결과 저장: {args.baseline}")
+        return 0
+    if baseline is None:
+        print("기준 결과 파일이 없습니다. --save-baseline 으로 먼저 저장하세요.")
+        return 0
+    if (baseline.get("count"), baseline.get("seed")) != (args.count, args.seed):
+        print(f"참고: 기준 결과는 견적 {baseline.get('count')}건, seed {baseline.get('seed')} 기준입니다.")
+    regressions = find_regressions(results, baseline.get("results", {}), args.threshold)
+    if regressions:
+        print("성능 회귀:")
+        for line in regressions: print(f"  - {line}")
+        return 1
+    print("기준 대비 성능 회귀 없음.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
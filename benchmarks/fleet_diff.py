@@ -0,0 +1,98 @@
+# benchmarks/fleet_diff.py (복수 차량 조합 최적화 검증 — 전수 탐색과 비교)
+# 사용법:
+#   python benchmarks/fleet_diff.py                  # 기본 물량 목록으로 비교
+#   python benchmarks/fleet_diff.py --count 300 --seed 1
+# 배차 차량(data.DISPATCH_VEHICLE_KEYS)만으로 optimize_fleet를 실행하고, 같은 이산화 용량으로 모든 대수 조합을
+# 전수 탐색한 최저가와 비교합니다. DP 표 상한(FLEET_MAX_VOLUME_UNITS) 안의 물량에서 더 비싼 조합을 고르면 종료 코드 1.
+# 상한을 넘는 물량은 일부를 한 차종으로 먼저 채우므로 최저가와의 차이를 참고로만 출력합니다.
+import argparse
+import itertools
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calculations
+import data
+
+# 한 대로는 실을 수 없는 물량 (m³, kg) — 리뷰에서 더 비싼 조합이 나왔던 물량 포함
+FIXED_LOADS = [(100.3, 6900), (106.4, 7300), (110.8, 7652), (150.0, 9000), (212.5, 30000), (299.5, 20000)]
+RANDOM_VOLUME_RANGE = (90.0, 300.0) # DP 표 상한(300m³) 안
+OVER_CAP_VOLUME_RANGE = (300.0, 420.0)
+DENSITY_RANGE = (40, 160) # kg/m³
+
+def dispatch_trucks(move_type):
+    """[(차량, 가격, 부피 단위, 무게 단위)] — optimize_fleet와 같은 이산화 (차량 용량은 내림)."""
+    table = calculations.get_vehicle_capacity_table(move_type) or {"trucks": [], "usable_capacities": [], "weight_capacities": []}
+    prices = data.vehicle_prices.get(move_type, {})
+    trucks = []
+    for truck, usable_capacity, weight_capacity in zip(table["trucks"], table["usable_capacities"], table["weight_capacities"]):
+        price = prices.get(truck, {}).get('price', 0)
+        if truck not in data.DISPATCH_VEHICLE_KEYS or price <= 0: continue
+        trucks.append((truck, price, int(math.floor(usable_capacity / calculations.FLEET_VOLUME_STEP + 1e-9)),
+                       int(math.floor(weight_capacity / calculations.FLEET_WEIGHT_STEP + 1e-9))))
+    return trucks
+
+def brute_force_price(trucks, v_needed, w_needed):
+    """모든 대수 조합 중 최저가 (마지막 차량 대수는 나머지 물량에서 바로 계산)."""
+    *others, (_, last_price, last_v, last_w) = sorted(trucks, key=lambda t: t[2]) # 가장 작은 차량을 마지막에
+    bounds = [range(max(-(-v_needed // v_units), -(-w_needed // w_units)) + 1) for _, _, v_units, w_units in others]
+    best = None
+    for counts in itertools.product(*bounds):
+        price = sum(count * t[1] for count, t in zip(counts, others))
+        if best is not None and price >= best: continue
+        v_left = v_needed - sum(count * t[2] for count, t in zip(counts, others))
+        w_left = w_needed - sum(count * t[3] for count, t in zip(counts, others))
+        last_count = max(-(-v_left // last_v) if v_left > 0 else 0, -(-w_left // last_w) if w_left > 0 else 0)
+        price += last_count * last_price
+        if best is None or price < best: best = price
+    return best
+
+def generate_loads(count, seed):
+    rng = random.Random(seed)
+    loads = [(volume, weight, False) for volume, weight in FIXED_LOADS]
+    for volume_range, over_cap in ((RANDOM_VOLUME_RANGE, False), (OVER_CAP_VOLUME_RANGE, True)):
+        for _ in range(count):
+            volume = round(rng.uniform(*volume_range), 1)
+            loads.append((volume, round(volume * rng.uniform(*DENSITY_RANGE)), over_cap))
+    return loads
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="optimize_fleet 결과를 전수 탐색 최저가와 비교합니다.")
+    parser.add_argument("--count", type=int, default=50, help="구간별 무작위 물량 수 (기본 50)")
+    parser.add_argument("--seed", type=int, default=0, help="무작위 물량 seed")
+    args = parser.parse_args(argv)
+
+    loads = generate_loads(args.count, args.seed)
+    vehicles = tuple(data.DISPATCH_VEHICLE_KEYS)
+    mismatches, over_cap_gaps, checked = [], [], 0
+    started = time.perf_counter()
+    for move_type in data.vehicle_prices:
+        trucks = dispatch_trucks(move_type)
+        if not trucks: continue
+        for volume, weight, over_cap in loads:
+            fleet = calculations.optimize_fleet(volume, weight, move_type, vehicles=vehicles)
+            v_needed = int(math.ceil(volume / calculations.FLEET_VOLUME_STEP - 1e-9))
+            w_needed = int(math.ceil(weight / calculations.FLEET_WEIGHT_STEP - 1e-9))
+            expected = brute_force_price(trucks, v_needed, w_needed)
+            actual = fleet["total_price"] if fleet else None
+            checked += 1
+            if actual == expected: continue
+            line = f"  {move_type} {volume}m³ {weight}kg: 최저가 {expected:,}원, optimize_fleet {actual if actual is None else f'{actual:,}'}원 {fleet and fleet['trucks']}"
+            (over_cap_gaps if over_cap else mismatches).append(line)
+    print(f"물량 {checked}건 비교 ({time.perf_counter() - started:.2f}초), 배차 차량 {', '.join(vehicles)}")
+    if over_cap_gaps:
+        print(f"DP 표 상한을 넘는 물량에서 최저가보다 비싼 조합 {len(over_cap_gaps)}건 (참고)")
+        for line in over_cap_gaps[:10]: print(line)
+    if mismatches:
+        print(f"최저가보다 비싼 조합 {len(mismatches)}건")
+        for line in mismatches: print(line)
+        return 1
+    print("DP 표 상한 안의 모든 물량에서 최저가 조합을 찾았습니다.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# benchmarks/import_budget.py (첫 화면 모듈 로딩 시간 예산 — python -X importtime)
+# 사용법:
+#   python benchmarks/import_budget.py                     # 새 프로세스에서 첫 화면을 3번 그려 중앙값으로 판정
+#   python benchmarks/import_budget.py --budget-ms 250 --top 20
+#   python benchmarks/import_budget.py --save importtime.log  # -X importtime 원본 로그 저장
+# 새 파이썬 프로세스에서 Streamlit AppTest로 app.py를 한 번 실행하고(새 세션의 첫 화면),
+# 그동안 불러온 모듈의 로딩 시간을 -X importtime 로그로 집계합니다. (Streamlit 자체 런타임 모듈은 미리 불러와 제외)
+# 다음 경우 종료 코드 1:
+#   - 첫 화면의 모듈 로딩 시간 합계가 예산을 넘음
+#   - PDF/Excel/Drive/MMS/이메일 모듈이나 pandas 등 무거운 모듈을 첫 화면에서 불러옴 (기능을 처음 쓸 때 불러와야 함)
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+APP_PATH = os.path.join(REPO_DIR, "app.py")
+
+DEFAULT_BUDGET_MS = 300.0
+# 첫 화면에서 불러오면 안 되는 모듈 (각 기능을 처음 쓸 때 불러옴)
+DEFERRED_MODULES = (
+    "pandas", "reportlab", "pdf2image", "PIL", "openpyxl", "googleapiclient", "google.oauth2", "requests",
+    "pdf_generator", "excel_filler", "excel_summary_generator", "google_drive_helper", "mms_utils", "email_utils",
+)
+_START_MARKER = "=== import_budget: first render start ==="
+_END_MARKER = "=== import_budget: first render end ==="
+
+_CHILD_CODE = """
+import json, sys, time
+sys.path.insert(0, {repo!r})
+from streamlit.testing.v1 import AppTest
+AppTest.from_string("import streamlit as st\\nst.write('warm-up')").run()  # Streamlit 런타임 모듈 (측정 제외)
+sys.stderr.write({start!r} + "\\n"); sys.stderr.flush()
+app = AppTest.from_file({app!r}, default_timeout={timeout!r})
+app.secrets["gcp_service_account"] = {{"drive_folder_id": "import-budget"}}
+started = time.perf_counter()
+app.run()
+render_ms = (time.perf_counter() - started) * 1000
+sys.stderr.write({end!r} + "\\n"); sys.stderr.flush()
+print(json.dumps({{"render_ms": render_ms, "loaded": [m for m in {deferred!r} if m in sys.modules],
+                  "exceptions": [str(e.value) for e in app.exception]}}))
+"""
+
+def parse_importtime(lines):
+    """-X importtime 로그 줄을 [(이름, 들여쓰기 단계, 자체 us, 누적 us)]로 바꿉니다."""
+    entries = []
+    for line in lines:
+        if not line.startswith("import time:") or "[us]" in line: continue
+        parts = line[len("import time:"):].split("|", 2) # "자체 | 누적 | (단계마다 공백 2칸)이름"
+        try:
+            self_us, cumulative_us, raw_name = int(parts[0]), int(parts[1]), parts[2]
+        except (ValueError, IndexError):
+            continue
+        name = raw_name.lstrip(" ")
+        entries.append((name, (len(raw_name) - len(name) - 1) // 2, self_us, cumulative_us))
+    return entries
+
+def measure_once(timeout, save_path=None):
+    """새 프로세스에서 첫 화면을 한 번 그리고 {"total_ms", "render_ms", "entries", "loaded", "exceptions"}를 반환합니다."""
+    code = _CHILD_CODE.format(repo=REPO_DIR, app=APP_PATH, timeout=timeout, start=_START_MARKER, end=_END_MARKER,
+                              deferred=DEFERRED_MODULES)
+    env = dict(os.environ)
+    work_dir = tempfile.mkdtemp(prefix="quote_import_budget_")
+    env.setdefault("QUOTE_JOURNAL_PATH", os.path.join(work_dir, "session_journal.sqlite3"))
+    env.setdefault("QUOTE_PERF_LOG_PATH", os.path.join(work_dir, "perf_metrics.jsonl"))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_DIR, env=env,
+                            capture_output=True, text=True, encoding="utf-8", timeout=timeout * 2)
+    if save_path:
+        with open(save_path, "w", encoding="utf-8") as f:
+            f.write(result.stderr)
+    stderr_lines = result.stderr.splitlines()
+    if _START_MARKER not in stderr_lines or result.returncode != 0:
+        raise RuntimeError(f"측정 프로세스 실패 (종료 코드 {result.returncode}):\n" + "\n".join(stderr_lines[-20:]))
+    start = stderr_lines.index(_START_MARKER)
+    end = stderr_lines.index(_END_MARKER) if _END_MARKER in stderr_lines else len(stderr_lines)
+    entries = parse_importtime(stderr_lines[start + 1:end])
+    summary = json.loads(result.stdout.strip().splitlines()[-1])
+    return {"total_ms": sum(cumulative for _name, level, _self, cumulative in entries if level == 0) / 1000,
+            "entries": entries, **summary}
+
+def report(run, budget_ms, top):
+    entries = run["entries"]
+    print(f"첫 화면 모듈 로딩: {run['total_ms']:.1f} ms (예산 {budget_ms:.0f} ms), 첫 화면 실행 전체 {run['render_ms']:.1f} ms")
+    print(f"\n  직접 불러온 모듈 (누적 ms, 상위 {top})")
+    for name, _level, _self, cumulative in sorted((e for e in entries if e[1] == 0), key=lambda e: -e[3])[:top]:
+        print(f"  {cumulative / 1000:>9.1f}  {name}")
+    by_package = defaultdict(int)
+    for name, _level, self_us, _cumulative in entries: by_package[name.split(".")[0]] += self_us
+    print(f"\n  패키지별 (자체 ms 합, 상위 {top})")
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {self_us / 1000:>9.1f}  {package}")
+    print()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="첫 화면을 그리는 동안의 모듈 로딩 시간(-X importtime)을 예산과 비교합니다.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help=f"모듈 로딩 시간 예산 (기본 {DEFAULT_BUDGET_MS:.0f} ms)")
+    parser.add_argument("--repeat", type=int, default=3, help="측정 횟수 — 합계의 중앙값으로 판정 (기본 3)")
+    parser.add_argument("--top", type=int, default=15, help="표에 표시할 모듈 수")
+    parser.add_argument("--timeout", type=float, default=120.0, help="첫 화면 실행 최대 대기 초")
+    parser.add_argument("--save", help="한 번 더 측정해 -X importtime 원본 로그를 저장할 파일")
+    args = parser.parse_args(argv)
+
+    runs = [measure_once(args.timeout) for _ in range(max(1, args.repeat))]
+    median_total = statistics.median(run["total_ms"] for run in runs)
+    run = min(runs, key=lambda r: abs(r["total_ms"] - median_total))
+    if args.save: measure_once(args.timeout, save_path=args.save)
+    print(f"측정 {len(runs)}회: " + ", ".join(f"{r['total_ms']:.0f}" for r in runs) + " ms")
+    report(run, args.budget_ms, args.top)
+
+    failures = []
+    if median_total > args.budget_ms: failures.append(f"모듈 로딩 {median_total:.1f} ms > 예산 {args.budget_ms:.0f} ms")
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    if loaded: failures.append("첫 화면에서 불러온 무거운 모듈: " + ", ".join(loaded))
+    exceptions = [e for r in runs for e in r["exceptions"]]
+    if exceptions: failures.append(f"첫 화면 오류: {exceptions[0]}")
+    for failure in failures: print(f"✗ {failure}")
+    if not failures: print("✓ 예산 이내, 무거운 모듈을 첫 화면에서 불러오지 않음")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
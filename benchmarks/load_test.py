@@ -0,0 +1,233 @@
+# benchmarks/load_test.py (동시 접속 부하 테스트 — Streamlit AppTest)
+# 사용법:
+#   python benchmarks/load_test.py                          # 동시 세션 1, 2, 4, 8개
+#   python benchmarks/load_test.py --concurrency 1,4,16 --rounds 2
+#   python benchmarks/load_test.py --service-latency 0.2 --no-memory
+# 세션마다 실제 화면 흐름을 AppTest로 실행합니다:
+#   고객 정보 입력(탭 1) → 품목 수량 입력(탭 2, 일괄/즉시 입력) → 옵션 변경, PDF/Excel 생성, 이메일/MMS 발송(탭 3) → Drive 저장
+# Google Drive/SMTP/MMS는 service_stand_ins의 로컬 대역을 사용합니다 (실제 발송/업로드 없음).
+# 동시 세션 수별로 화면 실행(rerun) 지연 시간 백분위수와 세션당 메모리(tracemalloc)를 출력하고,
+# 마지막에 견적 비용 캐시 적중률을 출력합니다.
+# (세션 저널과 측정 로그는 임시 폴더에 기록합니다)
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+APP_PATH = os.path.join(REPO_DIR, "app.py")
+
+_WORK_DIR = tempfile.mkdtemp(prefix="quote_load_test_")
+os.environ.setdefault("QUOTE_JOURNAL_PATH", os.path.join(_WORK_DIR, "session_journal.sqlite3"))
+os.environ.setdefault("QUOTE_PERF_LOG_PATH", os.path.join(_WORK_DIR, "perf_metrics.jsonl"))
+
+import calculations
+import service_stand_ins
+
+DEFAULT_SECRETS = {"gcp_service_account": {"drive_folder_id": "load-test-folder"}, "quote_save_encoding": "json"}
+STEP_GROUPS = ("start", "tab1", "tab2", "tab3", "artifacts", "save")
+
+def enable_concurrent_app_tests(secrets):
+    """
+    AppTest.run()은 실행할 때마다 전역 Runtime 인스턴스, st.secrets, config를 바꿨다가 되돌리므로
+    여러 스레드에서 동시에 실행하면 서로 덮어씁니다 (다른 세션 실행 중에 Runtime이 None이 되는 등).
+    또 실행마다 새 ScriptCache로 app.py를 다시 컴파일하는데, Python 3.11에서는 여러 스레드가 동시에 컴파일하면
+    "AST constructor recursion depth mismatch" 오류가 날 수 있습니다.
+    실제 서버처럼 모든 세션이 한 프로세스의 Runtime과 ScriptCache를 공유하도록, 전역 값은 여기서 한 번만 정하고
+    AppTest가 Runtime을 바꾸거나 지우지 못하게 합니다. (streamlit.testing 내부 구조에 의존 — Streamlit 버전 업그레이드 시 확인)
+    """
+    import streamlit as st
+    from streamlit import config as st_config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.runtime.secrets import Secrets
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    class _SharedRuntimeMeta(type(Runtime)):
+        def __setattr__(cls, name, value):
+            if name != "_instance": return super().__setattr__(name, value)
+            # 처음 만들어진 mock Runtime만 실제 Runtime으로 등록하고, 이후 교체/해제(None)는 무시
+            if value is not None and Runtime._instance is None: type.__setattr__(Runtime, "_instance", value)
+
+    class _SharedRuntime(Runtime, metaclass=_SharedRuntimeMeta):
+        pass
+
+    app_test.Runtime = _SharedRuntime
+    shared_script_cache = ScriptCache() # 컴파일한 app.py를 세션끼리 공유 (서버와 같음)
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: shared_script_cache
+    shared_secrets = Secrets()
+    shared_secrets._secrets = dict(secrets) # AppTest.secrets를 비워 두면 AppTest는 st.secrets를 건드리지 않음
+    st.secrets = shared_secrets
+    st_config.set_option("global.appTest", True)
+
+def _percentile(sorted_values, pct):
+    if not sorted_values: return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+class SimulatedSession:
+    """AppTest 한 개 = 직원 한 명의 브라우저 세션. 화면 실행마다 (단계 그룹, 소요 ms)를 기록합니다."""
+
+    def __init__(self, session_index, seed, timeout):
+        from streamlit.testing.v1 import AppTest
+        self.rng = random.Random(seed)
+        self.session_index = session_index
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout) # secrets는 enable_concurrent_app_tests에서 공용으로 설정
+        self.timings = []  # [(group, ms)]
+        self.errors = []
+
+    def _run(self, group):
+        started = time.perf_counter()
+        self.app.run()
+        self.timings.append((group, (time.perf_counter() - started) * 1000))
+        if self.app.exception:
+            self.errors.append(f"{group}: {self.app.exception[0].value}")
+
+    def _button(self, key=None, label=None):
+        """화면에 있는 버튼(폼 제출 버튼 포함)을 찾습니다. 없으면 None (조건이 안 맞아 숨겨진 경우)."""
+        for button in self.app.button:
+            if (key is not None and button.key == key) or (label is not None and button.label == label): return button
+        return None
+
+    def fill_customer_info(self):
+        rng, n = self.rng, self.session_index
+        fields = {
+            "customer_name": f"부하테스트{n}", "customer_phone": f"010{rng.randint(10000000, 99999999)}",
+            "customer_email": f"load{n}@example.com", "from_location": "서울시 강남구 테헤란로 1",
+            "to_location": "경기도 성남시 분당구 1", "from_floor": str(rng.randint(1, 20)), "to_floor": str(rng.randint(1, 20)),
+        }
+        for key, value in fields.items():
+            self.app.text_input(key=key).input(value)
+            self._run("tab1")
+
+    def enter_item_quantities(self):
+        rng = self.rng
+        move_type = self.app.session_state["base_move_type"]
+        qty_keys = [w.key for w in self.app.number_input if w.key and w.key.startswith(f"qty_{move_type}_")]
+        chosen = rng.sample(qty_keys, min(len(qty_keys), rng.randint(5, 15)))
+        if rng.random() < 0.5: # 일괄 입력: 켠 뒤 여러 개 입력하고 '수량 적용' 한 번
+            self.app.checkbox(key="item_batch_entry_mode").check()
+            self._run("tab2")
+            for key in chosen: self.app.number_input(key=key).set_value(rng.randint(1, 4))
+            submit = self._button(label="✅ 수량 적용")
+            if submit is not None: submit.click()
+            self._run("tab2")
+        else: # 즉시 입력 (기본): 수량 하나 바꿀 때마다 실행 (handle_item_update 경로)
+            for key in chosen:
+                self.app.number_input(key=key).set_value(rng.randint(1, 4))
+                self._run("tab2")
+
+    def price_and_generate(self):
+        self.app.number_input(key="add_men").set_value(self.rng.randint(0, 2))
+        self._run("tab3")
+        self.app.number_input(key="adjustment_amount").set_value(self.rng.choice([0, -50000, 30000]))
+        self._run("tab3")
+        for key in ("pdf_customer_download_main", "generate_excel_and_image_main", "email_send_button_main", "mms_send_button_main"):
+            button = self._button(key=key)
+            if button is None: continue
+            button.click()
+            self._run("artifacts")
+
+    def save_to_drive(self):
+        button = self._button(label="💾 Google Drive에 저장")
+        if button is None: return
+        button.click()
+        self._run("save")
+
+    def run_flow(self):
+        try:
+            self._run("start")
+            self.fill_customer_info()
+            self.enter_item_quantities()
+            self.price_and_generate()
+            self.save_to_drive()
+        except Exception as e: # 위젯을 찾지 못하는 등 흐름 자체가 깨진 경우
+            self.errors.append(f"flow: {type(e).__name__}: {e}")
+
+def run_level(concurrency, rounds, seed, timeout, measure_memory=False):
+    """동시 세션 concurrency개를 rounds번 실행합니다. (세션 목록, 경과 초, 세션당 메모리 바이트 또는 None)"""
+    sessions = []
+    memory_per_session = None
+    if measure_memory:
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    for round_index in range(rounds):
+        batch = [SimulatedSession(round_index * concurrency + i, seed + round_index * 1000 + i, timeout) for i in range(concurrency)]
+        threads = [threading.Thread(target=s.run_flow, name=f"load-session-{s.session_index}") for s in batch]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        sessions.extend(batch)
+        if measure_memory and round_index == 0: # 첫 라운드 세션이 모두 살아 있는 상태에서 측정
+            memory_per_session = (tracemalloc.get_traced_memory()[0] - baseline) / concurrency
+    elapsed = time.perf_counter() - started
+    if measure_memory: tracemalloc.stop()
+    return sessions, elapsed, memory_per_session
+
+def report_level(concurrency, sessions, elapsed, memory_per_session):
+    timings = sorted(ms for s in sessions for _group, ms in s.timings)
+    errors = [e for s in sessions for e in s.errors]
+    memory_text = f"{memory_per_session / 1024:>9.0f}" if memory_per_session is not None else f"{'-':>9}"
+    print(f"{concurrency:>5} {len(sessions):>8} {len(timings):>7} {len(timings) / elapsed if elapsed else 0:>8.1f} "
+          f"{_percentile(timings, 50):>8.1f} {_percentile(timings, 90):>8.1f} {_percentile(timings, 99):>8.1f} "
+          f"{(timings[-1] if timings else 0):>8.1f} {memory_text} {len(errors):>6}")
+    return errors
+
+def report_groups(sessions):
+    print(f"  {'step':<10} {'reruns':>7} {'p50 ms':>8} {'p90 ms':>8} {'mean ms':>8}")
+    for group in STEP_GROUPS:
+        values = sorted(ms for s in sessions for g, ms in s.timings if g == group)
+        if values:
+            print(f"  {group:<10} {len(values):>7} {_percentile(values, 50):>8.1f} {_percentile(values, 90):>8.1f} {statistics.fmean(values):>8.1f}")
+
+def report_quote_cost_cache():
+    """AppTest 세션은 같은 프로세스에서 실행되므로 calculations의 견적 비용 캐시 적중률을 그대로 볼 수 있습니다."""
+    info = calculations.get_quote_cost_cache_info()
+    print(f"견적 비용 캐시: 적중 {info['hits']}, 미적중 {info['misses']} (적중률 {info['hit_rate']:.0%}), "
+          f"항목 {info['size']}/{info['maxsize']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AppTest로 여러 세션을 동시에 실행해 화면 실행 지연과 세션당 메모리를 측정합니다.")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="동시 세션 수 목록 (쉼표 구분, 기본 1,2,4,8)")
+    parser.add_argument("--rounds", type=int, default=1, help="동시 세션 수마다 반복할 횟수 (기본 1)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="화면 실행 1회 최대 대기 초 (AppTest default_timeout)")
+    parser.add_argument("--service-latency", type=float, default=0.0, help="Drive/SMTP/MMS 대역 호출 1회당 지연 초")
+    parser.add_argument("--no-memory", action="store_true", help="세션당 메모리 측정(tracemalloc, 별도 실행) 생략")
+    parser.add_argument("--groups", action="store_true", help="동시 세션 수마다 단계별(탭1/탭2/탭3/...) 지연도 출력")
+    parser.add_argument("--show-errors", type=int, default=5, help="동시 세션 수마다 출력할 오류 수")
+    args = parser.parse_args(argv)
+    levels = [int(value) for value in args.concurrency.split(",") if value.strip()]
+
+    stand_ins = service_stand_ins.install(args.service_latency)
+    enable_concurrent_app_tests(DEFAULT_SECRETS)
+    SimulatedSession(0, args.seed, args.timeout).app.run() # 모듈 로딩/캐시 준비 (측정 제외)
+    calculations.clear_quote_cost_cache() # 캐시 적중률은 측정한 세션만 집계
+
+    print(f"작업 폴더: {_WORK_DIR}")
+    print(f"{'conc':>5} {'sessions':>8} {'reruns':>7} {'rerun/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'KB/sess':>9} {'errors':>6}")
+    print("-" * 86)
+    total_errors = 0
+    for concurrency in levels:
+        sessions, elapsed, _ = run_level(concurrency, args.rounds, args.seed, args.timeout)
+        memory_per_session = None
+        if not args.no_memory: # tracemalloc은 실행을 느리게 하므로 지연 측정과 따로 실행
+            memory_per_session = run_level(concurrency, 1, args.seed, args.timeout, measure_memory=True)[2]
+        errors = report_level(concurrency, sessions, elapsed, memory_per_session)
+        if args.groups: report_groups(sessions)
+        for error in errors[:args.show_errors]: print(f"  ! {error}")
+        total_errors += len(errors)
+    print(f"\n외부 서비스 대역 호출: {dict(stand_ins.calls)}")
+    report_quote_cost_cache()
+    return 1 if total_errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+# benchmarks/pricing_diff.py (가격 계산 구현 차등 비교 — golden corpus)
+# 사용법:
+#   python benchmarks/pricing_diff.py                      # 코퍼스가 없으면 생성/저장 후 비교
+#   python benchmarks/pricing_diff.py --count 50000 --regenerate
+#   python benchmarks/pricing_diff.py --corpus other.json.gz --show 20
+# 고정된 기준 구현(legacy_calculations.py)과 현재 calculations.py를 같은 견적 코퍼스로 실행해
+# 총액(원)/비용 항목/인원 정보가 하나라도 다르면 보고하고 종료 코드 1을 반환합니다. 처리 속도도 나란히 출력합니다.
+# 이어서 data.vehicle_prices를 바꾼 상태에서도 같은 비교를 한 번 더 합니다 (가격 데이터 변경 시 조회 테이블 자동 재생성 확인).
+import argparse
+import copy
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import calculations
+import data
+import legacy_calculations
+from quote_generator import generate_quote_states
+
+# 생성한 코퍼스는 저장소에 올리지 않는 metrics/ 폴더에 둡니다 (.gitignore)
+DEFAULT_CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "metrics", "pricing_corpus.json.gz")
+CORPUS_FORMAT = "pricing-corpus"
+CORPUS_VERSION = 1
+EDGE_CASE_RATIO = 0.05 # 잘못된/누락된 입력값을 섞을 견적 비율
+
+# 화면 밖에서 들어올 수 있는 이상한 값 (저장 파일 손상, 구버전 데이터 등)
+EDGE_CASE_VALUES = {
+    "final_selected_vehicle": [None, "", "30톤", "없는차량"],
+    "from_floor": [None, "", "abc", "999", "지하", "-"], "to_floor": [None, "1500", "12층", " 3 "],
+    "add_men": [None, "", "2", "abc", 1.5], "add_women": [None, "1", -1],
+    "sky_hours_from": [None, 0, "2", "x"], "sky_hours_final": [0, -1, "3"],
+    "adjustment_amount": [None, "", "50000", 1.5, "abc"],
+    "storage_duration": [None, 0, -3, "10"], "storage_type": [None, "없는유형"],
+    "long_distance_selector": [None, "없는구간"], "waste_tons_input": [None, 0, 0.3, "2", "x"],
+    "regional_ladder_surcharge": [None, "30000"], "via_point_surcharge": [None, 0.5],
+    "deposit_amount": [None, "abc"],
+}
+
+def _add_edge_cases(states, rng):
+    for state in states:
+        if rng.random() >= EDGE_CASE_RATIO: continue
+        for key in rng.sample(sorted(EDGE_CASE_VALUES), rng.randint(1, 3)):
+            if rng.random() < 0.2: state.pop(key, None) # 키 자체가 없는 경우
+            else: state[key] = rng.choice(EDGE_CASE_VALUES[key])
+    return states
+
+def generate_corpus(count, seed=0):
+    states = generate_quote_states(count, seed)
+    return _add_edge_cases(states, random.Random(seed + 1))
+
+# --- 코퍼스 저장 형식 ---
+# 키 이름은 "keys" 목록에 한 번만 저장하고, 견적은 [키 번호, 값, 키 번호, 값, ...] 평면 리스트로 저장합니다.
+# date 값은 {"$date": "YYYY-MM-DD"} 로 저장합니다. 전체를 gzip으로 압축합니다.
+def _encode_value(value):
+    return {"$date": value.isoformat()} if isinstance(value, date) else value
+
+def _decode_value(value):
+    return date.fromisoformat(value["$date"]) if isinstance(value, dict) and "$date" in value else value
+
+def save_corpus(path, states, seed=None):
+    key_index, rows = {}, []
+    for state in states:
+        row = []
+        for key, value in state.items():
+            row.append(key_index.setdefault(key, len(key_index)))
+            row.append(_encode_value(value))
+        rows.append(row)
+    payload = {"format": CORPUS_FORMAT, "version": CORPUS_VERSION, "seed": seed, "count": len(rows),
+               "keys": list(key_index), "rows": rows}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+
+def load_corpus(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        payload = json.load(f)
+    if payload.get("format") != CORPUS_FORMAT or payload.get("version") != CORPUS_VERSION:
+        raise ValueError(f"지원하지 않는 코퍼스 형식입니다: {path}")
+    keys = payload["keys"]
+    return [{keys[row[i]]: _decode_value(row[i + 1]) for i in range(0, len(row), 2)} for row in payload["rows"]], payload
+
+# --- 실행 / 비교 ---
+def _outcome(func, state):
+    """(total, cost_items, personnel_info) 또는 예외 시 ("error", 예외 이름)."""
+    try:
+        return func(state)
+    except Exception as e:
+        return ("error", type(e).__name__)
+
+def _item_signature(cost_items):
+    """금액 타입까지 비교 (int/float가 다르면 화면/엑셀 표시가 달라짐)."""
+    return [(tuple(item), type(item[1]).__name__) for item in cost_items]
+
+def _same_outcome(expected, actual):
+    if expected[0] == "error" or actual[0] == "error": return expected == actual
+    return (expected[0] == actual[0] and type(expected[0]) is type(actual[0])
+            and _item_signature(expected[1]) == _item_signature(actual[1]) and expected[2] == actual[2])
+
+def run_engines(states):
+    """{엔진 이름: (결과 목록, 소요 초)} — 첫 항목이 기준(legacy)입니다."""
+    results = {}
+    started = time.perf_counter()
+    results["legacy (baseline)"] = ([_outcome(legacy_calculations.calculate_total_moving_cost, s) for s in states],
+                                    time.perf_counter() - started)
+    calculations.clear_quote_cost_cache()
+    started = time.perf_counter()
+    results["calculate_total_moving_cost"] = ([_outcome(calculations.calculate_total_moving_cost, s) for s in states],
+                                              time.perf_counter() - started)
+    return results
+
+def _describe_mismatch(index, state, expected, actual):
+    lines = [f"  #{index} vehicle={state.get('final_selected_vehicle')!r} move_type={state.get('base_move_type')!r}"]
+    if expected[0] == "error" or actual[0] == "error":
+        lines.append(f"    기준: {expected}\n    결과: {actual}")
+        return "\n".join(lines)
+    if expected[0] != actual[0] or type(expected[0]) is not type(actual[0]):
+        lines.append(f"    총액: {expected[0]!r} → {actual[0]!r}")
+    expected_items, actual_items = _item_signature(expected[1]), _item_signature(actual[1])
+    for pos in range(max(len(expected_items), len(actual_items))):
+        exp = expected_items[pos] if pos < len(expected_items) else None
+        act = actual_items[pos] if pos < len(actual_items) else None
+        if exp != act: lines.append(f"    항목[{pos}]: {exp} → {act}")
+    if expected[2] != actual[2]: lines.append(f"    인원: {expected[2]} → {actual[2]}")
+    return "\n".join(lines)
+
+def compare(states, results, show=10):
+    """엔진별 불일치 건수를 출력하고 총 불일치 건수를 반환합니다."""
+    engine_names = list(results)
+    reference, reference_elapsed = results[engine_names[0]]
+    print(f"{'engine':<30} {'quotes':>7} {'seconds':>9} {'quotes/s':>10} {'speedup':>8} {'mismatch':>9}")
+    print("-" * 78)
+    mismatches = {}
+    for name in engine_names:
+        outcomes, elapsed = results[name]
+        bad = [i for i, (exp, act) in enumerate(zip(reference, outcomes)) if not _same_outcome(exp, act)]
+        mismatches[name] = bad
+        rate = len(outcomes) / elapsed if elapsed else 0.0
+        speedup = reference_elapsed / elapsed if elapsed else 0.0
+        print(f"{name:<30} {len(outcomes):>7} {elapsed:>9.3f} {rate:>10.0f} {speedup:>7.2f}x {len(bad):>9}")
+    error_count = sum(1 for outcome in reference if outcome[0] == "error")
+    print(f"(기준 구현에서 예외가 난 견적 {error_count}건 포함)")
+    for name, bad in mismatches.items():
+        if not bad: continue
+        print(f"\n[{name}] 불일치 {len(bad)}건 (처음 {min(show, len(bad))}건)")
+        for index in bad[:show]:
+            print(_describe_mismatch(index, states[index], reference[index], results[name][0][index]))
+    return sum(len(bad) for bad in mismatches.values())
+
+# --- 가격 데이터 변경 확인 ---
+DATA_CHANGE_SAMPLE_SIZE = 2000
+DATA_CHANGE_PRICE_DELTA = 10000 # 모든 차량 기본 운임에 더할 금액
+
+def check_pricing_data_change(states, show=10):
+    """
+    data.vehicle_prices를 가격만 올린 사본으로 바꾼 뒤 다시 비교합니다. 기준 구현은 data를 매번 읽으므로,
+    새 구현이 조회 테이블/견적 캐시를 다시 만들지 않으면 불일치로 나타납니다. 원래 값으로 되돌린 뒤에도 한 번 더 비교합니다.
+    반환: 불일치 건수 (총액이 하나도 바뀌지 않았으면 1)
+    """
+    sample = states[:DATA_CHANGE_SAMPLE_SIZE]
+    before = [_outcome(calculations.calculate_total_moving_cost, s) for s in sample]
+    original_prices = data.vehicle_prices
+    changed_prices = copy.deepcopy(original_prices)
+    for trucks in changed_prices.values():
+        for info in trucks.values(): info['price'] = info.get('price', 0) + DATA_CHANGE_PRICE_DELTA
+    print(f"\n[가격 데이터 변경] data.vehicle_prices 교체 (모든 차량 +{DATA_CHANGE_PRICE_DELTA:,}원), 견적 {len(sample)}건")
+    data.vehicle_prices = changed_prices
+    try:
+        changed_results = run_engines(sample)
+    finally:
+        data.vehicle_prices = original_prices
+    total_mismatches = compare(sample, changed_results, show)
+    changed_totals = sum(1 for old, new in zip(before, changed_results["calculate_total_moving_cost"][0]) if old[0] != new[0])
+    print(f"총액이 바뀐 견적 {changed_totals}건")
+    if not changed_totals:
+        print("가격을 바꿨는데 총액이 하나도 바뀌지 않았습니다.")
+        total_mismatches += 1
+    print(f"\n[가격 데이터 복원] 견적 {len(sample)}건")
+    return total_mismatches + compare(sample, run_engines(sample), show)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="기준 구현과 현재 가격 계산 결과를 견적 코퍼스로 비교합니다.")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_PATH, help="코퍼스 파일 경로 (.json.gz)")
+    parser.add_argument("--count", type=int, default=30000, help="코퍼스를 새로 만들 때의 견적 수 (기본 30000)")
+    parser.add_argument("--seed", type=int, default=0, help="코퍼스를 새로 만들 때의 seed")
+    parser.add_argument("--regenerate", action="store_true", help="기존 코퍼스가 있어도 새로 만들어 저장")
+    parser.add_argument("--show", type=int, default=10, help="엔진별로 자세히 출력할 불일치 건수")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.regenerate or not os.path.exists(args.corpus):
+        states = generate_corpus(args.count, args.seed)
+        save_corpus(args.corpus, states, seed=args.seed)
+        print(f"코퍼스 생성: {args.corpus} (견적 {len(states)}건, {os.path.getsize(args.corpus) / 1024:.0f} KB, "
+              f"{time.perf_counter() - started:.2f}초)")
+    else:
+        states, payload = load_corpus(args.corpus)
+        print(f"코퍼스 로드: {args.corpus} (견적 {len(states)}건, seed {payload.get('seed')}, "
+              f"{time.perf_counter() - started:.2f}초)")
+    if not states:
+        print("코퍼스가 비어 있습니다.")
+        return 0
+
+    total_mismatches = compare(states, run_engines(states), args.show)
+    total_mismatches += check_pricing_data_change(states, args.show)
+    if total_mismatches:
+        print(f"\n불일치 {total_mismatches}건 — 새 구현이 기준 구현과 다릅니다.")
+        return 1
+    print("\n모든 견적에서 기준 구현과 결과가 같습니다.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
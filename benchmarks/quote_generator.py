@@ -0,0 +1,69 @@
+# benchmarks/quote_generator.py (벤치마크/비교 테스트용 가상 견적 생성기)
+# data.py의 품목/차량/가격 옵션으로 실제 화면에서 만들 수 있는 형태의 견적 state를 무작위로 만듭니다.
+# 이사 유형 2종, 보관 이사, 경유지, 사다리차/스카이, 날짜 할증, VAT/카드 결제 조합을 모두 포함합니다.
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # 저장소 루트의 모듈 사용
+
+import data
+
+FLOOR_CHOICES = ["", "1", "2", "3", "5", "7", "10", "12", "15", "18", "22", "25", "-1", "B1", "12층", "지하2"]
+SKY_METHOD = "스카이 🏗️"
+
+def _item_keys(move_type):
+    """해당 이사 유형의 품목 수량 키 목록 [(키, 섹션, 품목명)]."""
+    keys = []
+    for section, item_list in data.item_definitions.get(move_type, {}).items():
+        for item in item_list:
+            if item in data.items: keys.append((f"qty_{move_type}_{section}_{item}", section, item))
+    return keys
+
+def generate_quote_state(rng):
+    """견적 state 하나 (dict)."""
+    move_type = rng.choice(list(data.item_definitions.keys()))
+    vehicles = list(data.vehicle_prices.get(move_type, {}).keys())
+    moving_date = date(2025, 1, 1) + timedelta(days=rng.randint(0, 365))
+    is_storage = rng.random() < 0.2
+    state = {
+        "base_move_type": move_type,
+        "is_storage_move": is_storage,
+        "storage_type": rng.choice(data.STORAGE_TYPE_OPTIONS),
+        "storage_duration": rng.randint(1, 60) if is_storage else 1,
+        "storage_use_electricity": is_storage and rng.random() < 0.4,
+        "apply_long_distance": rng.random() < 0.25,
+        "long_distance_selector": rng.choice(data.long_distance_options),
+        "customer_name": f"고객{rng.randint(1, 99999)}",
+        "customer_phone": f"010-{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+        "moving_date": moving_date,
+        "arrival_date": moving_date + timedelta(days=rng.randint(0, 30)),
+        "from_floor": rng.choice(FLOOR_CHOICES), "to_floor": rng.choice(FLOOR_CHOICES),
+        "from_method": rng.choice(data.METHOD_OPTIONS), "to_method": rng.choice(data.METHOD_OPTIONS),
+        "sky_hours_from": rng.randint(1, 4), "sky_hours_final": rng.randint(1, 4),
+        "final_selected_vehicle": rng.choice(vehicles) if vehicles and rng.random() < 0.97 else None,
+        "add_men": rng.choice([0, 0, 0, 1, 2, 3]), "add_women": rng.choice([0, 0, 0, 1, 2]),
+        "remove_base_housewife": rng.random() < 0.2,
+        "has_waste_check": rng.random() < 0.2, "waste_tons_input": rng.choice([0.5, 1.0, 1.5, 2.0, 3.5]),
+        "adjustment_amount": rng.choice([0, 0, 0, 0, 50000, 100000, -30000, -50000]),
+        "regional_ladder_surcharge": rng.choice([0, 0, 0, 0, 30000, 50000]),
+        "has_via_point": rng.random() < 0.15,
+        "via_point_surcharge": rng.choice([0, 30000, 50000, 100000]),
+        "issue_tax_invoice": rng.random() < 0.3, "card_payment": rng.random() < 0.2,
+        "deposit_amount": rng.choice([0, 100000, 200000]),
+    }
+    for i in range(len(data.special_day_prices)):
+        state[f"date_opt_{i}_widget"] = rng.random() < 0.15
+    if state["has_via_point"]:
+        state["via_point_location"], state["via_point_method"] = "경유지 주소", rng.choice(data.METHOD_OPTIONS)
+    if SKY_METHOD not in (state["from_method"], state["to_method"]) and rng.random() < 0.1:
+        state["from_method"] = SKY_METHOD # 스카이 조합이 충분히 나오도록
+    for key, _section, _item in _item_keys(move_type):
+        state[key] = rng.choice([0, 0, 0, 0, 1, 1, 2, 3, 5]) if rng.random() < 0.6 else 0
+    return state
+
+def generate_quote_states(count, seed=0):
+    """seed가 같으면 항상 같은 견적 목록을 만듭니다."""
+    rng = random.Random(seed)
+    return [generate_quote_state(rng) for _ in range(count)]
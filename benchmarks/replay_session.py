@@ -0,0 +1,178 @@
+# benchmarks/replay_session.py (기록한 세션 재현 — Streamlit AppTest)
+# 사용법:
+#   python benchmarks/replay_session.py metrics/recordings/session_20250601_101500_ab12cd34ef56.jsonl
+#   python benchmarks/replay_session.py metrics/recordings --repeat 3        # 폴더 안의 모든 기록
+#   python benchmarks/replay_session.py metrics/recordings --parallel        # 모든 기록을 동시에 (부하 테스트)
+# session_recorder로 기록한 입력값 변경과 버튼 클릭을 같은 순서로 AppTest 세션에 다시 입력하고,
+# 사용자 동작마다 화면 실행 시간을 재서 기록 당시 시간과 비교합니다. 생각하는 시간 없이 연달아 실행합니다.
+# 재현 세션도 기록을 켜서, 호출된 콜백 순서가 원래 기록과 같은지 확인합니다 (재현이 같은 경로를 탔는지).
+# Google Drive/SMTP/MMS는 service_stand_ins의 로컬 대역을 사용합니다.
+import argparse
+import glob
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+os.environ.setdefault("QUOTE_RECORD_DIR", os.path.join(tempfile.mkdtemp(prefix="quote_replay_"), "recordings"))
+
+from load_test import APP_PATH, DEFAULT_SECRETS, _percentile, enable_concurrent_app_tests, report_quote_cost_cache
+import calculations
+import service_stand_ins
+
+# AppTest에서 key로 찾을 수 있는 입력 위젯 종류
+_WIDGET_KINDS = ("text_input", "number_input", "selectbox", "radio", "checkbox", "toggle", "date_input",
+                 "text_area", "multiselect", "slider", "select_slider", "time_input")
+
+def collect_recordings(paths):
+    files = []
+    for path in paths:
+        files.extend(sorted(glob.glob(os.path.join(path, "*.jsonl"))) if os.path.isdir(path) else [path])
+    return files
+
+def group_user_steps(steps):
+    """
+    기록을 사용자 동작 단위로 묶습니다: [(동작 기록, 기록 당시 ms 합계, 콜백 이름 목록)].
+    입력/클릭이 없는 실행(st.rerun() 등 앱 내부 재실행)은 앞 동작에 합칩니다 (AppTest도 한 번의 run에서 함께 실행).
+    첫 실행(세션 시작)은 동작 기록 None입니다.
+    """
+    groups = []
+    if steps and (steps[0].get("set") or steps[0].get("click")): groups.append([None, 0.0, []]) # 세션 중간에 켠 기록
+    for step in steps:
+        callbacks = [entry[0] for entry in step.get("cb", ())]
+        if step.get("set") or step.get("click") or not groups:
+            groups.append([step if (step.get("set") or step.get("click")) else None, step.get("ms", 0.0), callbacks])
+        else:
+            groups[-1][1] += step.get("ms", 0.0)
+            groups[-1][2].extend(callbacks)
+    return [tuple(group) for group in groups]
+
+class ReplaySession:
+    """기록 파일 하나를 AppTest 세션 하나로 재현합니다."""
+
+    def __init__(self, path, timeout, verify=True):
+        from streamlit.testing.v1 import AppTest
+        import session_recorder
+        self.recorder = session_recorder
+        self.path = path
+        self.header, steps = session_recorder.load_recording(path)
+        self.groups = group_user_steps(steps)
+        self.verify = verify
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        if verify: self.app.query_params[session_recorder.RECORD_QUERY_PARAM] = "1"
+        self.timings = []  # [(재현 ms, 기록 당시 ms)]
+        self.errors = []
+        self.fallbacks = 0 # 위젯을 찾지 못해 session_state에 직접 넣은 값 수
+        self.skipped_clicks = 0
+
+    def _find_widget(self, key):
+        for kind in _WIDGET_KINDS:
+            for widget in getattr(self.app, kind, ()):
+                if widget.key == key: return widget
+        return None
+
+    def _set(self, key, value):
+        import state_manager
+        field = state_manager.STATE_FIELDS.get(key)
+        if field is not None and field.kind == "date": value = field.coerce_or_default(value)
+        widget = self._find_widget(key)
+        try:
+            if widget is None: raise LookupError(key)
+            widget.set_value(value)
+        except Exception: # 화면에 없는 위젯(조건부 표시 등) 또는 선택지에 없는 값
+            self.fallbacks += 1
+            self.app.session_state[key] = value
+
+    def _click(self, key):
+        for button in list(self.app.button) + list(getattr(self.app, "download_button", ())):
+            if button.key == key:
+                button.click()
+                return
+        self.skipped_clicks += 1
+
+    def _run(self, recorded_ms):
+        started = time.perf_counter()
+        self.app.run()
+        self.timings.append(((time.perf_counter() - started) * 1000, recorded_ms))
+        if self.app.exception:
+            self.errors.append(f"step {len(self.timings)}: {self.app.exception[0].value}")
+
+    def replayed_callbacks(self):
+        """재현 세션이 기록한 사용자 동작별 콜백 이름 목록 (verify일 때만)."""
+        path = self.app.session_state[self.recorder.RECORD_PATH_KEY] if self.verify else None
+        if not path or not os.path.exists(path): return None
+        return [callbacks for _step, _ms, callbacks in group_user_steps(self.recorder.load_recording(path)[1])]
+
+    def run(self):
+        try:
+            for step, recorded_ms, _callbacks in self.groups:
+                if step is not None:
+                    for key, value in (step.get("set") or {}).items(): self._set(key, value)
+                    for key in step.get("click") or (): self._click(key)
+                self._run(recorded_ms)
+        except Exception as e:
+            self.errors.append(f"replay: {type(e).__name__}: {e}")
+
+def report(session, label):
+    replayed = sorted(ms for ms, _recorded in session.timings)
+    recorded_total = sum(recorded for _ms, recorded in session.timings)
+    match = "-"
+    expected = [callbacks for _step, _ms, callbacks in session.groups]
+    actual = session.replayed_callbacks()
+    if actual is not None:
+        mismatch = next((i for i, (a, b) in enumerate(zip(expected, actual)) if a != b), None)
+        if mismatch is None and len(expected) != len(actual): mismatch = min(len(expected), len(actual))
+        match = "일치" if mismatch is None else f"{mismatch + 1}번째 동작부터 다름"
+    print(f"{label:<44} {len(session.timings):>6} {sum(replayed):>10.0f} {recorded_total:>10.0f} "
+          f"{_percentile(replayed, 50):>8.1f} {_percentile(replayed, 90):>8.1f} "
+          f"{(statistics.fmean(replayed) if replayed else 0):>8.1f} {session.fallbacks:>5} {len(session.errors):>6}  {match}")
+    for error in session.errors[:3]: print(f"  ! {error}")
+    return len(session.errors)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="session_recorder 기록을 AppTest로 재현해 동작별 화면 실행 시간을 측정합니다.")
+    parser.add_argument("paths", nargs="+", help="기록 파일(.jsonl) 또는 기록 폴더")
+    parser.add_argument("--repeat", type=int, default=1, help="기록마다 재현할 횟수 (기본 1)")
+    parser.add_argument("--parallel", action="store_true", help="모든 재현 세션을 동시에 실행")
+    parser.add_argument("--timeout", type=float, default=120.0, help="화면 실행 1회 최대 대기 초 (AppTest default_timeout)")
+    parser.add_argument("--service-latency", type=float, default=0.0, help="Drive/SMTP/MMS 대역 호출 1회당 지연 초")
+    parser.add_argument("--no-verify", action="store_true", help="재현 세션의 콜백 순서 비교 생략")
+    args = parser.parse_args(argv)
+    files = collect_recordings(args.paths)
+    if not files:
+        print("재현할 기록이 없습니다.")
+        return 1
+
+    stand_ins = service_stand_ins.install(args.service_latency)
+    enable_concurrent_app_tests(DEFAULT_SECRETS)
+    from streamlit.testing.v1 import AppTest
+    AppTest.from_file(APP_PATH, default_timeout=args.timeout).run() # 모듈 로딩/캐시 준비 (측정 제외)
+    calculations.clear_quote_cost_cache() # 캐시 적중률은 재현한 세션만 집계
+
+    sessions = [(f"{os.path.basename(path)}" + (f" #{n + 1}" if args.repeat > 1 else ""),
+                 ReplaySession(path, args.timeout, verify=not args.no_verify))
+                for path in files for n in range(args.repeat)]
+    started = time.perf_counter()
+    if args.parallel:
+        threads = [threading.Thread(target=session.run, name=f"replay-{i}") for i, (_label, session) in enumerate(sessions)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+    else:
+        for _label, session in sessions: session.run()
+    elapsed = time.perf_counter() - started
+
+    print(f"{'기록':<44} {'동작':>6} {'재현 ms':>10} {'기록 ms':>10} {'p50 ms':>8} {'p90 ms':>8} {'평균 ms':>8} "
+          f"{'대체':>5} {'오류':>6}  콜백 순서")
+    print("-" * 124)
+    total_errors = sum(report(session, label) for label, session in sessions)
+    print(f"\n전체 {elapsed:.1f}초 ({'동시' if args.parallel else '순차'} 실행), 외부 서비스 대역 호출: {dict(stand_ins.calls)}")
+    print("(대체: 화면에서 위젯을 찾지 못해 session_state에 직접 넣은 값 수)")
+    report_quote_cost_cache()
+    return 1 if total_errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# benchmarks/service_stand_ins.py (부하 테스트/재현용 외부 서비스 대역)
+# Google Drive(google_drive_helper), SMTP(email_utils), MMS(mms_utils) 모듈을 같은 함수 이름의 로컬 대역으로 바꿉니다.
+# 네트워크 없이 호출 횟수를 세고, 필요하면 서비스 응답 지연을 time.sleep으로 흉내 냅니다.
+# 앱 모듈(app.py, ui_tab*.py)을 불러오기 전에 install()을 호출해야 합니다.
+import itertools
+import sys
+import threading
+import time
+import types
+from collections import Counter
+
+import utils
+
+STAND_IN_MODULE_NAMES = ("google_drive_helper", "email_utils", "mms_utils")
+
+class ServiceStandIns:
+    """외부 서비스 대역. Drive 파일은 메모리에 (저장 형식 그대로 인코딩한 bytes로) 보관합니다."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency # 서비스 호출 1회당 흉내 낼 응답 지연 (초)
+        self.calls = Counter()
+        self.files = {}        # {file_id: {"name", "mimeType", "bytes"}}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _record(self, name):
+        with self._lock:
+            self.calls[name] += 1
+        if self.latency: time.sleep(self.latency)
+
+    # --- google_drive_helper ---
+    def save_json_file(self, file_name, data_dict, folder_id=None, encoding="json"):
+        self._record("drive.save_json_file")
+        payload_bytes, mime_type = utils.encode_json_payload(data_dict, encoding)
+        with self._lock:
+            file_id = next((fid for fid, f in self.files.items() if f["name"] == file_name), None)
+            status = "updated" if file_id else "created"
+            file_id = file_id or f"stand-in-{next(self._ids)}"
+            self.files[file_id] = {"name": file_name, "mimeType": mime_type, "bytes": payload_bytes}
+        return {"id": file_id, "name": file_name, "status": status}
+
+    def build_drive_service(self, service_account_info):
+        self._record("drive.build_drive_service")
+        return self
+
+    def upload_json_file(self, service, file_name, data_dict, folder_id=None, encoding="json"):
+        return self.save_json_file(file_name, data_dict, folder_id, encoding) # 자동 저장 작업 스레드 경로
+
+    def load_json_file(self, file_id):
+        self._record("drive.load_json_file")
+        with self._lock:
+            stored = self.files.get(file_id)
+        return utils.decode_json_payload(stored["bytes"]) if stored else None
+
+    def find_files_by_name_contains(self, name_query, mime_types=None, folder_id=None):
+        self._record("drive.find_files_by_name_contains")
+        if isinstance(mime_types, str): mime_types = [mime_types]
+        with self._lock:
+            return [{"id": fid, "name": f["name"], "mimeType": f["mimeType"]} for fid, f in self.files.items()
+                    if name_query in f["name"] and (not mime_types or f["mimeType"] in mime_types)]
+
+    # --- email_utils ---
+    def send_quote_email(self, recipient_email, subject, body, pdf_bytes, pdf_filename="견적서.pdf"):
+        self._record("smtp.send_quote_email")
+        return bool(recipient_email and pdf_bytes)
+
+    # --- mms_utils ---
+    def send_mms_with_image(self, recipient_phone, image_bytes, filename="견적서.jpg", text_message="견적서가 도착했습니다."):
+        self._record("mms.send_mms_with_image")
+        return bool(recipient_phone and image_bytes)
+
+    def build_modules(self):
+        """{모듈 이름: 대역 모듈} — 앱이 실제로 쓰는 함수만 제공합니다."""
+        drive = types.ModuleType("google_drive_helper")
+        drive.save_json_file, drive.load_json_file = self.save_json_file, self.load_json_file
+        drive.find_files_by_name_contains = self.find_files_by_name_contains
+        drive.build_drive_service, drive.upload_json_file = self.build_drive_service, self.upload_json_file
+        email = types.ModuleType("email_utils")
+        email.send_quote_email = self.send_quote_email
+        mms = types.ModuleType("mms_utils")
+        mms.send_mms_with_image = self.send_mms_with_image
+        return {"google_drive_helper": drive, "email_utils": email, "mms_utils": mms}
+
+def install(latency=0.0):
+    """sys.modules의 외부 서비스 모듈을 대역으로 바꾸고 ServiceStandIns를 반환합니다."""
+    stand_ins = ServiceStandIns(latency)
+    sys.modules.update(stand_ins.build_modules())
+    return stand_ins
@@ -1,54 +1,370 @@
 # calculations.py (VAT, 카드 수수료, 기본 여성 인원 제외 로직 수정)
 import data
 import math
+import bisect
+import functools
+import time
+import itertools
+import operator
 
-# --- 이사짐 부피/무게 계산 ---
-def calculate_total_volume_weight(state_data, move_type):
-    total_volume = 0.0
-    total_weight = 0.0
-    if not hasattr(data, 'item_definitions') or not data.item_definitions:
-        return 0.0, 0.0
-    item_defs = data.item_definitions.get(move_type, {})
-    processed_items = set() 
-    if isinstance(item_defs, dict):
-        for section, item_list in item_defs.items():
-            if section == "폐기 처리 품목 🗑️": continue
-            if isinstance(item_list, list):
+try:
+    import numpy as np
+    _NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    _NUMPY_AVAILABLE = False
+
+WASTE_SECTION_NAME = "폐기 처리 품목 🗑️"
+BASKET_SECTION_NAME = "포장 자재 📦"
+
+# --- 사전 계산 테이블 관리 ---
+# data.py의 품목/가격 테이블로 만든 조회용 테이블입니다. 아래 속성이 내용이 다른 객체로 교체되거나 길이가 바뀌면
+# 다음 조회 때 자동으로 다시 만들어집니다 (호출마다 속성별 객체 동일성(is)과 길이만 비교하므로 비용이 작습니다).
+# (딕셔너리 안쪽 값만 직접 수정한 경우에는 refresh_pricing_tables()를 호출하세요.)
+PRICING_DATA_ATTRS = (
+    "item_definitions", "items", "vehicle_specs", "vehicle_prices", "LOADING_EFFICIENCY",
+    "ladder_prices", "ladder_price_floor_ranges", "ladder_tonnage_map", "default_ladder_size",
+    "ADDITIONAL_PERSON_COST", "SKY_BASE_PRICE", "SKY_EXTRA_HOUR_PRICE",
+    "STORAGE_RATES_PER_DAY", "DEFAULT_STORAGE_TYPE", "STORAGE_ELECTRICITY_SURCHARGE_PER_DAY",
+    "long_distance_prices", "WASTE_DISPOSAL_COST_PER_TON", "special_day_prices",
+    "default_basket_quantities",
+)
+_DATA_NAMESPACE = vars(data)
+_PRICING_TABLES = {"is_current": lambda: False, "version": 0}
+
+def _source_fingerprint_check():
+    """
+    지금 data 모듈 속성 객체들의 지문(객체 동일성, 컨테이너 길이)을 기억하고, 그대로인지 확인하는 함수를 반환합니다.
+    지금 있는 속성만 한 번에 꺼냅니다. 없는 속성이 나중에 생기면 모듈 속성 개수가 바뀌어 다시 만들어집니다.
+    """
+    read_sources = operator.itemgetter(*(name for name in PRICING_DATA_ATTRS if name in _DATA_NAMESPACE))
+    source_values = read_sources(_DATA_NAMESPACE)
+    sized_values = tuple(value for value in source_values if isinstance(value, (dict, list, tuple, set)))
+    source_lengths, namespace_size = list(map(len, sized_values)), len(_DATA_NAMESPACE)
+    def is_current():
+        try:
+            # 튜플 비교는 원소마다 동일성(is)을 먼저 보므로, 바뀐 속성이 없으면 내용은 비교하지 않습니다
+            return (len(_DATA_NAMESPACE) == namespace_size and read_sources(_DATA_NAMESPACE) == source_values
+                    and list(map(len, sized_values)) == source_lengths)
+        except KeyError: # 속성이 삭제됨
+            return False
+    return is_current
+
+def refresh_pricing_tables():
+    """data 모듈의 현재 값으로 모든 조회 테이블을 다시 만들고 버전을 올립니다."""
+    is_current = _source_fingerprint_check()
+    ladder_table = build_ladder_price_table()
+    _PRICING_TABLES.update({
+        "item_catalog": build_item_catalog_index(),
+        "basket_assignments": build_basket_assignment_table(),
+        "vehicle_capacity": build_vehicle_capacity_tables(),
+        "ladder": ladder_table,
+        "fleet_solvers": {},
+        "pipeline": compile_pricing_pipeline(ladder_table),
+        "is_current": is_current,
+        "version": _PRICING_TABLES["version"] + 1,
+    })
+    return _PRICING_TABLES["version"]
+
+def _pricing_tables():
+    if not _PRICING_TABLES["is_current"]():
+        refresh_pricing_tables()
+    return _PRICING_TABLES
+
+def pricing_table_version():
+    """조회 테이블 버전 (가격 데이터가 바뀌어 다시 만들어질 때마다 증가)."""
+    return _pricing_tables()["version"]
+
+# --- 품목 카탈로그 인덱스 (처음 사용할 때 생성, data 품목 테이블이 바뀌면 다시 생성) ---
+def build_item_catalog_index():
+    """
+    이사 유형별로 (state key, 부피, 무게) 목록을 미리 만들어 둡니다.
+    같은 품목이 여러 섹션에 있으면 첫 번째 섹션의 키만 사용합니다 (기존 계산 방식과 동일).
+    """
+    index = {}
+    item_definitions = getattr(data, 'item_definitions', None) or {}
+    item_specs = getattr(data, 'items', None) or {}
+    for move_type, item_defs in item_definitions.items():
+        entries, specs, basket_keys = [], {}, []
+        processed_items = set()
+        if isinstance(item_defs, dict):
+            for section, item_list in item_defs.items():
+                if section == WASTE_SECTION_NAME or not isinstance(item_list, list): continue
                 for item_name in item_list:
-                    if item_name in processed_items or not hasattr(data, 'items') or not data.items or item_name not in data.items:
-                        continue
-                    widget_key = f"qty_{move_type}_{section}_{item_name}"
-                    qty_raw = state_data.get(widget_key)
-                    qty = int(qty_raw) if qty_raw is not None else 0
-                    if qty > 0:
-                        try:
-                            volume, weight = data.items[item_name] 
-                            total_volume += volume * qty
-                            total_weight += weight * qty
-                        except KeyError: pass
-                        except Exception: pass 
+                    if item_name in processed_items or item_name not in item_specs: continue
                     processed_items.add(item_name)
+                    volume, weight = item_specs[item_name]
+                    widget_key = f"qty_{move_type}_{section}_{item_name}"
+                    entries.append((widget_key, float(volume), float(weight)))
+                    specs[widget_key] = (float(volume), float(weight))
+                    if section == BASKET_SECTION_NAME: basket_keys.append(widget_key)
+        index[move_type] = {
+            "keys": tuple(entry[0] for entry in entries),
+            "entries": tuple(entries),
+            "specs": specs,
+            "basket_keys": tuple(basket_keys),
+        }
+    return index
+
+def get_item_catalog(move_type):
+    """이사 유형의 품목 인덱스(keys/entries/specs/basket_keys)를 반환합니다. 없으면 None."""
+    return _pricing_tables()["item_catalog"].get(move_type)
+
+def coerce_item_quantity(qty_raw):
+    """위젯 수량 값을 계산용 정수로 변환합니다 (None/음수는 0)."""
+    qty = int(qty_raw) if qty_raw is not None else 0
+    return qty if qty > 0 else 0
+
+def calculate_item_totals(state_data, move_type):
+    """
+    반올림 전 총 부피/무게와 수량이 0보다 큰 키별 수량을 함께 반환합니다.
+    callbacks.handle_item_update가 이후 증분 계산의 기준값으로 사용합니다 (없는 키는 수량 0).
+    """
+    catalog = get_item_catalog(move_type)
+    if not catalog:
+        return 0.0, 0.0, {}
+    get = state_data.get
+    total_volume = total_weight = 0.0
+    quantities = {}
+    for widget_key, volume, weight in catalog["entries"]:
+        qty_raw = get(widget_key)
+        if qty_raw is None: continue
+        qty = int(qty_raw)
+        if qty > 0:
+            total_volume += volume * qty
+            total_weight += weight * qty
+            quantities[widget_key] = qty
+    return total_volume, total_weight, quantities
+
+# --- 차량별 기본 바구니 수량 배정 ---
+def build_basket_assignment_table():
+    """
+    {이사 유형: {차량: {state key: 수량}}} 형태로 포장 자재 섹션의 모든 품목 키에 줄 수량을 미리 만들어 둡니다.
+    차량 기본값에 없는 품목은 0입니다. None 키는 차량이 없거나 기본값이 없을 때의 배정(전부 0)입니다.
+    """
+    table = {}
+    item_definitions = getattr(data, 'item_definitions', None) or {}
+    basket_defaults_by_vehicle = getattr(data, 'default_basket_quantities', None) or {}
+    for move_type, item_defs in item_definitions.items():
+        basket_items = item_defs.get(BASKET_SECTION_NAME, []) if isinstance(item_defs, dict) else []
+        keyed_items = [(f"qty_{move_type}_{BASKET_SECTION_NAME}_{item_name}", item_name) for item_name in basket_items]
+        assignments = {None: {key: 0 for key, _ in keyed_items}}
+        for vehicle, basket_defaults in basket_defaults_by_vehicle.items():
+            assignments[vehicle] = {key: basket_defaults[item_name] if item_name in basket_defaults else 0
+                                    for key, item_name in keyed_items}
+        table[move_type] = assignments
+    return table
+
+def get_basket_assignments(move_type, vehicle):
+    """session_state.update에 바로 넣을 {state key: 수량}. 이사 유형을 모르면 빈 dict. (반환값은 수정하지 마세요)"""
+    assignments = _pricing_tables()["basket_assignments"].get(move_type)
+    if not assignments: return {}
+    return assignments.get(vehicle, assignments[None])
+
+# --- 이사짐 부피/무게 계산 ---
+def calculate_total_volume_weight(state_data, move_type):
+    total_volume, total_weight, _ = calculate_item_totals(state_data, move_type)
     return round(total_volume, 2), round(total_weight, 2)
 
+# --- 차량 용량 테이블 (이사 유형별, 적재 효율 적용 후 용량 오름차순) ---
+def build_vehicle_capacity_tables():
+    """
+    이사 유형별로 가격이 정의된 차량을 용량 순으로 정렬해 둡니다.
+    usable_capacities에는 LOADING_EFFICIENCY가 이미 적용되어 있어 bisect 검색에 바로 쓸 수 있습니다.
+    """
+    tables = {}
+    vehicle_specs = getattr(data, 'vehicle_specs', None) or {}
+    vehicle_prices = getattr(data, 'vehicle_prices', None) or {}
+    loading_efficiency = getattr(data, 'LOADING_EFFICIENCY', 1.0)
+    for move_type, priced_trucks in vehicle_prices.items():
+        rows = sorted(((truck, specs) for truck, specs in vehicle_specs.items() if truck in (priced_trucks or {})),
+                      key=lambda item: item[1].get('capacity', 0))
+        tables[move_type] = {
+            "trucks": tuple(truck for truck, _ in rows),
+            "usable_capacities": tuple(specs.get('capacity', 0) * loading_efficiency for _, specs in rows),
+            "weight_capacities": tuple(specs.get('weight_capacity', 0) for _, specs in rows),
+        }
+    return tables
+
+def get_vehicle_capacity_table(move_type):
+    """이사 유형의 차량 용량 테이블(trucks/usable_capacities/weight_capacities)을 반환합니다. 없으면 None."""
+    return _pricing_tables()["vehicle_capacity"].get(move_type)
+
+def get_available_trucks(move_type):
+    """이사 유형에서 선택 가능한 차량 이름을 용량 오름차순으로 반환합니다."""
+    table = get_vehicle_capacity_table(move_type)
+    return list(table["trucks"]) if table else []
+
 # --- 차량 추천 ---
 def recommend_vehicle(total_volume, total_weight, current_move_type):
-    recommended_vehicle, remaining_space_percent = None, 0.0
-    if not hasattr(data, 'vehicle_specs') or not data.vehicle_specs: return None, 0
-    priced_trucks_for_move_type = list(data.vehicle_prices.get(current_move_type, {}).keys()) if hasattr(data, 'vehicle_prices') and data.vehicle_prices else []
-    if not priced_trucks_for_move_type: return None, 0
-    relevant_vehicle_specs = {truck: specs for truck, specs in data.vehicle_specs.items() if truck in priced_trucks_for_move_type}
-    if not relevant_vehicle_specs: return None, 0
-    sorted_trucks = sorted(relevant_vehicle_specs.items(), key=lambda item: item[1].get('capacity', 0))
-    if total_volume <= 0 and total_weight <= 0: return None, 0 
-    loading_efficiency = getattr(data, 'LOADING_EFFICIENCY', 1.0) 
-    for truck_name, specs in sorted_trucks:
-        usable_capacity, usable_weight = specs.get('capacity', 0) * loading_efficiency, specs.get('weight_capacity', 0)
-        if usable_capacity > 0 and total_volume <= usable_capacity and total_weight <= usable_weight:
-            recommended_vehicle, remaining_space_percent = truck_name, (1 - (total_volume / usable_capacity)) * 100 if usable_capacity > 0 else 0
-            break 
-    if recommended_vehicle: return recommended_vehicle, round(remaining_space_percent, 1)
-    elif (total_volume > 0 or total_weight > 0) and sorted_trucks: return f"{sorted_trucks[-1][0]} 용량 초과", 0 
-    else: return None, 0
+    table = get_vehicle_capacity_table(current_move_type)
+    if not table or not table["trucks"]: return None, 0
+    if total_volume <= 0 and total_weight <= 0: return None, 0
+    usable_capacities, weight_capacities = table["usable_capacities"], table["weight_capacities"]
+    # 부피를 만족하는 첫 차량부터 무게만 확인
+    for idx in range(bisect.bisect_left(usable_capacities, total_volume), len(usable_capacities)):
+        usable_capacity = usable_capacities[idx]
+        if usable_capacity > 0 and total_weight <= weight_capacities[idx]:
+            return table["trucks"][idx], round((1 - (total_volume / usable_capacity)) * 100, 1)
+    return f"{table['trucks'][-1]} 용량 초과", 0
+
+# --- 복수 차량 조합 최적화 (용량 초과 시) ---
+FLEET_VOLUME_STEP = 0.5 # m³ 단위 이산화 (차량 용량은 내림, 물량은 올림 → 항상 안전한 쪽)
+FLEET_WEIGHT_STEP = 500 # kg 단위 이산화
+# DP 표 크기 상한 (300m³, 50톤). 표는 물량만큼만 만들므로 상한 안의 물량은 항상 최저가 조합입니다.
+# 이보다 큰 물량은 물량 대비 가격이 가장 싼 차종으로 먼저 채워 상한 안으로 줄인 뒤 나머지만 DP로 계산합니다.
+FLEET_MAX_VOLUME_UNITS = 600
+FLEET_MAX_WEIGHT_UNITS = 100
+_FLEET_COUNT_SCALE = 1 << 16 # DP 비용 = 가격 * SCALE + 대수 (가격이 같으면 대수가 적은 조합)
+_FLEET_INF = 1 << 62
+
+def _fleet_bundles(trucks, v_needed, w_needed):
+    """
+    차량별 1, 2, 4, ... 대 묶음 [(차량 번호, 대수, 부피 단위, 무게 단위, DP 비용)].
+    묶음을 골라 0대부터 (혼자 전부 싣는 데 필요한 대수)까지 모두 만들 수 있습니다. 남은 물량을 줄이지 못하는 차량은 제외합니다.
+    """
+    bundles = []
+    for idx, (_, price, v_units, w_units, _, _) in enumerate(trucks):
+        if not ((v_needed > 0 and v_units > 0) or (w_needed > 0 and w_units > 0)): continue
+        max_count = max(-(-v_needed // v_units) if v_units else 0, -(-w_needed // w_units) if w_units else 0)
+        size = 1
+        while max_count > 0:
+            take = min(size, max_count)
+            bundles.append((idx, take, take * v_units, take * w_units, take * (price * _FLEET_COUNT_SCALE + 1)))
+            max_count -= take
+            size *= 2
+    return bundles
+
+def _solve_fleet_numpy(trucks, v_needed, w_needed):
+    # best[v, w] = 부피 v, 무게 w 단위 이상을 싣는 최소 비용. 묶음마다 한 번씩 표 전체를 갱신(0/1 배낭)하고,
+    # 갱신된 칸을 기록해 두었다가 역순으로 따라가며 고른 묶음을 찾습니다.
+    bundles = _fleet_bundles(trucks, v_needed, w_needed)
+    rows, cols = v_needed + 1, w_needed + 1
+    best = np.full((rows, cols), _FLEET_INF, dtype=np.int64)
+    best[0, 0] = 0
+    candidate = np.empty_like(best)
+    improved_masks = []
+    for _, _, bundle_v, bundle_w, cost in bundles:
+        # candidate[v, w] = best[max(0, v - bundle_v), max(0, w - bundle_w)] (앞쪽은 0행/0열로 채움)
+        dv, dw = min(bundle_v, rows), min(bundle_w, cols)
+        candidate[dv:, dw:] = best[:rows - dv, :cols - dw]
+        candidate[:dv, dw:] = best[0, :cols - dw]
+        candidate[dv:, :dw] = best[:rows - dv, :1]
+        candidate[:dv, :dw] = best[0, 0]
+        candidate += cost
+        improved = candidate < best
+        np.copyto(best, candidate, where=improved)
+        improved_masks.append(improved)
+    if best[v_needed, w_needed] >= _FLEET_INF: return None
+    counts, v_left, w_left = [0] * len(trucks), v_needed, w_needed
+    for (idx, take, bundle_v, bundle_w, _), improved in zip(reversed(bundles), reversed(improved_masks)):
+        if improved[v_left, w_left]:
+            counts[idx] += take
+            v_left, w_left = max(0, v_left - bundle_v), max(0, w_left - bundle_w)
+    return counts
+
+def _solve_fleet_python(trucks, v_needed, w_needed):
+    # numpy가 없을 때: 같은 DP를 (v, w) 오름차순으로 채웁니다. best[v][w] = (비용, 마지막 차량 번호)
+    costs = [price * _FLEET_COUNT_SCALE + 1 for _, price, _, _, _, _ in trucks]
+    best = [[None] * (w_needed + 1) for _ in range(v_needed + 1)]
+    best[0][0] = (0, None)
+    for v in range(v_needed + 1):
+        for w in range(w_needed + 1):
+            if v == 0 and w == 0: continue
+            cell = None
+            for idx, (_, _, v_units, w_units, _, _) in enumerate(trucks):
+                if not ((v > 0 and v_units > 0) or (w > 0 and w_units > 0)): continue # 진전 없는 차량 제외
+                prev = best[max(0, v - v_units)][max(0, w - w_units)]
+                if prev is not None and (cell is None or prev[0] + costs[idx] < cell[0]):
+                    cell = (prev[0] + costs[idx], idx)
+            best[v][w] = cell
+    if best[v_needed][w_needed] is None: return None
+    counts, v, w = [0] * len(trucks), v_needed, w_needed
+    while v > 0 or w > 0:
+        idx = best[v][w][1]
+        counts[idx] += 1
+        v, w = max(0, v - trucks[idx][2]), max(0, w - trucks[idx][3])
+    return counts
+
+def _fleet_bulk_fill(trucks, v_needed, w_needed):
+    """
+    물량이 DP 표 상한을 넘을 때 먼저 채울 (차량 번호, 대수). 필요 없거나 불가능하면 None.
+    그 차종만으로 전체 물량을 실을 때의 가격(대당 가격 x 필요 대수)이 가장 싼 차종을 고르고,
+    남은 물량이 상한보다 가장 큰 차량 한 대분 이상 작아지도록 채웁니다 (나머지 DP가 다른 차종을 섞을 여유).
+    """
+    if v_needed <= FLEET_MAX_VOLUME_UNITS and w_needed <= FLEET_MAX_WEIGHT_UNITS: return None
+    max_v_units, max_w_units = max(t[2] for t in trucks), max(t[3] for t in trucks)
+    limits = ((v_needed, FLEET_MAX_VOLUME_UNITS - max_v_units), (w_needed, FLEET_MAX_WEIGHT_UNITS - max_w_units))
+    best, best_load_price = None, None
+    for idx, (_, price, v_units, w_units, _, _) in enumerate(trucks):
+        if (v_needed > 0 and v_units <= 0) or (w_needed > 0 and w_units <= 0): continue # 혼자서는 전체를 실을 수 없음
+        load_price = price * max(v_needed / v_units if v_units else 0, w_needed / w_units if w_units else 0)
+        if best_load_price is not None and load_price >= best_load_price: continue
+        count = max(-(-(needed - max(0, limit)) // units) if needed > max(0, limit) else 0
+                    for (needed, limit), units in zip(limits, (v_units, w_units)))
+        best, best_load_price = (idx, count), load_price
+    return best
+
+def _build_fleet_solver(move_type, vehicles):
+    priced = (getattr(data, 'vehicle_prices', None) or {}).get(move_type, {})
+    table = get_vehicle_capacity_table(move_type)
+    if not table: return None
+    trucks = []
+    for truck, usable_capacity, weight_capacity in zip(table["trucks"], table["usable_capacities"], table["weight_capacities"]):
+        if vehicles is not None and truck not in vehicles: continue
+        price = priced.get(truck, {}).get('price', 0)
+        v_units = int(math.floor(usable_capacity / FLEET_VOLUME_STEP + 1e-9))
+        w_units = int(math.floor(weight_capacity / FLEET_WEIGHT_STEP + 1e-9))
+        if price > 0 and (v_units > 0 or w_units > 0):
+            trucks.append((truck, price, v_units, w_units, usable_capacity, weight_capacity))
+    if not trucks: return None
+    solve = _solve_fleet_numpy if _NUMPY_AVAILABLE else _solve_fleet_python
+
+    @functools.lru_cache(maxsize=256)
+    def cheapest(v_needed, w_needed):
+        """차량별 대수 튜플 (실을 수 없으면 None)."""
+        bulk = _fleet_bulk_fill(trucks, v_needed, w_needed)
+        if bulk:
+            bulk_idx, bulk_count = bulk
+            v_needed = max(0, v_needed - bulk_count * trucks[bulk_idx][2])
+            w_needed = max(0, w_needed - bulk_count * trucks[bulk_idx][3])
+        elif v_needed > FLEET_MAX_VOLUME_UNITS or w_needed > FLEET_MAX_WEIGHT_UNITS:
+            return None
+        counts = solve(trucks, v_needed, w_needed)
+        if counts is None: return None
+        if bulk: counts[bulk_idx] += bulk_count
+        return tuple(counts)
+
+    return trucks, cheapest
+
+def optimize_fleet(total_volume, total_weight, move_type, vehicles=None):
+    """
+    부피와 무게를 모두 담을 수 있는 가장 저렴한 차량 조합을 찾습니다 (data.vehicle_prices 기준).
+    vehicles로 후보 차량을 제한할 수 있습니다 (예: data.DISPATCH_VEHICLE_KEYS).
+    결과는 이산화된 용량에 대한 반복 DP로 계산되며, 같은 이사 유형/후보 차량/물량에 대해 캐시됩니다
+    (가격 테이블이 다시 만들어지면 캐시도 초기화됩니다). 물량이 DP 표 상한(300m³, 50톤)을 넘으면 일부를 한 차종으로
+    먼저 채우므로, 그 경우에는 최저가가 아닐 수 있습니다.
+    반환: {"trucks": {차량: 대수}, "total_price", "total_capacity", "total_weight_capacity"} 또는 None
+    """
+    if (total_volume or 0) <= 0 and (total_weight or 0) <= 0: return None
+    solver_key = (move_type, tuple(vehicles) if vehicles is not None else None)
+    fleet_solvers = _pricing_tables()["fleet_solvers"]
+    if solver_key not in fleet_solvers:
+        fleet_solvers[solver_key] = _build_fleet_solver(move_type, solver_key[1])
+    solver = fleet_solvers[solver_key]
+    if not solver: return None
+    trucks, cheapest = solver
+
+    v_needed = max(0, int(math.ceil((total_volume or 0) / FLEET_VOLUME_STEP - 1e-9)))
+    w_needed = max(0, int(math.ceil((total_weight or 0) / FLEET_WEIGHT_STEP - 1e-9)))
+    counts = cheapest(v_needed, w_needed)
+    if counts is None: return None
+    return {
+        "trucks": {t[0]: c for t, c in zip(trucks, counts) if c > 0},
+        "total_price": sum(t[1] * c for t, c in zip(trucks, counts)),
+        "total_capacity": round(sum(t[4] * c for t, c in zip(trucks, counts)), 2),
+        "total_weight_capacity": sum(t[5] * c for t, c in zip(trucks, counts)),
+    }
 
 # --- 층수 숫자 추출 ---
 def get_floor_num(floor_str):
@@ -60,148 +376,566 @@ def get_floor_num(floor_str):
         return -int(num_part) if cleaned.startswith('-') and num_part else (int(num_part) if num_part else 0)
     except: return 0 
 
-# --- 사다리차 비용 계산 ---
-def get_ladder_cost(floor_num, vehicle_name):
-    cost, note = 0, ""
-    if floor_num < 2: return 0, "1층 이하"
-    floor_range_key = next((rng_str for (min_f, max_f), rng_str in getattr(data, 'ladder_price_floor_ranges', {}).items() if min_f <= floor_num <= max_f), None)
-    if not floor_range_key: return 0, f"{floor_num}층 해당 가격 없음"
-    vehicle_spec = getattr(data, 'vehicle_specs', {}).get(vehicle_name)
-    if not vehicle_spec or 'weight_capacity' not in vehicle_spec: return 0, "선택 차량 정보 없음"
-    vehicle_ton_num = vehicle_spec['weight_capacity'] / 1000.0
-    tonnage_key = next((data.ladder_tonnage_map[ton_n] for ton_n in sorted(getattr(data, 'ladder_tonnage_map', {}).keys(), reverse=True) if vehicle_ton_num >= ton_n), getattr(data, 'default_ladder_size', None))
-    if not tonnage_key: return 0, "사다리차 톤수 기준 없음"
+# --- 사다리차 가격 테이블 (층 x 톤수 구분, 기본 사이즈 대체 및 비고 포함) ---
+LADDER_DENSE_MAX_FLOOR = 1000 # 이 층수까지는 층별 행 인덱스를 배열로 보관, 그 이상은 구간 검색
+
+def _ladder_range_for_floor(floor_ranges, floor_num):
+    return next((rng_str for (min_f, max_f), rng_str in floor_ranges.items() if min_f <= floor_num <= max_f), None)
+
+def _ladder_cell(floor_prices, floor_range_key, tonnage_key, def_size):
     try:
-        floor_prices = getattr(data, 'ladder_prices', {}).get(floor_range_key, {})
-        cost = floor_prices.get(tonnage_key, 0)
+        cost, note = floor_prices.get(tonnage_key, 0), ""
         if cost > 0: note = f"{floor_range_key}, {tonnage_key} 기준"
+        elif def_size and def_size != tonnage_key:
+            cost = floor_prices.get(def_size, 0)
+            note = f"{floor_range_key}, 기본({def_size}) 적용" if cost > 0 else f"{floor_range_key}, {tonnage_key}(기본 {def_size}) 가격 없음"
+        else: note = f"{floor_range_key}, {tonnage_key} 가격 정보 없음"
+        return cost, note
+    except Exception as e: return 0, f"가격 조회 오류: {e}"
+
+def build_ladder_price_table():
+    """
+    get_ladder_cost용 조밀 테이블을 만듭니다.
+    floor_rows[층] → 행 번호, vehicle_columns[차량] → 열 번호 (-1: 톤수 기준 없음), grid[행][열] → (비용, 비고)
+    """
+    floor_ranges = getattr(data, 'ladder_price_floor_ranges', {}) or {}
+    ladder_prices = getattr(data, 'ladder_prices', {}) or {}
+    tonnage_map = getattr(data, 'ladder_tonnage_map', {}) or {}
+    def_size = getattr(data, 'default_ladder_size', None)
+
+    range_keys = list(dict.fromkeys(floor_ranges.values()))
+    row_of_range = {rng_str: idx for idx, rng_str in enumerate(range_keys)}
+    dense_max = min(LADDER_DENSE_MAX_FLOOR, max((max_f for (_, max_f) in floor_ranges), default=1))
+    floor_rows = [None] * (max(dense_max, 1) + 1)
+    for floor_num in range(2, len(floor_rows)):
+        rng_str = _ladder_range_for_floor(floor_ranges, floor_num)
+        floor_rows[floor_num] = row_of_range.get(rng_str)
+
+    tonnage_thresholds = sorted(tonnage_map.keys(), reverse=True)
+    tonnage_keys, vehicle_columns = [], {}
+    for vehicle_name, vehicle_spec in (getattr(data, 'vehicle_specs', {}) or {}).items():
+        if not vehicle_spec or 'weight_capacity' not in vehicle_spec: continue
+        vehicle_ton_num = vehicle_spec['weight_capacity'] / 1000.0
+        tonnage_key = next((tonnage_map[ton_n] for ton_n in tonnage_thresholds if vehicle_ton_num >= ton_n), def_size)
+        if not tonnage_key:
+            vehicle_columns[vehicle_name] = -1; continue
+        if tonnage_key not in tonnage_keys: tonnage_keys.append(tonnage_key)
+        vehicle_columns[vehicle_name] = tonnage_keys.index(tonnage_key)
+
+    grid = [[_ladder_cell(ladder_prices.get(rng_str, {}), rng_str, tonnage_key, def_size) for tonnage_key in tonnage_keys]
+            for rng_str in range_keys]
+    return {"floor_rows": floor_rows, "range_keys": range_keys, "row_of_range": row_of_range,
+            "vehicle_columns": vehicle_columns, "grid": grid, "floor_ranges": floor_ranges}
+
+# --- 사다리차 비용 계산 ---
+def _lookup_ladder_cost(table, floor_num, vehicle_name):
+    if floor_num < 2: return 0, "1층 이하"
+    floor_rows = table["floor_rows"]
+    if isinstance(floor_num, int) and floor_num < len(floor_rows): row = floor_rows[floor_num]
+    else: row = table["row_of_range"].get(_ladder_range_for_floor(table["floor_ranges"], floor_num))
+    if row is None: return 0, f"{floor_num}층 해당 가격 없음"
+    col = table["vehicle_columns"].get(vehicle_name)
+    if col is None: return 0, "선택 차량 정보 없음"
+    if col < 0: return 0, "사다리차 톤수 기준 없음"
+    return table["grid"][row][col]
+
+def get_ladder_cost(floor_num, vehicle_name):
+    return _lookup_ladder_cost(_pricing_tables()["ladder"], floor_num, vehicle_name)
+
+# --- 총 이사 비용 계산: 가격 규칙 파이프라인 ---
+# 각 규칙은 가격 테이블 값을 컴파일 시점에 고정해 두고, 계산 시에는 fields에 선언한 state 키만 읽습니다.
+# 규칙 순서가 곧 비용 항목(cost_items) 순서입니다.
+DATE_SURCHARGE_OPTIONS = ["이사많은날 🏠", "손없는날 ✋", "월말 📅", "공휴일 🎉", "금요일 📅"]
+VAT_RATE = 0.1
+CARD_FEE_RATE = 0.13
+
+class PricingAbort(Exception):
+    """계산을 중단하고 오류 항목 하나만 반환해야 하는 경우 (차량 미선택 등)."""
+
+class PricingContext:
+    """
+    파이프라인 한 번의 계산 상태. values는 파이프라인 field_order 순서의 state 값 튜플입니다.
+    subtotal은 VAT/카드 수수료 이전 금액, total은 최종 금액입니다.
+    미리 만들어 둔 (항목, 금액, 비고) 튜플을 쓰는 규칙은 add_item 대신 cost_items/subtotal을 직접 갱신합니다.
+    """
+    __slots__ = ("values", "move_type", "vehicle", "is_storage", "base_men", "base_women",
+                 "add_men", "add_women", "removed_housewife", "subtotal", "total", "cost_items")
+
+    def __init__(self, values, read_context):
+        self.values = values
+        self.move_type, self.vehicle, self.is_storage = read_context(values)
+        self.base_men = self.base_women = self.add_men = self.add_women = 0
+        self.removed_housewife = False
+        self.subtotal, self.total, self.cost_items = 0, 0, []
+
+    def add_item(self, name, amount, note):
+        self.cost_items.append((name, amount, note))
+        self.subtotal += amount
+        return amount
+
+def _int_or_zero(value):
+    return int(value or 0)
+
+def _int_at_least_one(value):
+    return max(1, int(value or 1))
+
+def _waste_tons(value):
+    return max(0.5, float(value or 0.5))
+
+RULE_MEMO_SIZE = 4096 # 규칙이 입력값별로 기억해 두는 항목 수 (넘으면 비우고 다시 채움)
+
+def _remember(memo, key, value):
+    if len(memo) >= RULE_MEMO_SIZE: memo.clear()
+    memo[key] = value
+    return value
+
+class PricingRule:
+    """
+    가격 규칙 하나. apply()는 이번 계산에 더한 금액을 반환합니다 (trace용).
+    fields의 값은 self.read(ctx.values)로 선언 순서대로 읽습니다 (컴파일 시 bind()가 위치를 고정).
+    guard 키 값이 거짓이면 apply()가 아무것도 하지 않으므로, trace 없이 실행할 때는 호출하지 않습니다.
+    """
+    name = ""
+    fields = () # 이 규칙이 읽는 (state 키, 키가 없을 때 쓰는 기본값) — 견적 캐시 키 계산에 사용
+    typed_fields = () # 값을 비고 등에 그대로 써서 1 / 1.0 / True의 결과가 달라지는 키 — 캐시 키에 값의 타입도 넣음
+    guard = None
+
+    def bind(self, field_slots):
+        slots = [field_slots[key] for key, _ in self.fields]
+        if len(slots) == 1:
+            slot = slots[0]
+            self.read = lambda values: (values[slot],)
         else:
-            def_size = getattr(data, 'default_ladder_size', None)
-            if def_size and def_size != tonnage_key:
-                 cost = floor_prices.get(def_size, 0)
-                 note = f"{floor_range_key}, 기본({def_size}) 적용" if cost > 0 else f"{floor_range_key}, {tonnage_key}(기본 {def_size}) 가격 없음"
-            else: note = f"{floor_range_key}, {tonnage_key} 가격 정보 없음"
-    except Exception as e: note, cost = f"가격 조회 오류: {e}", 0
-    return cost, note
-
-# --- 총 이사 비용 계산 ---
-def calculate_total_moving_cost(state_data):
-    cost_before_add_charges = 0 
-    cost_items = [] 
-    personnel_info = {} 
-
-    current_move_type = state_data.get('base_move_type')
-    selected_vehicle = state_data.get('final_selected_vehicle') 
-    is_storage, has_via_point = state_data.get('is_storage_move', False), state_data.get('has_via_point', False)
-
-    if not selected_vehicle:
-        return 0, [("오류", 0, "차량 선택 필요")], {}
-
-    base_price, base_men, base_women = 0, 0, 0
-    vehicle_prices_options = getattr(data, 'vehicle_prices', {}).get(current_move_type, {})
-    if selected_vehicle in vehicle_prices_options:
-        v_info = vehicle_prices_options[selected_vehicle]
-        base_price, base_men, base_women = v_info.get('price', 0), v_info.get('men', 0), v_info.get('housewife', 0)
-        actual_base_price = base_price * 2 if is_storage else base_price
-        cost_items.append(("기본 운임", actual_base_price, f"{selected_vehicle} 기준" + (" (보관 x2)" if is_storage else "")))
-        cost_before_add_charges += actual_base_price
-    else:
-        return 0, [("오류", 0, f"차량({selected_vehicle}) 가격 정보 없음")], {}
+            self.read = operator.itemgetter(*slots)
+
+    def apply(self, ctx):
+        raise NotImplementedError
+
+class BaseFareRule(PricingRule):
+    name = "기본 운임"
+    fields = (('base_move_type', None), ('final_selected_vehicle', None), ('is_storage_move', False))
+    typed_fields = ('final_selected_vehicle',)
+
+    def __init__(self, vehicle_prices):
+        # {이사 유형: {차량: (남, 여, 비용 항목, 보관 이사 비용 항목)}}
+        self.fares = {move_type: {vehicle: (v_info.get('men', 0), v_info.get('housewife', 0),
+                                            ("기본 운임", v_info.get('price', 0), f"{vehicle} 기준"),
+                                            ("기본 운임", v_info.get('price', 0) * 2, f"{vehicle} 기준 (보관 x2)"))
+                                  for vehicle, v_info in options.items()}
+                      for move_type, options in vehicle_prices.items()}
+
+    def apply(self, ctx):
+        vehicle = ctx.vehicle
+        if not vehicle: raise PricingAbort("차량 선택 필요")
+        fare = self.fares.get(ctx.move_type, {}).get(vehicle)
+        if fare is None: raise PricingAbort(f"차량({vehicle}) 가격 정보 없음")
+        ctx.base_men, ctx.base_women, item, storage_item = fare
+        if ctx.is_storage: item = storage_item
+        ctx.cost_items.append(item); ctx.subtotal += item[1]
+        return item[1]
+
+class LocationEquipmentRule(PricingRule):
+    """
+    출발지/도착지 사다리차 또는 스카이 장비 비용.
+    (층 입력 문자열, 차량)별 사다리차 항목과 시간별 스카이 항목은 처음 계산할 때 기억해 둡니다 (규칙마다 RULE_MEMO_SIZE개까지).
+    """
+
+    def __init__(self, loc_type, floor_key, method_key, sky_hours_key, ladder_table, sky_base, sky_extra):
+        self.name = f"{loc_type} 장비"
+        self.fields = ((method_key, None), (floor_key, None), (sky_hours_key, 1), ('final_selected_vehicle', None))
+        self.typed_fields = (floor_key, 'final_selected_vehicle')
+        self.loc_type, self.ladder_table, self.sky_base, self.sky_extra = loc_type, ladder_table, sky_base, sky_extra
+        self.ladder_name, self.sky_name = f"{loc_type} 사다리차", f"{loc_type} 스카이 장비"
+        self.ladder_items, self.sky_items = {}, {}
+
+    def _ladder_item(self, floor, vehicle):
+        """비용 항목 튜플 또는 항목을 넣지 않으면 None."""
+        l_cost, l_note = _lookup_ladder_cost(self.ladder_table, get_floor_num(floor), vehicle)
+        return (self.ladder_name, l_cost, l_note) if (l_cost > 0 or (l_cost == 0 and l_note != "1층 이하")) else None
 
-    for loc_type, floor_key, method_key, sky_hours_key in [
-        ("출발지", 'from_floor', 'from_method', 'sky_hours_from'),
-        ("도착지", 'to_floor', 'to_method', 'sky_hours_final')]:
-        floor_num, method = get_floor_num(state_data.get(floor_key)), state_data.get(method_key)
+    def _sky_item(self, sky_h):
+        s_cost = self.sky_base + self.sky_extra * (sky_h - 1)
+        return (self.sky_name, s_cost,
+                f"{self.loc_type}({sky_h}h): 기본 {self.sky_base:,.0f}" + (f" + 추가 {self.sky_extra*(sky_h-1):,.0f}" if sky_h > 1 else ""))
+
+    def apply(self, ctx):
+        method, floor, sky_hours, vehicle = self.read(ctx.values)
         if method == "사다리차 🪜":
-            l_cost, l_note = get_ladder_cost(floor_num, selected_vehicle)
-            if l_cost > 0 or (l_cost == 0 and l_note != "1층 이하"): cost_items.append((f"{loc_type} 사다리차", l_cost, l_note)); cost_before_add_charges += l_cost
+            if floor.__class__ is not str: # 숫자 1과 1.0은 층 해석이 달라 문자열만 기억
+                item = self._ladder_item(floor, vehicle)
+            else:
+                try: item = self.ladder_items[floor, vehicle]
+                except KeyError: item = _remember(self.ladder_items, (floor, vehicle), self._ladder_item(floor, vehicle))
+            if item:
+                ctx.cost_items.append(item); ctx.subtotal += item[1]
+                return item[1]
         elif method == "스카이 🏗️":
-            sky_h = max(1, int(state_data.get(sky_hours_key, 1) or 1))
-            s_base, s_extra = getattr(data, 'SKY_BASE_PRICE',0), getattr(data, 'SKY_EXTRA_HOUR_PRICE',0)
-            s_cost = s_base + s_extra * (sky_h - 1)
-            s_note = f"{loc_type}({sky_h}h): 기본 {s_base:,.0f}" + (f" + 추가 {s_extra*(sky_h-1):,.0f}" if sky_h > 1 else "")
-            cost_items.append((f"{loc_type} 스카이 장비", s_cost, s_note)); cost_before_add_charges += s_cost
-    
-    add_m, add_w = int(state_data.get('add_men',0) or 0), int(state_data.get('add_women',0) or 0)
-    add_person_cost_unit = getattr(data, 'ADDITIONAL_PERSON_COST', 0)
-    
-    actual_removed_hw = False
-    if current_move_type == "가정 이사 🏠" and state_data.get('remove_base_housewife', False) and base_women > 0:
-        discount = -add_person_cost_unit * base_women
-        cost_items.append(("기본 여성 인원 제외 할인", discount, f"여 {base_women}명 제외"))
-        cost_before_add_charges += discount
-        actual_removed_hw = True
-        
-    manual_added_total_cost = (add_m + add_w) * add_person_cost_unit
-    if manual_added_total_cost > 0:
-        cost_items.append(("추가 인력", manual_added_total_cost, f"남{add_m}, 여{add_w}"))
-        cost_before_add_charges += manual_added_total_cost
-
-    adj_amount = int(state_data.get('adjustment_amount',0) or 0)
-    if adj_amount != 0: cost_items.append((f"{'할증' if adj_amount > 0 else '할인'} 조정 금액", adj_amount, "수동입력")); cost_before_add_charges += adj_amount
-
-    if is_storage:
-        s_dur, s_type = max(1, int(state_data.get('storage_duration',1) or 1)), state_data.get('storage_type', getattr(data,'DEFAULT_STORAGE_TYPE',"정보없음"))
-        s_daily_rate = getattr(data,'STORAGE_RATES_PER_DAY',{}).get(s_type,0)
-        if s_daily_rate > 0:
-            s_base_cost, s_elec_surcharge = s_daily_rate * s_dur, 0
-            s_note = f"{s_type}, {s_dur}일"
-            if state_data.get('storage_use_electricity', False):
-                s_elec_surcharge = getattr(data,'STORAGE_ELECTRICITY_SURCHARGE_PER_DAY',3000) * s_dur
-                s_note += ", 전기사용"
-            s_final_cost = s_base_cost + s_elec_surcharge
-            cost_items.append(("보관료", s_final_cost, s_note)); cost_before_add_charges += s_final_cost
-        else: cost_items.append(("오류", 0, f"보관유형({s_type}) 요금정보 없음"))
-
-    if state_data.get('apply_long_distance', False):
-        ld_sel = state_data.get('long_distance_selector')
-        if ld_sel and ld_sel != "선택 안 함":
-            ld_cost = getattr(data,'long_distance_prices',{}).get(ld_sel,0)
-            if ld_cost > 0: cost_items.append(("장거리 운송료", ld_cost, ld_sel)); cost_before_add_charges += ld_cost
-            
-    if state_data.get('has_waste_check', False):
-        w_tons = max(0.5, float(state_data.get('waste_tons_input',0.5) or 0.5))
-        w_cost_ton = getattr(data,'WASTE_DISPOSAL_COST_PER_TON',0)
-        w_cost = w_cost_ton * w_tons
-        cost_items.append(("폐기물 처리", w_cost, f"{w_tons:.1f}톤 기준")); cost_before_add_charges += w_cost
-
-    dt_surcharge, dt_notes = 0, []
-    dt_opts, dt_prices = ["이사많은날 🏠","손없는날 ✋","월말 📅","공휴일 🎉","금요일 📅"], getattr(data,'special_day_prices',{})
-    for i, opt in enumerate(dt_opts):
-        if state_data.get(f"date_opt_{i}_widget", False):
-            s = dt_prices.get(opt,0); 
-            if s > 0: dt_surcharge += s; dt_notes.append(opt.split(" ")[0])
-    if dt_surcharge > 0: cost_items.append(("날짜 할증", dt_surcharge, ", ".join(dt_notes))); cost_before_add_charges += dt_surcharge
-    
-    reg_ladder_surcharge = int(state_data.get('regional_ladder_surcharge',0) or 0)
-    if reg_ladder_surcharge > 0: cost_items.append(("지방 사다리 추가요금", reg_ladder_surcharge, "수동입력")); cost_before_add_charges += reg_ladder_surcharge
-    
-    if has_via_point:
-        via_s = int(state_data.get('via_point_surcharge',0) or 0)
-        if via_s > 0: cost_items.append(("경유지 추가요금", via_s, "수동입력")); cost_before_add_charges += via_s
-
-    # --- VAT 및 카드 수수료 계산 ---
-    current_total_cost = cost_before_add_charges # 순수 비용 합계로 시작
-
-    if state_data.get('issue_tax_invoice', False):
-        vat = math.ceil(cost_before_add_charges * 0.1) # 원금 기준 VAT
-        cost_items.append(("부가세 (10%)", vat, "세금계산서 발행 요청"))
-        current_total_cost += vat
-    
-    if state_data.get('card_payment', False):
+            sky_h = _int_at_least_one(sky_hours)
+            try: item = self.sky_items[sky_h]
+            except KeyError: item = _remember(self.sky_items, sky_h, self._sky_item(sky_h))
+            ctx.cost_items.append(item); ctx.subtotal += item[1]
+            return item[1]
+        return 0
+
+class HousewifeDiscountRule(PricingRule):
+    name = "기본 여성 인원 제외 할인"
+    fields = (('base_move_type', None), ('remove_base_housewife', False))
+    guard = 'remove_base_housewife'
+
+    def __init__(self, person_cost):
+        self.person_cost = person_cost
+
+    def apply(self, ctx):
+        _, remove_housewife = self.read(ctx.values)
+        if ctx.move_type == "가정 이사 🏠" and remove_housewife and ctx.base_women > 0:
+            ctx.removed_housewife = True
+            return ctx.add_item("기본 여성 인원 제외 할인", -self.person_cost * ctx.base_women, f"여 {ctx.base_women}명 제외")
+        return 0
+
+class AdditionalPersonnelRule(PricingRule):
+    """추가 인원 (입력값 쌍별 결과는 처음 계산할 때 기억해 둡니다. int()로 바꿔 쓰므로 1 / 1.0 / True는 같은 결과)."""
+    name = "추가 인력"
+    fields = (('add_men', 0), ('add_women', 0))
+
+    def __init__(self, person_cost):
+        self.person_cost = person_cost
+        self.memo = {}
+
+    def _personnel(self, add_men, add_women):
+        """(남, 여, 비용 항목 또는 None)."""
+        add_men, add_women = _int_or_zero(add_men), _int_or_zero(add_women)
+        manual_added_total_cost = (add_men + add_women) * self.person_cost
+        item = ("추가 인력", manual_added_total_cost, f"남{add_men}, 여{add_women}") if manual_added_total_cost > 0 else None
+        return add_men, add_women, item
+
+    def apply(self, ctx):
+        added = self.read(ctx.values)
+        if not added[0] and not added[1]: return 0 # 둘 다 0명 (ctx 기본값 그대로)
+        try: ctx.add_men, ctx.add_women, item = self.memo[added]
+        except KeyError: ctx.add_men, ctx.add_women, item = _remember(self.memo, added, self._personnel(*added))
+        except TypeError: ctx.add_men, ctx.add_women, item = self._personnel(*added) # 해시할 수 없는 값
+        if not item: return 0
+        ctx.cost_items.append(item); ctx.subtotal += item[1]
+        return item[1]
+
+class ManualAmountRule(PricingRule):
+    """수동 입력 금액 (조정 금액, 지방 사다리 추가요금, 경유지 추가요금). 금액이 비어 있거나 0이면 항목 없음."""
+
+    def __init__(self, name, amount_key, allow_negative=False, condition_key=None):
+        self.name, self.allow_negative, self.has_condition = name, allow_negative, condition_key is not None
+        self.fields = ((amount_key, 0),) + (((condition_key, False),) if condition_key else ())
+        self.guard = condition_key or amount_key
+        self.surcharge_name, self.discount_name = f"할증 {name}", f"할인 {name}"
+
+    def apply(self, ctx):
+        values = self.read(ctx.values)
+        if self.has_condition and not values[1]: return 0
+        amount = _int_or_zero(values[0])
+        if self.allow_negative and amount != 0:
+            return ctx.add_item(self.surcharge_name if amount > 0 else self.discount_name, amount, "수동입력")
+        if not self.allow_negative and amount > 0: return ctx.add_item(self.name, amount, "수동입력")
+        return 0
+
+class StorageRule(PricingRule):
+    name = "보관료"
+    typed_fields = ('storage_type',)
+    guard = 'is_storage_move'
+
+    def __init__(self, daily_rates, default_type, electricity_per_day):
+        self.daily_rates, self.default_type, self.electricity_per_day = daily_rates, default_type, electricity_per_day
+        self.fields = (('is_storage_move', False), ('storage_duration', 1), ('storage_type', default_type),
+                       ('storage_use_electricity', False))
+
+    def apply(self, ctx):
+        if not ctx.is_storage: return 0
+        _, duration, s_type, use_electricity = self.read(ctx.values)
+        s_dur = _int_at_least_one(duration)
+        s_daily_rate = self.daily_rates.get(s_type,0)
+        if s_daily_rate <= 0:
+            ctx.cost_items.append(("오류", 0, f"보관유형({s_type}) 요금정보 없음"))
+            return 0
+        s_base_cost, s_elec_surcharge = s_daily_rate * s_dur, 0
+        s_note = f"{s_type}, {s_dur}일"
+        if use_electricity:
+            s_elec_surcharge = self.electricity_per_day * s_dur
+            s_note += ", 전기사용"
+        return ctx.add_item("보관료", s_base_cost + s_elec_surcharge, s_note)
+
+class LongDistanceRule(PricingRule):
+    name = "장거리 운송료"
+    fields = (('apply_long_distance', False), ('long_distance_selector', None))
+    typed_fields = ('long_distance_selector',)
+    guard = 'apply_long_distance'
+
+    def __init__(self, long_distance_prices):
+        self.long_distance_prices = long_distance_prices
+
+    def _long_distance_cost(self, ld_sel):
+        return self.long_distance_prices.get(ld_sel,0) if ld_sel and ld_sel != "선택 안 함" else 0
+
+    def apply(self, ctx):
+        apply_long_distance, ld_sel = self.read(ctx.values)
+        if not apply_long_distance: return 0
+        ld_cost = self._long_distance_cost(ld_sel)
+        if ld_cost > 0: return ctx.add_item("장거리 운송료", ld_cost, ld_sel)
+        return 0
+
+class WasteRule(PricingRule):
+    name = "폐기물 처리"
+    fields = (('has_waste_check', False), ('waste_tons_input', 0.5))
+    guard = 'has_waste_check'
+
+    def __init__(self, cost_per_ton):
+        self.cost_per_ton = cost_per_ton
+        self.memo = {} # 톤수 입력값 → 비용 항목 (float()로 바꿔 쓰므로 1 / 1.0 / True는 같은 결과)
+
+    def _waste_item(self, tons):
+        w_tons = _waste_tons(tons)
+        return ("폐기물 처리", self.cost_per_ton * w_tons, f"{w_tons:.1f}톤 기준")
+
+    def apply(self, ctx):
+        has_waste, tons = self.read(ctx.values)
+        if not has_waste: return 0
+        try: item = self.memo[tons]
+        except KeyError: item = _remember(self.memo, tons, self._waste_item(tons))
+        except TypeError: item = self._waste_item(tons) # 해시할 수 없는 값
+        ctx.cost_items.append(item); ctx.subtotal += item[1]
+        return item[1]
+
+class DateSurchargeRule(PricingRule):
+    name = "날짜 할증"
+
+    def __init__(self, special_day_prices):
+        # (옵션 번호, 표시 이름, 할증액) — 할증액이 0인 옵션은 컴파일 시 제외
+        self.options = tuple((i, opt.split(" ")[0], special_day_prices.get(opt,0))
+                             for i, opt in enumerate(DATE_SURCHARGE_OPTIONS) if special_day_prices.get(opt,0) > 0)
+        self.fields = tuple((f"date_opt_{i}_widget", False) for i in range(len(DATE_SURCHARGE_OPTIONS)))
+        # 체크 조합(True/False)별 비용 항목(할증이 없으면 None)을 미리 만들어 둡니다
+        self.by_selection = {selected: self._surcharge_item(selected)
+                             for selected in itertools.product((False, True), repeat=len(DATE_SURCHARGE_OPTIONS))}
+
+    def _surcharge_item(self, selected):
+        dt_surcharge, dt_notes = 0, []
+        for i, label, surcharge in self.options:
+            if selected[i]: dt_surcharge += surcharge; dt_notes.append(label)
+        return ("날짜 할증", dt_surcharge, ", ".join(dt_notes)) if dt_surcharge > 0 else None
+
+    def apply(self, ctx):
+        selected = self.read(ctx.values)
+        try: item = self.by_selection[selected]
+        except (KeyError, TypeError): item = self._surcharge_item(selected) # bool이 아닌 값이 섞인 경우
+        if not item: return 0
+        ctx.cost_items.append(item); ctx.subtotal += item[1]
+        return item[1]
+
+class VatRule(PricingRule):
+    name = "부가세 (10%)"
+    fields = (('issue_tax_invoice', False),)
+    guard = 'issue_tax_invoice'
+
+    def apply(self, ctx):
+        issue_tax_invoice, = self.read(ctx.values)
+        if not issue_tax_invoice: return 0
+        vat = math.ceil(ctx.subtotal * VAT_RATE) # 원금 기준 VAT
+        ctx.cost_items.append(("부가세 (10%)", vat, "세금계산서 발행 요청"))
+        ctx.total += vat
+        return vat
+
+class CardFeeRule(PricingRule):
+    name = "카드결제 수수료 (13%)"
+    fields = (('card_payment', False),)
+    guard = 'card_payment'
+
+    def apply(self, ctx):
+        card_payment, = self.read(ctx.values)
+        if not card_payment: return 0
         # 카드수수료는 (원금 + VAT가 이미 적용된) 금액에 대해 부과
-        card_fee = math.ceil(current_total_cost * 0.13) 
-        cost_items.append(("카드결제 수수료 (13%)", card_fee, "카드 결제 요청"))
-        current_total_cost += card_fee
-    # --- VAT 및 카드 수수료 계산 완료 ---
+        card_fee = math.ceil(ctx.total * CARD_FEE_RATE)
+        ctx.cost_items.append(("카드결제 수수료 (13%)", card_fee, "카드 결제 요청"))
+        ctx.total += card_fee
+        return card_fee
 
-    final_men = base_men + add_m
-    final_women = add_w if actual_removed_hw else (base_women + add_w)
+def compile_pricing_pipeline(ladder_table):
+    """
+    data 모듈의 현재 가격 테이블로 규칙 목록을 만듭니다. (조회 테이블과 함께 다시 만들어짐)
+    모든 규칙이 읽는 state 키를 field_order로 정렬하고, 각 규칙이 그 순서의 값 튜플에서 자기 값을 바로 꺼내도록 연결합니다.
+    """
+    person_cost = getattr(data, 'ADDITIONAL_PERSON_COST', 0)
+    sky_base, sky_extra = getattr(data, 'SKY_BASE_PRICE',0), getattr(data, 'SKY_EXTRA_HOUR_PRICE',0)
+    base_rules = (
+        BaseFareRule(getattr(data, 'vehicle_prices', {}) or {}),
+        LocationEquipmentRule("출발지", 'from_floor', 'from_method', 'sky_hours_from', ladder_table, sky_base, sky_extra),
+        LocationEquipmentRule("도착지", 'to_floor', 'to_method', 'sky_hours_final', ladder_table, sky_base, sky_extra),
+        HousewifeDiscountRule(person_cost),
+        AdditionalPersonnelRule(person_cost),
+        ManualAmountRule("조정 금액", 'adjustment_amount', allow_negative=True),
+        StorageRule(getattr(data,'STORAGE_RATES_PER_DAY',{}), getattr(data,'DEFAULT_STORAGE_TYPE',"정보없음"),
+                    getattr(data,'STORAGE_ELECTRICITY_SURCHARGE_PER_DAY',3000)),
+        LongDistanceRule(getattr(data,'long_distance_prices',{})),
+        WasteRule(getattr(data,'WASTE_DISPOSAL_COST_PER_TON',0)),
+        DateSurchargeRule(getattr(data,'special_day_prices',{})),
+        ManualAmountRule("지방 사다리 추가요금", 'regional_ladder_surcharge'),
+        ManualAmountRule("경유지 추가요금", 'via_point_surcharge', condition_key='has_via_point'),
+    )
+    # VAT/카드 수수료는 앞 규칙들의 합계(subtotal)를 기준으로 붙습니다.
+    final_rules = (VatRule(), CardFeeRule())
+    field_defaults = {}
+    for rule in base_rules + final_rules:
+        for key, default in rule.fields:
+            if field_defaults.setdefault(key, default) != default:
+                raise ValueError(f"가격 규칙들이 state 키 {key!r}의 기본값을 다르게 선언했습니다.")
+    field_order = tuple(sorted(field_defaults))
+    field_slots = {key: slot for slot, key in enumerate(field_order)}
+    for rule in base_rules + final_rules:
+        rule.bind(field_slots)
+    # trace 없이 실행할 때 쓰는 (guard 위치 또는 None, bound method) 목록
+    steps = lambda rules: tuple((field_slots[rule.guard] if rule.guard else None, rule.apply) for rule in rules)
+    typed_slots = sorted({field_slots[key] for rule in base_rules + final_rules for key in rule.typed_fields})
+    return {"rules": base_rules + final_rules, "base_rules": base_rules, "final_rules": final_rules,
+            "base_steps": steps(base_rules), "final_steps": steps(final_rules),
+            "read_context": operator.itemgetter(*(field_slots[key] for key, _ in BaseFareRule.fields)),
+            "read_typed_values": operator.itemgetter(*typed_slots),
+            "fields": frozenset(field_order), "field_order": field_order, "field_slots": field_slots,
+            "field_defaults": tuple(field_defaults[key] for key in field_order)}
+
+def get_pricing_pipeline():
+    """컴파일된 가격 규칙 파이프라인 {"rules", "base_rules", "final_rules", "base_steps", "final_steps", "read_context",
+    "read_typed_values", "fields", "field_order", "field_slots", "field_defaults"}."""
+    return _pricing_tables()["pipeline"]
+
+def pricing_state_values(state_data, pipeline=None):
+    """state에서 파이프라인이 읽는 값만 field_order 순서의 튜플로 꺼냅니다 (키가 없으면 규칙이 선언한 기본값)."""
+    pipeline = pipeline or get_pricing_pipeline()
+    return tuple(map(state_data.get, pipeline["field_order"], pipeline["field_defaults"]))
+
+def _run_traced_rules(rules, ctx, trace):
+    for rule in rules:
+        started = time.perf_counter()
+        amount = rule.apply(ctx)
+        trace.append({"rule": rule.name, "amount": amount, "elapsed_ms": (time.perf_counter() - started) * 1000})
+
+def _run_pricing_pipeline(values, pipeline, trace=None):
+    """values: pricing_state_values()의 튜플."""
+    ctx = PricingContext(values, pipeline["read_context"])
+    try:
+        if trace is None:
+            for guard, apply in pipeline["base_steps"]:
+                if guard is None or values[guard]: apply(ctx)
+        else:
+            _run_traced_rules(pipeline["base_rules"], ctx, trace)
+    except PricingAbort as abort:
+        return 0, [("오류", 0, str(abort))], {}
+    ctx.total = ctx.subtotal # 순수 비용 합계로 시작
+    if trace is None:
+        for guard, apply in pipeline["final_steps"]:
+            if guard is None or values[guard]: apply(ctx)
+    else:
+        _run_traced_rules(pipeline["final_rules"], ctx, trace)
 
     personnel_info = {
-        'base_men': base_men, 'base_women': base_women,
-        'manual_added_men': add_m, 'manual_added_women': add_w,
-        'final_men': final_men, 'final_women': final_women,
-        'removed_base_housewife': actual_removed_hw 
+        'base_men': ctx.base_men, 'base_women': ctx.base_women,
+        'manual_added_men': ctx.add_men, 'manual_added_women': ctx.add_women,
+        'final_men': ctx.base_men + ctx.add_men,
+        'final_women': ctx.add_women if ctx.removed_housewife else (ctx.base_women + ctx.add_women),
+        'removed_base_housewife': ctx.removed_housewife
     }
-    return max(0, round(current_total_cost)), cost_items, personnel_info
\ No newline at end of file
+    return max(0, round(ctx.total)), ctx.cost_items, personnel_info
+
+# --- 견적 비용 캐시 ---
+# 키는 가격 테이블 버전 + 파이프라인 규칙이 읽는 state 필드 값입니다. 값은 규칙과 같은 기본값을 적용해 읽고
+# (키가 없는 경우와 None을 구분), 규칙의 typed_fields 값은 타입도 키에 넣어 1 / 1.0 / True를 다른 키로 봅니다
+# (나머지 필드는 int()/float()/참거짓으로만 쓰므로 같은 결과).
+# 파이프라인은 키 값 튜플만 읽으므로 키가 같으면 결과도 항상 같습니다.
+# 모듈 전역이므로 같은 프로세스의 모든 세션이 공유합니다 (적중률은 get_quote_cost_cache_info()).
+QUOTE_COST_CACHE_SIZE = 1024
+
+@functools.lru_cache(maxsize=QUOTE_COST_CACHE_SIZE)
+def _cached_quote_cost(version, values, typed_value_types):
+    return _run_pricing_pipeline(values, _PRICING_TABLES["pipeline"])
+
+def calculate_total_moving_cost(state_data):
+    tables = _pricing_tables()
+    pipeline = tables["pipeline"]
+    values = tuple(map(state_data.get, pipeline["field_order"], pipeline["field_defaults"]))
+    try:
+        total_cost, cost_items, personnel_info = _cached_quote_cost(
+            tables["version"], values, tuple(map(type, pipeline["read_typed_values"](values))))
+    except TypeError: # 해시할 수 없는 값이 섞인 경우 캐시 없이 계산
+        return _run_pricing_pipeline(values, pipeline)
+    return total_cost, list(cost_items), dict(personnel_info) # 호출 측에서 수정해도 캐시는 그대로
+
+def get_quote_cost_cache_info():
+    """견적 비용 캐시 상태 {"hits", "misses", "hit_rate", "size", "maxsize", "pricing_version"}."""
+    info = _cached_quote_cost.cache_info()
+    lookups = info.hits + info.misses
+    return {"hits": info.hits, "misses": info.misses, "hit_rate": info.hits / lookups if lookups else 0.0,
+            "size": info.currsize, "maxsize": info.maxsize, "pricing_version": _PRICING_TABLES["version"]}
+
+def clear_quote_cost_cache():
+    _cached_quote_cost.cache_clear()
+
+def trace_total_moving_cost(state_data):
+    """
+    calculate_total_moving_cost와 같은 결과에 규칙별 기여 금액/실행 시간 목록을 덧붙여 반환합니다.
+    반환: (total_cost, cost_items, personnel_info, [{"rule", "amount", "elapsed_ms"}, ...])
+    """
+    trace = []
+    pipeline = get_pricing_pipeline()
+    total_cost, cost_items, personnel_info = _run_pricing_pipeline(pricing_state_values(state_data, pipeline), pipeline, trace)
+    return total_cost, cost_items, personnel_info, trace
+
+# --- 차량 x 날짜 할증 조합별 비교 견적 (what-if) ---
+def calculate_price_matrix(state_data, vehicles=None):
+    """
+    현재 견적 조건에서 차량(행)과 날짜 할증 옵션 조합(열)별 총 견적 비용을 한 번에 계산합니다.
+    차량별로 날짜 할증 이전 금액만 파이프라인으로 구하고, 할증/VAT/카드 수수료는 행렬 연산으로 적용합니다.
+    반환: {"vehicles", "date_combinations"(옵션 이름 튜플), "totals"(행: 차량, 계산 불가 차량은 None)}
+    """
+    tables = _pricing_tables()
+    pipeline = tables["pipeline"]
+    if vehicles is None:
+        vehicles = get_available_trucks(state_data.get('base_move_type'))
+    date_keys = [f"date_opt_{i}_widget" for i in range(len(DATE_SURCHARGE_OPTIONS))]
+    special_day_prices = getattr(data, 'special_day_prices', {}) or {}
+    date_prices = [special_day_prices.get(opt, 0) for opt in DATE_SURCHARGE_OPTIONS]
+    combinations = list(itertools.product((False, True), repeat=len(DATE_SURCHARGE_OPTIONS)))
+    surcharges = [sum(price for flag, price in zip(combo, date_prices) if flag and price > 0) for combo in combinations]
+
+    field_slots = pipeline["field_slots"]
+    values = list(pricing_state_values(state_data, pipeline))
+    for key in date_keys: values[field_slots[key]] = False
+    subtotals = []
+    for vehicle in vehicles:
+        values[field_slots['final_selected_vehicle']] = vehicle
+        ctx = PricingContext(tuple(values), pipeline["read_context"])
+        try:
+            for rule in pipeline["base_rules"]: rule.apply(ctx)
+            subtotals.append(ctx.subtotal)
+        except PricingAbort:
+            subtotals.append(None)
+
+    issue_tax_invoice, card_payment = state_data.get('issue_tax_invoice', False), state_data.get('card_payment', False)
+    valid_rows = [idx for idx, subtotal in enumerate(subtotals) if subtotal is not None]
+    totals = [None] * len(subtotals)
+    if valid_rows and _NUMPY_AVAILABLE:
+        grid = np.array([subtotals[idx] for idx in valid_rows], dtype=float)[:, None] + np.array(surcharges, dtype=float)[None, :]
+        if issue_tax_invoice: grid = grid + np.ceil(grid * VAT_RATE)
+        if card_payment: grid = grid + np.ceil(grid * CARD_FEE_RATE)
+        grid = np.maximum(0, np.round(grid)).astype(np.int64)
+        for row_idx, idx in enumerate(valid_rows): totals[idx] = grid[row_idx].tolist()
+    else:
+        for idx in valid_rows:
+            row = []
+            for surcharge in surcharges:
+                total = subtotals[idx] + surcharge
+                if issue_tax_invoice: total += math.ceil(total * VAT_RATE)
+                if card_payment: total += math.ceil(total * CARD_FEE_RATE)
+                row.append(max(0, round(total)))
+            totals[idx] = row
+
+    return {
+        "vehicles": list(vehicles),
+        "date_combinations": [tuple(opt for flag, opt in zip(combo, DATE_SURCHARGE_OPTIONS) if flag) for combo in combinations],
+        "totals": totals,
+    }
+
@@ -2,6 +2,9 @@
 import streamlit as st
 import traceback # Added for error logging
 
+import perf_monitor # 콜백별 소요 시간 측정
+import session_recorder # 세션 이벤트 기록 (기록 중인 세션만)
+
 # Import necessary custom modules
 try:
     import data
@@ -13,6 +16,9 @@ except ImportError as ie:
     if 'calculations' not in globals():
         class DummyCalculations:
             def calculate_total_volume_weight(self, s, m): return 0.0, 0.0
+            def calculate_item_totals(self, s, m): return 0.0, 0.0, {}
+            def get_item_catalog(self, m): return None
+            def get_basket_assignments(self, m, v): return {}
             def recommend_vehicle(self, v, w, m): return None, 0.0
         calculations = DummyCalculations()
     if 'data' not in globals(): data = None
@@ -22,12 +28,29 @@ except Exception as e:
     if 'calculations' not in globals():
         class DummyCalculationsOnError:
             def calculate_total_volume_weight(self, s, m): return 0.0, 0.0
+            def calculate_item_totals(self, s, m): return 0.0, 0.0, {}
+            def get_item_catalog(self, m): return None
+            def get_basket_assignments(self, m, v): return {}
             def recommend_vehicle(self, v, w, m): return None, 0.0
         calculations = DummyCalculationsOnError()
     if 'data' not in globals(): data = None
 
+try:
+    import session_journal # 로컬 작업 기록 (선택 기능)
+except Exception as e_journal:
+    print(f"WARNING [callbacks]: 세션 저널 사용 불가 - {e_journal}")
+    session_journal = None
+
+try:
+    import autosave # Drive 자동 저장 (선택 기능)
+except Exception as e_autosave:
+    print(f"WARNING [callbacks]: 자동 저장 사용 불가 - {e_autosave}")
+    autosave = None
+
 # --- Callback Functions ---
 
+@session_recorder.recorded
+@perf_monitor.timed
 def update_basket_quantities():
     """
     Updates final_selected_vehicle based on current recommendation or manual choice,
@@ -69,79 +92,177 @@ def update_basket_quantities():
     # # # # print(f"DEBUG CB: final_selected_vehicle SET TO: '{st.session_state.final_selected_vehicle}'")
 
     # --- Update basket quantities based on the definitive final_selected_vehicle ---
-    vehicle_for_baskets = st.session_state.final_selected_vehicle # 이 값을 사용
-    basket_section_name = "포장 자재 📦"
+    # (이사 유형, 차량)별 바구니 수량 배정(기본값에 없는 품목은 0)을 미리 만들어 둔 표에서 가져와 한 번에 반영
+    basket_assignments = calculations.get_basket_assignments(current_move_type, st.session_state.final_selected_vehicle)
+    if basket_assignments: st.session_state.update(basket_assignments)
 
-    item_defs_for_move_type = {}
-    if hasattr(data, 'item_definitions') and data and current_move_type in data.item_definitions:
-        item_defs_for_move_type = data.item_definitions[current_move_type]
+    # # # # print("DEBUG CB: --- update_basket_quantities END ---\n")
 
-    defined_basket_items = []
-    if isinstance(item_defs_for_move_type, dict):
-        defined_basket_items = item_defs_for_move_type.get(basket_section_name, [])
 
-    if not hasattr(data, 'default_basket_quantities') or not data:
-        # # # # print("ERROR CB: data.default_basket_quantities not found or data module issue.")
-        for item_name in defined_basket_items:
-            st.session_state[f"qty_{current_move_type}_{basket_section_name}_{item_name}"] = 0
-        return
+# 마지막 전체 계산 시점의 품목 수량과 (반올림 전) 합계. 이후에는 바뀐 키의 차이만 반영합니다.
+ITEM_TOTALS_TRACKER_KEY = "_item_totals_tracker"
 
-    if vehicle_for_baskets and vehicle_for_baskets in data.default_basket_quantities:
-        basket_defaults = data.default_basket_quantities[vehicle_for_baskets]
-        # # # # print(f"DEBUG CB: Baskets - Using defaults for '{vehicle_for_baskets}': {basket_defaults}")
-        for item_name, qty in basket_defaults.items():
-            if item_name in defined_basket_items:
-                key = f"qty_{current_move_type}_{basket_section_name}_{item_name}"
-                st.session_state[key] = qty
-                # # # # print(f"DEBUG CB: Baskets - Set {key} = {qty}")
-        # Zero out any defined basket items not in this vehicle's defaults
-        for defined_item in defined_basket_items:
-            if defined_item not in basket_defaults:
-                key_to_zero = f"qty_{current_move_type}_{basket_section_name}_{defined_item}"
-                st.session_state[key_to_zero] = 0
-                # # # # print(f"DEBUG CB: Baskets - Zeroed {key_to_zero} (not in vehicle defaults)")
-    else: # 차량이 없거나, 있어도 기본 바구니 수량 정보가 없는 경우 모든 바구니 0으로
-        # # # # print(f"DEBUG CB: Baskets - No valid vehicle ('{vehicle_for_baskets}') for defaults or no defaults defined. Setting all defined baskets to 0.")
-        for item_name in defined_basket_items:
-            key_to_zero = f"qty_{current_move_type}_{basket_section_name}_{item_name}"
-            st.session_state[key_to_zero] = 0
-            # # # # print(f"DEBUG CB: Baskets - Zeroed {key_to_zero}")
+def _recalculate_item_totals(current_move_type):
+    """Full recompute of volume/weight; stores the per-key snapshot used by later delta updates."""
+    vol_raw, wt_raw, quantities = calculations.calculate_item_totals(st.session_state, current_move_type)
+    st.session_state[ITEM_TOTALS_TRACKER_KEY] = {
+        "move_type": current_move_type, "quantities": quantities,
+        "volume": vol_raw, "weight": wt_raw,
+    }
+    return round(vol_raw, 2), round(wt_raw, 2)
 
-    # # # # print("DEBUG CB: --- update_basket_quantities END ---\n")
+def _apply_item_delta(current_move_type, changed_keys):
+    """
+    Applies only the volume/weight difference of changed_keys (plus the few basket keys,
+    which update_basket_quantities writes without firing on_change).
+    Returns None when no valid snapshot exists, so the caller falls back to a full recompute.
+    """
+    tracker = st.session_state.get(ITEM_TOTALS_TRACKER_KEY)
+    if not tracker or tracker.get("move_type") != current_move_type:
+        return None
+    catalog = calculations.get_item_catalog(current_move_type)
+    if not catalog:
+        return None
+
+    snapshot = tracker["quantities"]
+    for key in tuple(changed_keys) + catalog["basket_keys"]:
+        spec = catalog["specs"].get(key)
+        if spec is None: continue
+        new_qty = calculations.coerce_item_quantity(st.session_state.get(key))
+        old_qty = snapshot.get(key, 0)
+        if new_qty != old_qty:
+            tracker["volume"] += (new_qty - old_qty) * spec[0]
+            tracker["weight"] += (new_qty - old_qty) * spec[1]
+            snapshot[key] = new_qty
+    return round(tracker["volume"], 2), round(tracker["weight"], 2)
 
+# 추천 조합으로 자동 입력한 실제 투입 차량 값 {state key: 넣은 대수}. 사용자가 고친 칸은 다시 덮어쓰지 않습니다.
+FLEET_AUTOFILL_KEY = "_fleet_autofilled"
 
-def handle_item_update():
+def _update_recommended_fleet(vol, wt, current_move_type, rec_vehicle):
+    """
+    When the load exceeds the largest truck, finds the cheapest combination of dispatchable
+    trucks (data.DISPATCH_VEHICLE_KEYS) and prefills the dispatched_* fields that are still 0
+    or still hold the previous auto-filled count. When the load fits again, auto-filled counts
+    that were not edited are reset to 0; manual entries are never touched.
+    """
+    fleet = None
+    dispatch_keys = getattr(data, 'DISPATCH_VEHICLE_KEYS', {}) or {}
+    if rec_vehicle and "초과" in rec_vehicle and dispatch_keys and hasattr(calculations, 'optimize_fleet'):
+        fleet = calculations.optimize_fleet(vol, wt, current_move_type, vehicles=tuple(dispatch_keys))
+    st.session_state.recommended_fleet_auto = fleet
+
+    autofilled = st.session_state.get(FLEET_AUTOFILL_KEY) or {}
+    still_auto = {key for key, count in autofilled.items() if st.session_state.get(key, 0) == count}
+    if fleet:
+        filled = {}
+        for truck, state_key in dispatch_keys.items():
+            if state_key in still_auto or not st.session_state.get(state_key, 0):
+                filled[state_key] = fleet["trucks"].get(truck, 0)
+        st.session_state.update(filled)
+        st.session_state[FLEET_AUTOFILL_KEY] = filled
+    elif autofilled:
+        st.session_state.update({key: 0 for key in still_auto})
+        st.session_state.pop(FLEET_AUTOFILL_KEY, None)
+
+@session_recorder.recorded
+@perf_monitor.timed
+def handle_item_update(changed_key=None):
     """
     Callback for item quantity changes or move type changes.
-    Recalculates totals, recommends a vehicle, then calls update_basket_quantities.
+    With changed_key (a qty_ widget key, or a tuple of keys) only those items' deltas are applied;
+    without it (move type switch, state load) totals are recomputed from scratch.
+    Then recommends a vehicle and calls update_basket_quantities.
     """
     # # # # print("DEBUG CB: handle_item_update CALLED")
     try:
         current_move_type = st.session_state.get('base_move_type', MOVE_TYPE_OPTIONS[0] if MOVE_TYPE_OPTIONS else "가정 이사 🏠")
         if not current_move_type or not calculations or not data:
             #st.warning("실시간 업데이트 콜백: 필수 정보(이사 유형, 계산모듈, 데이터모듈) 부족.")
-            st.session_state.update({"total_volume": 0.0, "total_weight": 0.0, "recommended_vehicle_auto": None, "remaining_space": 0.0})
+            st.session_state.update({"total_volume": 0.0, "total_weight": 0.0, "recommended_vehicle_auto": None, "remaining_space": 0.0, "recommended_fleet_auto": None})
+            st.session_state.pop(ITEM_TOTALS_TRACKER_KEY, None)
             if callable(update_basket_quantities): update_basket_quantities()
             return
 
-        vol, wt = calculations.calculate_total_volume_weight(st.session_state.to_dict(), current_move_type)
+        changed_keys = (changed_key,) if isinstance(changed_key, str) else changed_key
+        totals = _apply_item_delta(current_move_type, changed_keys) if changed_keys else None
+        vol, wt = totals if totals is not None else _recalculate_item_totals(current_move_type)
         st.session_state.total_volume = vol
         st.session_state.total_weight = wt
 
         rec_vehicle, rem_space = calculations.recommend_vehicle(vol, wt, current_move_type)
         st.session_state.recommended_vehicle_auto = rec_vehicle
         st.session_state.remaining_space = rem_space
+        _update_recommended_fleet(vol, wt, current_move_type, rec_vehicle)
         # # # # print(f"DEBUG CB (handle_item_update): Recalculated: Vol={vol}, Wt={wt}, RecVehicle='{rec_vehicle}'")
     except Exception as e:
         st.error(f"실시간 업데이트 중 계산 오류: {e}")
         traceback.print_exc() # 오류 발생 시 상세 로그
-        st.session_state.update({"total_volume": 0.0, "total_weight": 0.0, "recommended_vehicle_auto": None, "remaining_space": 0.0})
+        st.session_state.update({"total_volume": 0.0, "total_weight": 0.0, "recommended_vehicle_auto": None, "remaining_space": 0.0, "recommended_fleet_auto": None})
+        st.session_state.pop(ITEM_TOTALS_TRACKER_KEY, None)
 
     if callable(update_basket_quantities):
         update_basket_quantities()
     # # # # print("DEBUG CB: handle_item_update FINISHED")
 
 
+def handle_quote_loaded():
+    """
+    update_basket_callback for state_manager.load_state_from_data: the loaded dispatched_* counts
+    are the saved quote's own values, so they are no longer treated as auto-filled.
+    """
+    st.session_state.pop(FLEET_AUTOFILL_KEY, None)
+    handle_item_update()
+
+
+# --- 파생값(부피/무게/추천 차량/바구니) 지연 계산 ---
+# 위젯 콜백은 무엇이 바뀌었는지만 표시(dirty)하고, 계산은 app.py가 실행 시작 시
+# ensure_derived_state로 한 번만 합니다. 여러 변경이 한 번의 실행에 몰려도 계산은 한 번입니다.
+DERIVED_DIRTY_KEY = "_derived_dirty"
+
+def _derived_dirty():
+    dirty = st.session_state.get(DERIVED_DIRTY_KEY)
+    if dirty is None:
+        dirty = st.session_state[DERIVED_DIRTY_KEY] = {"full": False, "keys": []}
+    return dirty
+
+@session_recorder.recorded
+@perf_monitor.timed
+def mark_items_dirty(changed_key=None):
+    """on_change 콜백: 바뀐 품목 키만 기록합니다. changed_key가 없으면 전체 재계산으로 표시합니다."""
+    dirty = _derived_dirty()
+    if changed_key is None: dirty["full"] = True
+    elif changed_key not in dirty["keys"]: dirty["keys"].append(changed_key)
+
+@session_recorder.recorded
+@perf_monitor.timed
+def commit_item_batch():
+    """
+    품목 일괄 입력 폼의 '적용' 버튼 콜백: 폼의 수량이 모두 반영된 뒤, 마지막 계산 시점의 수량(ITEM_TOTALS_TRACKER_KEY)과
+    달라진 키만 증분 계산하도록 예약합니다. 기준 수량이 없거나 이사 유형이 바뀌었으면 전체 재계산을 예약합니다.
+    """
+    current_move_type = st.session_state.get('base_move_type')
+    tracker = st.session_state.get(ITEM_TOTALS_TRACKER_KEY)
+    catalog = calculations.get_item_catalog(current_move_type) if tracker and tracker.get("move_type") == current_move_type else None
+    if not catalog:
+        mark_items_dirty()
+        return
+    snapshot, basket_keys = tracker["quantities"], frozenset(catalog["basket_keys"]) # 바구니 키는 _apply_item_delta가 항상 확인
+    changed_keys = [key for key in catalog["keys"] if key not in basket_keys
+                    and calculations.coerce_item_quantity(st.session_state.get(key)) != snapshot.get(key, 0)]
+    if not changed_keys: return
+    dirty = _derived_dirty()
+    dirty["keys"].extend(key for key in changed_keys if key not in dirty["keys"])
+
+def ensure_derived_state():
+    """표시된 변경이 있으면 파생값을 한 번 계산합니다 (실행당 최대 1회). 계산했으면 True."""
+    dirty = st.session_state.pop(DERIVED_DIRTY_KEY, None)
+    if not dirty: return False
+    handle_item_update(None if dirty["full"] else tuple(dirty["keys"]))
+    return True
+
+@session_recorder.recorded
+@perf_monitor.timed
 def sync_move_type(widget_key):
     """Syncs base_move_type across tabs and triggers item update for recalculations."""
     # # # # print(f"DEBUG CB: sync_move_type CALLED with widget_key='{widget_key}'")
@@ -159,12 +280,55 @@ def sync_move_type(widget_key):
             other_key = 'base_move_type_widget_tab3' if widget_key == 'base_move_type_widget_tab1' else 'base_move_type_widget_tab1'
             if other_key in st.session_state: st.session_state[other_key] = new_value
 
-            if callable(handle_item_update):
-                # # # # print("DEBUG CB (sync_move_type): Calling handle_item_update due to move type change.")
-                handle_item_update()
+            # 이번 실행 시작 시 ensure_derived_state에서 전체 재계산
+            mark_items_dirty()
 
+@session_recorder.recorded
+@perf_monitor.timed
 def update_selected_gdrive_id():
     selected_name = st.session_state.get("gdrive_selected_filename_widget")
     if selected_name and 'gdrive_file_options_map' in st.session_state:
         st.session_state.gdrive_selected_file_id = st.session_state.gdrive_file_options_map.get(selected_name)
-        st.session_state.gdrive_selected_filename = selected_name
\ No newline at end of file
+        st.session_state.gdrive_selected_filename = selected_name
+
+
+# --- 부분 재실행 (st.fragment) ---
+# 품목 입력(탭 2)과 비용 패널(탭 3)은 fragment로 그려서, 그 안의 위젯이 바뀌면 그 부분만 다시 실행합니다.
+# st.fragment가 없는 Streamlit 버전에서는 일반 함수로 실행됩니다 (항상 전체 실행).
+_st_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+APP_RUN_SERIAL_KEY = "_app_run_serial"
+
+def as_fragment(func):
+    return _st_fragment(func) if callable(_st_fragment) else func
+
+def begin_app_run():
+    """app.py가 전체 실행을 시작할 때 호출합니다. fragment가 전체 실행인지 부분 재실행인지 구분하는 데 씁니다."""
+    st.session_state[APP_RUN_SERIAL_KEY] = st.session_state.get(APP_RUN_SERIAL_KEY, 0) + 1
+
+def is_fragment_rerun(fragment_name):
+    """이번 실행이 해당 fragment만 다시 실행한 것이면 True. (fragment 본문 시작에서 한 번 호출)"""
+    seen_key = f"_fragment_run_{fragment_name}"
+    serial = st.session_state.get(APP_RUN_SERIAL_KEY, 0)
+    fragment_rerun = st.session_state.get(seen_key) == serial
+    st.session_state[seen_key] = serial
+    return fragment_rerun
+
+def persist_session_state():
+    """
+    현재 견적을 로컬 저널에 기록하고, 자동 저장이 켜져 있으면 Drive 저장을 예약합니다.
+    app.py 실행 끝과 fragment 부분 재실행 끝에서 호출합니다. (직전과 내용이 같으면 둘 다 아무것도 하지 않음)
+    """
+    if session_journal is not None:
+        try: session_journal.record_session_state(st.session_state)
+        except Exception as e: print(f"WARNING [callbacks]: 세션 저널 기록 실패 - {e}")
+
+    if autosave is not None and st.session_state.get(autosave.AUTOSAVE_ENABLED_KEY):
+        try:
+            service_account_info = dict(st.secrets.get("gcp_service_account", {})) # 작업 스레드는 st.secrets를 읽지 않음
+            autosave.schedule_session_save(
+                st.session_state,
+                folder_id=service_account_info.get("drive_folder_id"),
+                encoding=st.secrets.get("quote_save_encoding", "json"),
+                service_account_info=service_account_info or None,
+            )
+        except Exception as e: print(f"WARNING [callbacks]: 자동 저장 예약 실패 - {e}")
@@ -115,6 +115,10 @@ SKY_BASE_PRICE = 300000
 SKY_EXTRA_HOUR_PRICE = 70000
 LOADING_EFFICIENCY = 0.90 # Applied in calculations.py
 
+# --- 실제 투입 차량 입력 필드 (차량 이름 → session_state 키) ---
+# 물량이 최대 차량을 초과하면 calculations.optimize_fleet 결과가 이 필드들에 채워집니다.
+DISPATCH_VEHICLE_KEYS = {"1톤": "dispatched_1t", "2.5톤": "dispatched_2_5t", "3.5톤": "dispatched_3_5t", "5톤": "dispatched_5t"}
+
 # --- 기본 바구니 수량 (트럭 크기별) ---
 # Key: 트럭 이름 (vehicle_specs 키와 일치해야 함)
 # Value: {"바구니": 개수, "중자바구니": 개수, "책바구니": 개수}
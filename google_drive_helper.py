@@ -10,8 +10,19 @@ import json
 import os # 이름 분리 등에 여전히 필요할 수 있음
 # import time # 고유 파일명 찾기 지연 불필요
 import traceback # 오류 로깅 위해 유지
+import utils # 견적 파일 인코딩 (JSON/gzip/msgpack)
 
 # === Authentication and Service Object Creation ===
+DRIVE_SCOPES = ["https://www.googleapis.com/auth/drive"]
+
+def build_drive_service(service_account_info):
+    """
+    서비스 계정 정보(딕셔너리)로 Drive 클라이언트를 만듭니다. Streamlit을 쓰지 않으므로 백그라운드 스레드에서도 쓸 수 있습니다.
+    (클라이언트는 스레드 간에 공유하지 말고 스레드마다 만드세요)
+    """
+    creds = service_account.Credentials.from_service_account_info(service_account_info, scopes=DRIVE_SCOPES)
+    return build("drive", "v3", credentials=creds)
+
 @st.cache_resource # Cache the service object for efficiency
 def get_drive_service():
     """Connects to Google Drive API using service account credentials."""
@@ -19,12 +30,7 @@ def get_drive_service():
         if "gcp_service_account" not in st.secrets:
             st.error("Streamlit Secrets에 'gcp_service_account' 정보가 설정되지 않았습니다.")
             st.stop()
-        creds_json = st.secrets["gcp_service_account"]
-        creds = service_account.Credentials.from_service_account_info(
-            creds_json,
-            scopes=["https://www.googleapis.com/auth/drive"]
-        )
-        return build("drive", "v3", credentials=creds)
+        return build_drive_service(st.secrets["gcp_service_account"])
     except KeyError:
         st.error("Streamlit Secrets에 'gcp_service_account' 정보가 설정되지 않았습니다.")
         st.stop()
@@ -71,7 +77,16 @@ def find_file_id_by_exact_name(exact_file_name, folder_id=None):
     """Finds a file ID by its exact name within a specific folder."""
     service = get_drive_service()
     if not service: return None
+    try:
+        return _find_file_id(service, exact_file_name, folder_id)
+    except Exception as e:
+        st.error(f"정확한 파일 검색 오류 ('{exact_file_name}'): {e}")
+        print(f"ERROR [Drive]: Exception during exact file search for '{exact_file_name}': {e}")
+        traceback.print_exc()
+        return None
 
+def _find_file_id(service, exact_file_name, folder_id=None):
+    """find_file_id_by_exact_name의 본체 (Streamlit 없이, 오류는 호출 측으로 전달)."""
     escaped_file_name = exact_file_name.replace("'", "\\'")
     # mimeType 조건을 제거하여 모든 파일 형식을 찾도록 할 수 있음 (JSON 외 파일도 고려 시)
     # query = f"name = '{escaped_file_name}' and mimeType = 'application/json' and trashed = false" # JSON만 검색 시
@@ -80,63 +95,30 @@ def find_file_id_by_exact_name(exact_file_name, folder_id=None):
     if folder_id:
         query += f" and '{folder_id}' in parents"
 
-    try:
-        results = service.files().list(
-            q=query,
-            spaces='drive',
-            fields='files(id, name)',
-            pageSize=1
-        ).execute()
-        items = results.get('files', [])
-        return items[0].get('id') if items else None
-    except Exception as e:
-        st.error(f"정확한 파일 검색 오류 ('{exact_file_name}'): {e}")
-        print(f"ERROR [Drive]: Exception during exact file search for '{exact_file_name}': {e}")
-        traceback.print_exc()
-        return None
+    results = service.files().list(
+        q=query,
+        spaces='drive',
+        fields='files(id, name)',
+        pageSize=1
+    ).execute()
+    items = results.get('files', [])
+    return items[0].get('id') if items else None
 
 # === find_unique_drive_filename 함수 제거 ===
 
 # === save_image_file 함수 제거 ===
 
 # === JSON Save/Load (기존 로직 유지) ===
-def save_json_file(file_name, data_dict, folder_id=None):
-    """Saves a dictionary as a JSON file on Google Drive (Overwrites if exists)."""
+def save_json_file(file_name, data_dict, folder_id=None, encoding="json"):
+    """
+    Saves a dictionary as a JSON file on Google Drive (Overwrites if exists).
+    encoding: "json"(기본, 들여쓰기 없음) / "gzip" / "msgpack" — 파일명 확장자는 호출 측에서 utils.quote_file_name으로 맞춥니다.
+    """
     service = get_drive_service()
     if not service: return None
 
     try:
-        # JSON 파일만 대상으로 찾도록 mimeType 지정 (선택적)
-        existing_file_id = find_file_id_by_exact_name(file_name, folder_id=folder_id)
-
-        json_string = json.dumps(data_dict, ensure_ascii=False, indent=2)
-        json_bytes = json_string.encode('utf-8')
-        fh = io.BytesIO(json_bytes)
-        # JSON 업로드는 application/json mime type 사용
-        media = MediaIoBaseUpload(fh, mimetype="application/json", resumable=True)
-        file_metadata = {"name": file_name} # Mime type은 여기서 지정 안해도 Drive가 추론 가능
-
-        if folder_id: file_metadata["parents"] = [folder_id]
-
-        if existing_file_id:
-            print(f"DEBUG [Drive]: Updating existing JSON file: '{file_name}' (ID: {existing_file_id})")
-            updated_file = service.files().update(
-                fileId=existing_file_id,
-                media_body=media,
-                fields="id, name"
-            ).execute()
-            return {'id': existing_file_id, 'name': updated_file.get('name'), 'status': 'updated'}
-        else:
-            print(f"DEBUG [Drive]: Creating new JSON file: '{file_name}'")
-            # 새로 생성 시에는 mimeType 명시
-            file_metadata["mimeType"] = "application/json"
-            created_file = service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields="id, name"
-            ).execute()
-            return {'id': created_file.get("id"), 'name': created_file.get('name'), 'status': 'created'}
-
+        return upload_json_file(service, file_name, data_dict, folder_id=folder_id, encoding=encoding)
     except Exception as e:
          st.error(f"JSON 저장/업데이트 실패 ('{file_name}'): {e}")
          print(f"ERROR [Drive]: Failed to save/update JSON '{file_name}': {e}")
@@ -144,12 +126,45 @@ def save_json_file(file_name, data_dict, folder_id=None):
          return None
 
 
+def upload_json_file(service, file_name, data_dict, folder_id=None, encoding="json"):
+    """
+    save_json_file의 본체. 이미 만든 Drive 클라이언트로 저장하며 Streamlit을 쓰지 않고, 오류는 호출 측으로 전달합니다
+    (자동 저장 스레드용). 반환: {'id', 'name', 'status': 'updated' 또는 'created'}
+    """
+    # JSON 파일만 대상으로 찾도록 mimeType 지정 (선택적)
+    existing_file_id = _find_file_id(service, file_name, folder_id=folder_id)
+
+    payload_bytes, mime_type = utils.encode_json_payload(data_dict, encoding)
+    fh = io.BytesIO(payload_bytes)
+    media = MediaIoBaseUpload(fh, mimetype=mime_type, resumable=True)
+    file_metadata = {"name": file_name} # Mime type은 여기서 지정 안해도 Drive가 추론 가능
+
+    if folder_id: file_metadata["parents"] = [folder_id]
+
+    if existing_file_id:
+        print(f"DEBUG [Drive]: Updating existing JSON file: '{file_name}' (ID: {existing_file_id})")
+        updated_file = service.files().update(
+            fileId=existing_file_id,
+            media_body=media,
+            fields="id, name"
+        ).execute()
+        return {'id': existing_file_id, 'name': updated_file.get('name'), 'status': 'updated'}
+    print(f"DEBUG [Drive]: Creating new JSON file: '{file_name}'")
+    # 새로 생성 시에는 mimeType 명시
+    file_metadata["mimeType"] = mime_type
+    created_file = service.files().create(
+        body=file_metadata,
+        media_body=media,
+        fields="id, name"
+    ).execute()
+    return {'id': created_file.get("id"), 'name': created_file.get('name'), 'status': 'created'}
+
 def load_json_file(file_id):
-    """Loads and parses a JSON file from Google Drive."""
-    json_string = download_json_file(file_id)
-    if json_string:
-        try: return json.loads(json_string)
-        except json.JSONDecodeError as e:
+    """Loads and parses a JSON file from Google Drive. (gzip/msgpack으로 저장된 파일도 내용으로 판별해 읽음)"""
+    file_bytes = download_file_bytes(file_id)
+    if file_bytes:
+        try: return utils.decode_json_payload(file_bytes)
+        except ValueError as e:
             st.error(f"불러온 파일(ID: {file_id})을 JSON으로 파싱하는 데 실패했습니다: {e}")
             return None
     return None
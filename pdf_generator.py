@@ -1,6 +1,5 @@
 # pdf_generator.py
 
-import pandas as pd
 import io
 import streamlit as st
 import traceback
@@ -454,6 +453,7 @@ def generate_excel(state_data, calculated_cost_items, total_cost, personnel_info
     경유지 정보 추가
     """
     print("--- DEBUG [Excel Summary]: Starting generate_excel function ---")
+    import pandas as pd # Excel 요약에서만 필요 (PDF 생성은 pandas를 불러오지 않음)
     output = io.BytesIO()
     try:
         # --- 기본 정보 준비 ---
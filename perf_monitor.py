@@ -0,0 +1,269 @@
+# perf_monitor.py (화면 실행 시간 측정 — 디버그용)
+# 화면이 다시 그려질 때마다 탭/구역/콜백별 소요 시간을 측정합니다.
+# 측정은 세션별로 켭니다 (주소 뒤에 ?perf=1). 꺼진 세션에서는 시간만 재고 버리므로 비용이 거의 없습니다.
+# 결과는 사이드바의 디버그 패널에 표시되고, 로컬 JSONL 로그에 실행마다 한 줄씩 추가됩니다 (크기 제한 후 교체).
+# 느린 실행을 함수 단위로 보려면 ?profile=N 으로 다음 N회 전체 실행을 cProfile로 수집합니다 (.prof 파일 + 요약).
+import cProfile
+import functools
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import streamlit as st
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PERF_LOG_PATH = os.environ.get("QUOTE_PERF_LOG_PATH") or os.path.join(BASE_DIR, "metrics", "perf_metrics.jsonl")
+PERF_LOG_MAX_BYTES = 5 * 1024 * 1024 # 이 크기를 넘으면 .1, .2, ... 로 밀어내고 새 파일에 기록
+PERF_LOG_BACKUPS = 3
+PERF_ENABLED_KEY = "perf_monitor_enabled"
+PERF_HISTORY_KEY = "_perf_history"  # 세션의 최근 실행 측정 기록 (디버그 패널용)
+PERF_HISTORY_SIZE = 20
+PERF_SESSION_ID_KEY = "_perf_session_id"
+PERF_QUERY_PARAM = "perf"
+PROFILE_DIR = os.environ.get("QUOTE_PROFILE_DIR") or os.path.join(BASE_DIR, "metrics", "profiles")
+PROFILE_QUERY_PARAM = "profile"
+PROFILE_RUNS_KEY = "_profile_runs_remaining" # 이 세션에서 앞으로 프로파일할 전체 실행 횟수
+PROFILE_RESULTS_KEY = "_profile_results"     # 최근 프로파일 요약 (사이드바 표시용)
+PROFILE_MAX_RUNS = 20
+PROFILE_KEEP_RESULTS = 5
+PROFILE_TOP_N = 25
+_MAX_PENDING_CALLBACKS = 200
+
+# Streamlit은 세션의 스크립트(콜백 포함)를 한 스레드에서 실행하므로 측정 상태는 스레드별로 둡니다.
+_local = threading.local()
+_log_lock = threading.Lock()
+# 프로파일러(cProfile)는 프로세스 전체에 하나만 켤 수 있으므로 (Python 3.12+는 sys.monitoring 도구 ID 하나를 씀)
+# 여러 세션이 동시에 요청하면 한 실행만 프로파일하고 나머지는 그냥 실행합니다.
+_profile_lock = threading.Lock()
+
+def _current_run():
+    return getattr(_local, "run", None)
+
+def enable_from_query_params(session_state, query_params):
+    """
+    주소의 ?perf=1 / ?perf=0 으로 이 세션의 측정을 켜고 끄고, ?profile=N 으로 다음 N회 실행의 프로파일을 요청합니다.
+    처리한 파라미터는 주소에서 지웁니다 (새로고침해도 다시 적용되지 않도록).
+    """
+    value = query_params.get(PERF_QUERY_PARAM)
+    if value is not None:
+        session_state[PERF_ENABLED_KEY] = value not in ("0", "false", "off")
+        try: del query_params[PERF_QUERY_PARAM]
+        except Exception: pass
+    runs = query_params.get(PROFILE_QUERY_PARAM)
+    if runs is not None:
+        try: request_profiling(session_state, int(runs) if runs.strip() else 1)
+        except ValueError: print(f"WARNING [perf_monitor]: 잘못된 profile 값 - {runs!r}")
+        try: del query_params[PROFILE_QUERY_PARAM]
+        except Exception: pass
+
+def begin_run(session_state, scope="app"):
+    """
+    한 번의 실행 측정을 시작합니다 (app.py 시작, 또는 fragment 부분 재실행 시작).
+    실행 직전에 돌았던 콜백의 측정값은 이번 실행 기록에 붙입니다. 측정이 꺼진 세션이면 버립니다.
+    """
+    pending = getattr(_local, "pending_callbacks", None) or []
+    _local.pending_callbacks = []
+    if not session_state.get(PERF_ENABLED_KEY):
+        _local.run = None
+        return
+    if PERF_SESSION_ID_KEY not in session_state: session_state[PERF_SESSION_ID_KEY] = uuid.uuid4().hex[:12]
+    now = time.perf_counter()
+    _local.run = {"scope": scope, "session": session_state[PERF_SESSION_ID_KEY], "started_at": time.time(),
+                  "t0": now, "cursor": now, "depth": 0, "sections": [], "callbacks": pending}
+
+def _add_section(run, name, started, ended):
+    run["sections"].append({"name": name, "depth": run["depth"],
+                            "at_ms": round((started - run["t0"]) * 1000, 3), "ms": round((ended - started) * 1000, 3)})
+    run["cursor"] = ended
+
+@contextmanager
+def section(name):
+    """with 블록의 소요 시간을 name 구역으로 기록합니다. 구역 안의 구역은 한 단계 들여써서 표시됩니다."""
+    run = _current_run()
+    if run is None:
+        yield
+        return
+    started = run["cursor"] = time.perf_counter()
+    run["depth"] += 1
+    try:
+        yield
+    finally:
+        run["depth"] -= 1
+        _add_section(run, name, started, time.perf_counter())
+
+def checkpoint(name):
+    """직전 측정 지점(구역 시작/끝 또는 checkpoint)부터 지금까지를 name 구역으로 기록합니다. 긴 코드 구간을 들여쓰기 없이 잴 때 사용."""
+    run = _current_run()
+    if run is None: return
+    _add_section(run, name, run["cursor"], time.perf_counter())
+
+def timed(func=None, *, name=None):
+    """콜백 함수의 소요 시간을 기록하는 데코레이터. 스크립트 실행 전에 돈 콜백은 다음 begin_run에서 실행 기록에 붙습니다."""
+    def decorate(f):
+        label = name or f"callback.{f.__name__}"
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                entry = {"name": label, "ms": round((time.perf_counter() - started) * 1000, 3)}
+                run = _current_run()
+                if run is not None:
+                    run["callbacks"].append(entry)
+                else:
+                    pending = getattr(_local, "pending_callbacks", None)
+                    if pending is None: pending = _local.pending_callbacks = []
+                    if len(pending) < _MAX_PENDING_CALLBACKS: pending.append(entry)
+        return wrapper
+    return decorate(func) if func is not None else decorate
+
+def end_run(session_state):
+    """실행 측정을 마치고 세션 기록과 로컬 로그에 남깁니다. 기록(dict)을 반환하며, 측정 중이 아니었으면 None."""
+    run = _current_run()
+    _local.run = None
+    if run is None: return None
+    record = {
+        "ts": round(run["started_at"], 3), "session": run["session"], "scope": run["scope"],
+        "total_ms": round((time.perf_counter() - run["t0"]) * 1000, 3),
+        "sections": sorted(run["sections"], key=lambda s: s["at_ms"]),
+        "callbacks": run["callbacks"],
+    }
+    session_state[PERF_HISTORY_KEY] = ((session_state.get(PERF_HISTORY_KEY) or []) + [record])[-PERF_HISTORY_SIZE:]
+    append_log(record)
+    return record
+
+def _rotate_log(path):
+    for index in range(PERF_LOG_BACKUPS - 1, 0, -1):
+        if os.path.exists(f"{path}.{index}"): os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+    os.replace(path, f"{path}.1")
+
+def append_log(record, path=None):
+    """측정 기록을 JSONL 로그에 한 줄 추가합니다. 파일이 PERF_LOG_MAX_BYTES를 넘으면 먼저 교체합니다."""
+    path = path or PERF_LOG_PATH
+    line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+    with _log_lock:
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            if os.path.exists(path) and os.path.getsize(path) + len(line) > PERF_LOG_MAX_BYTES: _rotate_log(path)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            print(f"WARNING [perf_monitor]: 측정 로그 기록 실패 - {e}")
+
+def render_debug_panel(session_state):
+    """측정이 켜진 세션에서만 사이드바에 최근 실행의 구역/콜백별 소요 시간을 표시합니다."""
+    if not session_state.get(PERF_ENABLED_KEY): return
+    with st.sidebar.expander("⏱️ 실행 시간 측정", expanded=True):
+        st.checkbox("측정 켜기 (끄면 패널이 사라집니다. 다시 켜려면 주소 뒤에 ?perf=1)", key=PERF_ENABLED_KEY)
+        history = session_state.get(PERF_HISTORY_KEY) or []
+        if not history:
+            st.caption("아직 측정된 실행이 없습니다.")
+            return
+        last = history[-1]
+        st.markdown(f"**마지막 실행 ({last['scope']}): {last['total_ms']:,.1f} ms**")
+        st.dataframe([{"구역": "　" * s["depth"] + s["name"], "ms": s["ms"]} for s in last["sections"]],
+                     hide_index=True, use_container_width=True)
+        if last["callbacks"]:
+            st.dataframe([{"콜백": c["name"], "ms": c["ms"]} for c in last["callbacks"]], hide_index=True, use_container_width=True)
+        st.caption("최근 실행(ms): " + ", ".join(f"{r['scope'].replace('fragment:', '↻')} {r['total_ms']:.0f}" for r in history[-10:]))
+        st.caption(f"로그: {PERF_LOG_PATH}")
+
+# --- cProfile 수집 ---
+def request_profiling(session_state, runs):
+    """이 세션의 다음 runs회 전체 실행을 프로파일합니다 (0이면 취소, 최대 PROFILE_MAX_RUNS)."""
+    session_state[PROFILE_RUNS_KEY] = max(0, min(int(runs), PROFILE_MAX_RUNS))
+
+def run_maybe_profiled(func, session_state):
+    """
+    프로파일 요청이 남아 있으면 func(app.py의 본문)를 cProfile로 실행하고 .prof 파일과 요약을 남깁니다. 아니면 그냥 실행합니다.
+    (콜백과 fragment 부분 재실행은 포함되지 않습니다. 콜백 시간은 측정 패널에서 확인하세요.)
+    """
+    remaining = session_state.get(PROFILE_RUNS_KEY) or 0
+    if remaining <= 0: return func()
+    if not _profile_lock.acquire(blocking=False): # 요청은 남겨 두고 다음 실행에서 다시 시도
+        print("INFO [perf_monitor]: 다른 세션이 프로파일 중이라 이번 실행은 프로파일하지 않습니다.")
+        return func()
+    session_state[PROFILE_RUNS_KEY] = remaining - 1
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e: # 다른 프로파일러/디버거가 이미 켜져 있음 (요청 1회는 소진)
+        _profile_lock.release()
+        print(f"WARNING [perf_monitor]: 프로파일러를 켤 수 없어 이번 실행은 프로파일하지 않습니다 - {e}")
+        return func()
+    started = time.perf_counter()
+    try:
+        return func()
+    finally: # st.rerun()/st.stop()으로 중간에 끝나도 수집한 만큼 저장
+        profiler.disable()
+        _profile_lock.release()
+        _save_profile(profiler, session_state, time.perf_counter() - started)
+
+def _function_label(key):
+    filename, line, func_name = key
+    if filename.startswith(BASE_DIR + os.sep): filename = os.path.relpath(filename, BASE_DIR)
+    elif filename != "~": filename = os.path.basename(filename)
+    return f"{func_name} ({filename}:{line})" if filename != "~" else func_name
+
+def summarize_profile(stats, top_n=PROFILE_TOP_N):
+    """
+    {"project": 이 앱 모듈의 함수(누적 시간 순), "hotspots": 전체 함수(자체 시간 순)} — 각 항목은
+    {"function", "calls", "self_ms", "cumulative_ms"} 목록입니다.
+    """
+    entries = [(key, calls, self_time, cumulative) for key, (_cc, calls, self_time, cumulative, _callers) in stats.stats.items()]
+    def rows(selected, sort_index):
+        selected = sorted(selected, key=lambda entry: entry[sort_index], reverse=True)[:top_n]
+        return [{"function": _function_label(key), "calls": calls, "self_ms": round(self_time * 1000, 2),
+                 "cumulative_ms": round(cumulative * 1000, 2)} for key, calls, self_time, cumulative in selected]
+    project = [entry for entry in entries
+               if entry[0][0].startswith(BASE_DIR + os.sep) and "site-packages" not in entry[0][0]]
+    return {"project": rows(project, 3), "hotspots": rows(entries, 2)}
+
+def _save_profile(profiler, session_state, elapsed):
+    if PERF_SESSION_ID_KEY not in session_state: session_state[PERF_SESSION_ID_KEY] = uuid.uuid4().hex[:12]
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(PROFILE_DIR, f"run_{stamp}_{session_state[PERF_SESSION_ID_KEY]}_{uuid.uuid4().hex[:4]}.prof")
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profiler.dump_stats(path)
+    except OSError as e:
+        print(f"WARNING [perf_monitor]: 프로파일 저장 실패 - {e}")
+        path = None
+    stats = pstats.Stats(profiler)
+    result = {"ts": round(time.time(), 3), "path": path, "elapsed_ms": round(elapsed * 1000, 1),
+              "total_calls": stats.total_calls, **summarize_profile(stats)}
+    session_state[PROFILE_RESULTS_KEY] = ((session_state.get(PROFILE_RESULTS_KEY) or []) + [result])[-PROFILE_KEEP_RESULTS:]
+    return result
+
+def _request_profiling_from_widget():
+    request_profiling(st.session_state, st.session_state.get("_profile_runs_input", 1))
+
+def render_profile_panel(session_state):
+    """프로파일 요청(측정이 켜진 세션)과 최근 프로파일 요약을 사이드바에 표시합니다."""
+    results = session_state.get(PROFILE_RESULTS_KEY) or []
+    if not session_state.get(PERF_ENABLED_KEY) and not results: return
+    with st.sidebar.expander("🔬 cProfile", expanded=bool(results)):
+        remaining = session_state.get(PROFILE_RUNS_KEY) or 0
+        if session_state.get(PERF_ENABLED_KEY):
+            st.number_input("프로파일할 실행 횟수", min_value=1, max_value=PROFILE_MAX_RUNS, value=3, key="_profile_runs_input")
+            st.button("다음 실행부터 프로파일", on_click=_request_profiling_from_widget)
+        if remaining: st.caption(f"남은 프로파일 실행: {remaining}회")
+        if not results:
+            st.caption("아직 수집된 프로파일이 없습니다. (주소 뒤에 ?profile=3 으로도 요청할 수 있습니다)")
+            return
+        last = results[-1]
+        st.markdown(f"**마지막 프로파일: {last['elapsed_ms']:,.0f} ms, 함수 호출 {last['total_calls']:,}회**")
+        st.caption("앱 모듈 (누적 시간 순)")
+        st.dataframe(last["project"], hide_index=True, use_container_width=True)
+        st.caption("전체 함수 (자체 시간 순)")
+        st.dataframe(last["hotspots"], hide_index=True, use_container_width=True)
+        if last["path"] and os.path.exists(last["path"]):
+            with open(last["path"], "rb") as f:
+                st.download_button("⬇️ .prof 다운로드", f.read(), file_name=os.path.basename(last["path"]),
+                                   mime="application/octet-stream")
+            st.caption(f"파일: {last['path']} (snakeviz, python -m pstats 등으로 열 수 있습니다)")
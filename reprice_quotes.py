@@ -0,0 +1,88 @@
+# reprice_quotes.py (저장된 견적 JSON 일괄 재계산)
+# 사용법: python reprice_quotes.py <견적 JSON 폴더> [-o 결과.csv] [--pattern "*.json"]
+# (기본으로 .json / .json.gz / .msgpack 견적 파일을 모두 읽습니다)
+# 현재 data.py 가격표로 폴더 안의 모든 견적을 다시 계산해 총액/인원/비용 항목을 CSV로 저장합니다.
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+import calculations
+import state_manager
+import utils
+
+SUMMARY_KEYS = ["customer_name", "customer_phone", "moving_date", "base_move_type", "final_selected_vehicle"]
+
+def _quote_file_paths(folder, pattern=None):
+    patterns = [pattern] if pattern else [f"*{ext}" for ext, _mime in utils.QUOTE_FILE_ENCODINGS.values()]
+    return sorted({path for p in patterns for path in glob.glob(os.path.join(folder, p))})
+
+def load_quote_files(folder, pattern=None):
+    """폴더의 견적 파일을 읽어 ([파일명], [state]) 를 반환합니다. 읽을 수 없는 파일은 건너뜁니다."""
+    file_names, states = [], []
+    for path in _quote_file_paths(folder, pattern):
+        try:
+            with open(path, "rb") as f:
+                loaded_data = utils.decode_json_payload(f.read())
+        except (OSError, ValueError) as e:
+            print(f"[건너뜀] {os.path.basename(path)}: {e}", file=sys.stderr)
+            continue
+        if not isinstance(loaded_data, dict):
+            print(f"[건너뜀] {os.path.basename(path)}: 견적 데이터 형식이 아닙니다.", file=sys.stderr)
+            continue
+        file_names.append(os.path.basename(path))
+        states.append(state_manager.build_pricing_state_from_saved(loaded_data))
+    return file_names, states
+
+def reprice_state(state):
+    """
+    견적 하나를 현재 가격표로 다시 계산합니다 (화면과 같은 calculate_total_moving_cost).
+    반환: (total_cost, cost_items, personnel_info, error) — error는 저장된 값을 변환할 수 없어 계산이 실패한 경우의 메시지.
+    """
+    try:
+        total_cost, cost_items, personnel_info = calculations.calculate_total_moving_cost(state)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        return 0, [("오류", 0, f"계산 오류: {error}")], {}, error
+    return total_cost, cost_items, personnel_info, None
+
+def reprice_folder(folder, pattern=None):
+    file_names, states = load_quote_files(folder, pattern)
+    results = [reprice_state(state) for state in states]
+    summary = pd.DataFrame([{key: state.get(key) for key in SUMMARY_KEYS} for state in states], columns=SUMMARY_KEYS)
+    summary.insert(0, "file", file_names)
+    summary["total_cost"] = [total_cost for total_cost, _, _, _ in results]
+    summary["final_men"] = [info.get("final_men") for _, _, info, _ in results]
+    summary["final_women"] = [info.get("final_women") for _, _, info, _ in results]
+    summary["cost_items"] = [json.dumps(items, ensure_ascii=False) for _, items, _, _ in results]
+    summary["error"] = [error for _, _, _, error in results]
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="저장된 견적 JSON 파일을 현재 가격표로 일괄 재계산합니다.")
+    parser.add_argument("folder", help="견적 JSON 파일이 있는 폴더")
+    parser.add_argument("-o", "--output", help="결과 CSV 경로 (생략 시 요약만 출력)")
+    parser.add_argument("--pattern", default=None, help="읽을 파일 패턴 (기본: *.json, *.json.gz, *.msgpack)")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.folder):
+        parser.error(f"폴더를 찾을 수 없습니다: {args.folder}")
+    started = time.perf_counter()
+    summary = reprice_folder(args.folder, args.pattern)
+    elapsed = time.perf_counter() - started
+
+    error_count = int(summary["error"].notna().sum()) if len(summary) else 0
+    print(f"견적 {len(summary)}건 재계산 완료 ({elapsed:.2f}초, 오류 {error_count}건)")
+    if args.output:
+        summary.to_csv(args.output, index=False, encoding="utf-8-sig") # 엑셀에서 한글이 깨지지 않도록 BOM 포함
+        print(f"결과 저장: {args.output}")
+    elif len(summary):
+        print(summary[["file", "customer_name", "final_selected_vehicle", "total_cost", "error"]].to_string(index=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+# session_journal.py (세션 상태 로컬 저널 — SQLite WAL)
+# 화면이 다시 그려질 때마다(위젯 변경마다) 현재 견적을 고객 전화번호별로 로컬 SQLite에 기록합니다.
+# 작업 중 서버 프로세스가 재시작되거나 브라우저가 다른 세션으로 다시 연결돼도,
+# Google Drive를 거치지 않고 전화번호로 마지막 작업 상태를 바로 복구할 수 있습니다.
+# 기록 형식은 Drive 저장과 같은 v2 압축 형식(state_manager.serialize_state_for_save)입니다.
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import state_manager
+import utils
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+JOURNAL_PATH = os.environ.get("QUOTE_JOURNAL_PATH") or os.path.join(BASE_DIR, "journal", "session_journal.sqlite3")
+KEEP_PER_PHONE = 20        # 압축 시 전화번호별로 남길 최근 기록 수
+MAX_AGE_DAYS = 30          # 압축 시 이보다 오래된 기록은 삭제
+COMPACT_EVERY_WRITES = 500 # 프로세스에서 이만큼 기록할 때마다 자동 압축
+SESSION_ID_KEY = "_journal_session_id"
+LAST_HASH_KEY = "_journal_last_hash" # 세션에서 마지막으로 기록한 (전화번호, 내용 해시) — 같으면 다시 기록하지 않음
+
+_CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    phone TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    payload_hash TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_journal_phone ON journal (phone, id);
+"""
+
+# 연결은 경로마다 프로세스에 하나 (Streamlit은 실행(rerun)마다 새 스레드를 쓰므로 스레드별 연결은 재사용되지 않음).
+# 여러 스레드가 같은 연결을 쓰므로 모든 SQL 실행은 _db_lock 안에서 합니다.
+_connections = {}
+_db_lock = threading.Lock()
+_compact_lock = threading.Lock()
+_writes_since_compact = 0
+
+def _connect(path=None):
+    """경로의 공유 연결. _db_lock을 잡은 상태에서 호출합니다."""
+    path = path or JOURNAL_PATH
+    conn = _connections.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # autocommit, 쓰기마다 짧은 트랜잭션. 스레드 간 공유는 _db_lock으로 직렬화
+        conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL") # WAL에서는 커밋된 기록이 프로세스 종료에도 남음
+        conn.executescript(_CREATE_SQL)
+        _connections[path] = conn
+    return conn
+
+def _encode_payload(payload):
+    payload_text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+    return payload_text, hashlib.sha1(payload_text.encode("utf-8")).hexdigest()
+
+def _insert(phone, session_id, payload_text, payload_hash, path=None):
+    global _writes_since_compact
+    with _db_lock:
+        _connect(path).execute(
+            "INSERT INTO journal (phone, session_id, recorded_at, payload_hash, payload) VALUES (?, ?, ?, ?, ?)",
+            (phone, session_id, time.time(), payload_hash, payload_text))
+    with _compact_lock:
+        _writes_since_compact += 1
+        should_compact = _writes_since_compact >= COMPACT_EVERY_WRITES
+        if should_compact: _writes_since_compact = 0
+    if should_compact: compact_journal(path=path)
+
+def record_snapshot(phone, session_id, payload, path=None):
+    """견적 데이터(dict)를 기록합니다. 유효한 전화번호(utils.quote_phone_number)가 아니면 기록하지 않고 False."""
+    phone = utils.quote_phone_number(phone)
+    if not phone: return False # 전화번호가 있어야 나중에 찾을 수 있음
+    _insert(phone, session_id, *_encode_payload(payload), path=path)
+    return True
+
+def record_session_state(session_state, path=None):
+    """
+    현재 세션의 견적을 저널에 기록합니다 (app.py에서 매 실행 끝에 호출).
+    전화번호가 아직 다 입력되지 않았거나(자동 저장과 같은 최소 자릿수) 직전 기록과 내용이 같으면 기록하지 않습니다.
+    기록했으면 True.
+    """
+    phone = utils.quote_phone_number(session_state.get("customer_phone", ""))
+    if not phone: return False
+    session_id = session_state.get(SESSION_ID_KEY)
+    if session_id is None:
+        session_id = session_state[SESSION_ID_KEY] = uuid.uuid4().hex
+    payload_text, payload_hash = _encode_payload(state_manager.serialize_state_for_save(session_state))
+    if session_state.get(LAST_HASH_KEY) == (phone, payload_hash): return False
+    _insert(phone, session_id, payload_text, payload_hash, path=path)
+    session_state[LAST_HASH_KEY] = (phone, payload_hash)
+    return True
+
+def latest_snapshot(phone, path=None):
+    """전화번호의 마지막 기록 (payload dict, 기록 시각 epoch 초). 없으면 None."""
+    phone = utils.quote_phone_number(phone)
+    if not phone: return None
+    with _db_lock:
+        row = _connect(path).execute(
+            "SELECT payload, recorded_at FROM journal WHERE phone = ? ORDER BY id DESC LIMIT 1", (phone,)).fetchone()
+    if row is None: return None
+    return json.loads(row[0]), row[1]
+
+def compact_journal(keep_per_phone=KEEP_PER_PHONE, max_age_days=MAX_AGE_DAYS, path=None):
+    """전화번호별 최근 keep_per_phone건만 남기고, 오래된 기록을 지운 뒤 WAL 파일을 비웁니다. 지운 행 수를 반환합니다."""
+    cutoff = time.time() - max_age_days * 86400
+    with _db_lock: # 트랜잭션 동안 다른 스레드의 기록이 끼어들지 않도록
+        conn = _connect(path)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            deleted = conn.execute("DELETE FROM journal WHERE recorded_at < ?", (cutoff,)).rowcount
+            deleted += conn.execute(
+                "DELETE FROM journal WHERE id IN (SELECT id FROM (SELECT id, ROW_NUMBER() OVER "
+                "(PARTITION BY phone ORDER BY id DESC) AS rn FROM journal) WHERE rn > ?)", (keep_per_phone,)).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return deleted
+
+def journal_stats(path=None):
+    """{"rows", "phones", "path"} — 관리/디버그용."""
+    with _db_lock:
+        rows, phones = _connect(path).execute("SELECT COUNT(*), COUNT(DISTINCT phone) FROM journal").fetchone()
+    return {"rows": rows, "phones": phones, "path": path or JOURNAL_PATH}
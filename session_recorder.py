@@ -0,0 +1,187 @@
+# session_recorder.py (세션 이벤트 기록 — 성능 테스트용 실제 사용 패턴 수집)
+# 켜진 세션에서 화면 실행(rerun)마다 한 줄씩 JSONL로 기록합니다:
+#   이번 실행 전에 사용자가 바꾼 입력값(set), 누른 버튼(click), 호출된 콜백(cb), 실행 소요 시간(ms).
+# 기록은 세션별로 켭니다 (주소 뒤에 ?record=1, 또는 환경 변수 QUOTE_RECORD_SESSIONS=1 이면 모든 세션).
+# 개인 정보(이름, 연락처, 주소 등)는 글자 수만 남기고 가려서 기록합니다.
+# 기록 파일은 benchmarks/replay_session.py 로 AppTest에 다시 입력해 같은 사용 흐름의 실행 시간을 잴 수 있습니다.
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import streamlit as st
+
+import state_manager
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RECORD_DIR = os.environ.get("QUOTE_RECORD_DIR") or os.path.join(BASE_DIR, "metrics", "recordings")
+RECORD_ALL_SESSIONS = os.environ.get("QUOTE_RECORD_SESSIONS") == "1"
+RECORD_ENABLED_KEY = "session_recording_enabled"
+RECORD_PATH_KEY = "_record_path"         # 이 세션의 기록 파일
+RECORD_QUERY_PARAM = "record"
+FORMAT_VERSION = 1
+_SNAPSHOT_KEY = "_record_snapshot"       # 마지막으로 기록한 입력값 (다음 실행에서 바뀐 값만 기록)
+_STEP_KEY = "_record_pending_step"       # 실행 전 콜백 단계에서 모은 변경/콜백
+_STARTED_KEY = "_record_started_at"
+_STEP_INDEX_KEY = "_record_step_index"
+
+# 화면 입력이 아닌 상태 키 (계산 결과, 저장용 사본, Drive 검색 결과 등) — 기록하지 않음
+_NON_WIDGET_KEYS = frozenset([
+    "_app_initialized", "base_move_type", "final_selected_vehicle", "prev_final_selected_vehicle",
+    "recommended_vehicle_auto", "recommended_fleet_auto", "total_volume", "total_weight",
+    "pdf_data_customer", "final_excel_data", "uploaded_image_paths", "gdrive_search_term", "gdrive_search_results",
+    "gdrive_file_options_map", "gdrive_selected_filename", "gdrive_selected_file_id",
+    "tab3_deposit_amount", "tab3_adjustment_amount", "tab3_regional_ladder_surcharge",
+    *(f"tab3_date_opt_{i}_widget" for i in range(5)),
+])
+_EXTRA_WIDGET_KEYS = ("gdrive_search_term_tab1", "gdrive_selected_filename_widget_tab1", "journal_restore_phone_tab1")
+RECORDED_KEYS = tuple(key for key in state_manager.STATE_FIELDS if key not in _NON_WIDGET_KEYS) \
+    + _EXTRA_WIDGET_KEYS + state_manager.ITEM_QTY_KEYS
+BUTTON_KEYS = (
+    "gdrive_search_button_tab1", "load_gdrive_btn_tab1", "journal_restore_btn_tab1", "save_quote_submit_tab1",
+    "item_batch_submit_tab2", "pdf_customer_download_main", "dl_btn_pdf_main", "generate_excel_and_image_main",
+    "dl_btn_excel_final_section", "dl_btn_quote_image_final_section", "email_send_button_main", "mms_send_button_main",
+)
+MASKED_KEYS = frozenset([
+    "customer_name", "customer_phone", "customer_email", "from_location", "to_location", "via_point_location",
+    "special_notes", "gdrive_search_term_tab1", "journal_restore_phone_tab1",
+])
+
+_local = threading.local() # 실행 중 여부, 콜백 중첩 깊이 (콜백은 스크립트 실행 직전에 같은 스레드에서 호출됨)
+
+def mask_value(value):
+    """숫자는 0, '@'/'.'/'-'/공백은 그대로, 나머지 글자는 x로 바꿉니다 (전화번호/이메일 형식과 길이는 유지)."""
+    if not isinstance(value, str): return value
+    return "".join("0" if ch.isdigit() else ch if ch in "@.- " else "x" for ch in value)
+
+def _current_values(session_state):
+    values = {}
+    for key in RECORDED_KEYS:
+        if key in session_state:
+            value = session_state[key]
+            values[key] = mask_value(value) if key in MASKED_KEYS else value
+    return values
+
+def _take_changes(session_state):
+    """마지막 기록 이후 바뀐 입력값 {키: 값}을 반환하고 기준값을 갱신합니다."""
+    current = _current_values(session_state)
+    previous = session_state.get(_SNAPSHOT_KEY) or {}
+    session_state[_SNAPSHOT_KEY] = current
+    return {key: value for key, value in current.items() if key in previous and previous[key] != value}
+
+def enable_from_query_params(session_state, query_params):
+    """주소의 ?record=1 / ?record=0 으로 이 세션의 기록을 켜고 끕니다 (처리한 파라미터는 주소에서 지움)."""
+    value = query_params.get(RECORD_QUERY_PARAM)
+    if value is not None:
+        set_enabled(session_state, value not in ("0", "false", "off"))
+        try: del query_params[RECORD_QUERY_PARAM]
+        except Exception: pass
+    elif RECORD_ALL_SESSIONS and RECORD_ENABLED_KEY not in session_state:
+        set_enabled(session_state, True)
+
+def set_enabled(session_state, enabled):
+    """기록을 켜면 새 기록 파일을 만들고, 지금 입력값 중 기본값과 다른 것을 첫 변경으로 기록합니다."""
+    was_enabled = bool(session_state.get(RECORD_ENABLED_KEY))
+    session_state[RECORD_ENABLED_KEY] = enabled
+    if not enabled or was_enabled: return
+    session_id = uuid.uuid4().hex[:12]
+    path = os.path.join(RECORD_DIR, f"session_{time.strftime('%Y%m%d_%H%M%S')}_{session_id}.jsonl")
+    session_state[RECORD_PATH_KEY] = path
+    session_state[_STARTED_KEY] = time.time()
+    session_state[_STEP_INDEX_KEY] = 0
+    # 중간에 켠 세션도 새 세션에서 재현되도록 기본값을 기준으로 시작 (아직 초기화 전이면 변경 없음)
+    session_state[_SNAPSHOT_KEY] = {
+        key: (state_manager.STATE_FIELDS[key].get_default() if key in state_manager.STATE_FIELDS else
+              "" if key in _EXTRA_WIDGET_KEYS else 0) for key in RECORDED_KEYS}
+    session_state.pop(_STEP_KEY, None)
+    _append(path, {"v": FORMAT_VERSION, "session": session_id, "ts": round(time.time(), 3),
+                   "move_types": list(state_manager.MOVE_TYPE_OPTIONS)})
+
+def _append(path, record):
+    line = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+    except OSError as e:
+        print(f"WARNING [session_recorder]: 기록 실패 - {e}")
+
+def _merge_step(step, changes):
+    if changes: step.setdefault("set", {}).update(changes)
+
+def recorded(func):
+    """
+    콜백 데코레이터. 기록 중인 세션에서 콜백 이름과 인자를 기록합니다.
+    스크립트 실행 전(위젯 콜백)이면 콜백이 상태를 바꾸기 전에 사용자가 바꾼 입력값을 먼저 기록하고,
+    콜백이 바꾼 값은 사용자 입력으로 기록하지 않습니다.
+    """
+    name = func.__name__
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        session = st.session_state
+        if not session.get(RECORD_ENABLED_KEY): return func(*args, **kwargs)
+        # 실행 중이거나 다른 콜백 안에서 호출된 경우에는 이름만 기록 (바뀐 값은 사용자 입력이 아님)
+        outermost = not getattr(_local, "in_run", False) and not getattr(_local, "callback_depth", 0)
+        step = session.get(_STEP_KEY)
+        if step is None: step = session[_STEP_KEY] = {}
+        if outermost: _merge_step(step, _take_changes(session))
+        step.setdefault("cb", []).append([name, *args])
+        _local.callback_depth = getattr(_local, "callback_depth", 0) + 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.callback_depth -= 1
+            if outermost: _take_changes(session)
+    return wrapper
+
+@contextmanager
+def recording(session_state, scope="app", active=True):
+    """
+    한 번의 실행(app.py 전체, 또는 fragment 부분 재실행)을 기록합니다.
+    st.rerun()/st.stop()으로 중간에 끝나도 기록하며, 그 경우 "x"에 예외 이름을 남깁니다.
+    """
+    if not active or not session_state.get(RECORD_ENABLED_KEY) or getattr(_local, "in_run", False):
+        yield
+        return
+    step = session_state.pop(_STEP_KEY, None) or {}
+    _merge_step(step, _take_changes(session_state))
+    clicks = [key for key in BUTTON_KEYS if session_state.get(key) is True]
+    if clicks: step["click"] = clicks
+    session_state[_STEP_KEY] = step # 실행 중 호출되는 콜백(파생값 계산 등)도 이 단계에 기록
+    _local.in_run = True
+    started = time.perf_counter()
+    interrupted = None
+    try:
+        yield
+    except BaseException as e:
+        interrupted = type(e).__name__
+        raise
+    finally:
+        _local.in_run = False
+        session_state.pop(_STEP_KEY, None)
+        _take_changes(session_state) # 실행 중 바뀐 값은 다음 실행의 기준
+        index = session_state[_STEP_INDEX_KEY] = session_state.get(_STEP_INDEX_KEY, 0) + 1
+        record = {"i": index, "t": round(time.time() - session_state.get(_STARTED_KEY, time.time()), 3), "s": scope,
+                  "ms": round((time.perf_counter() - started) * 1000, 1), **step}
+        if interrupted: record["x"] = interrupted
+        _append(session_state[RECORD_PATH_KEY], record)
+
+def load_recording(path):
+    """기록 파일을 (머리 정보 dict, 실행 기록 목록)으로 읽습니다."""
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    header = lines[0] if lines and "v" in lines[0] else {}
+    return header, [line for line in lines if "i" in line]
+
+def _stop_from_widget():
+    set_enabled(st.session_state, False)
+
+def render_status(session_state):
+    """기록 중인 세션에서만 사이드바에 기록 상태를 표시합니다."""
+    if not session_state.get(RECORD_ENABLED_KEY): return
+    with st.sidebar.expander("⏺️ 세션 기록 중", expanded=False):
+        st.caption(f"기록한 실행: {session_state.get(_STEP_INDEX_KEY, 0)}회 · 파일: {session_state.get(RECORD_PATH_KEY)}")
+        st.button("기록 중지", key="_record_stop_button", on_click=_stop_from_widget)
@@ -3,6 +3,7 @@ import streamlit as st
 from datetime import datetime, date
 import pytz
 import json
+from collections.abc import Mapping
 
 # Import necessary custom modules
 try:
@@ -22,144 +23,142 @@ except Exception as e:
     MOVE_TYPE_OPTIONS = ["가정 이사 🏠", "사무실 이사 🏢"]
     st.warning(f"data.py에서 이사 유형 로딩 중 오류 발생: {e}. 기본값을 사용합니다.")
 
-STATE_KEYS_TO_SAVE = [
-    "base_move_type", "is_storage_move", "storage_type", "apply_long_distance",
-    "customer_name", "customer_phone", "customer_email",
-    "from_location", "to_location", "moving_date", "arrival_date",
-    "from_floor", "from_method", "to_floor", "to_method", "special_notes",
-    "storage_duration", "storage_use_electricity",
-    "long_distance_selector", "vehicle_select_radio",
-    "manual_vehicle_select_value", "final_selected_vehicle", "sky_hours_from",
-    "sky_hours_final",
-    "add_men", "add_women",
-    "has_waste_check", "waste_tons_input",
-    "date_opt_0_widget", "date_opt_1_widget", "date_opt_2_widget",
-    "date_opt_3_widget", "date_opt_4_widget",
-    "tab3_deposit_amount",
-    "tab3_adjustment_amount",
-    "tab3_regional_ladder_surcharge",
-    "tab3_date_opt_0_widget", "tab3_date_opt_1_widget", "tab3_date_opt_2_widget",
-    "tab3_date_opt_3_widget", "tab3_date_opt_4_widget",
-    "remove_base_housewife", # 기본 여성 인원 제외
-    "issue_tax_invoice",   # 세금계산서 발행
-    "card_payment",        # 카드 결제
-    "prev_final_selected_vehicle",
-    "dispatched_1t", "dispatched_2_5t", "dispatched_3_5t", "dispatched_5t",
-    "has_via_point", "via_point_location", "via_point_method", "via_point_surcharge",
-    "uploaded_image_paths",
-]
+# --- 세션 상태 스키마 ---
+# 필드마다 타입(kind), 기본값, 최솟값, 저장 여부를 한 곳에서 정의합니다.
+# 초기화/저장/불러오기는 모두 이 정의에서 미리 만든 변환 함수(coerce)를 사용합니다.
+#   kind: "str"/"any"(None만 기본값으로), "int", "float", "bool", "list", "date"
+#   save: 견적 파일에 저장하고 불러오는 필드 (STATE_KEYS_TO_SAVE)
+#   always_save: 기본값과 같아도 항상 저장하는 필드 (save 포함) — 가격/금액에 영향을 주는 값과 날짜.
+#                기본값이 나중에 바뀌어도 이미 저장한 견적의 금액이 달라지지 않도록 합니다.
+#   saved_as: 화면 입력값을 다른 키로 저장하는 경우 (견적 화면의 tab3_ 접두사 키)
+_TRUE_STRINGS = frozenset(["true", "yes", "1", "on"])
+_INIT_COERCED_KINDS = frozenset(["int", "float", "bool", "list"]) # 세션 초기화 때 값 변환까지 하는 타입
 
-def initialize_session_state(update_basket_callback=None):
-    try: kst = pytz.timezone("Asia/Seoul"); default_date = datetime.now(kst).date()
-    except Exception: default_date = datetime.now().date()
-
-    defaults = {
-        "base_move_type": MOVE_TYPE_OPTIONS[0] if MOVE_TYPE_OPTIONS else "가정 이사 🏠",
-        "is_storage_move": False,
-        "storage_type": data.DEFAULT_STORAGE_TYPE if hasattr(data, 'DEFAULT_STORAGE_TYPE') else "컨테이너 보관 📦",
-        "apply_long_distance": False, "customer_name": "", "customer_phone": "",
-        "customer_email": "",
-        "from_location": "", "to_location": "", "moving_date": default_date,
-        "arrival_date": default_date,
-        "from_floor": "",
-        "from_method": data.METHOD_OPTIONS[0] if hasattr(data, 'METHOD_OPTIONS') and data.METHOD_OPTIONS else "사다리차 🪜",
-        "to_floor": "",
-        "to_method": data.METHOD_OPTIONS[0] if hasattr(data, 'METHOD_OPTIONS') and data.METHOD_OPTIONS else "사다리차 🪜",
-        "special_notes": "", "storage_duration": 1,
-        "storage_use_electricity": False,
-        "long_distance_selector": data.long_distance_options[0] if hasattr(data, 'long_distance_options') and data.long_distance_options else "선택 안 함",
-        "vehicle_select_radio": "자동 추천 차량 사용",
-        "manual_vehicle_select_value": None,
-        "final_selected_vehicle": None,
-        "recommended_vehicle_auto": None,
-        "sky_hours_from": 1, "sky_hours_final": 1,
-        "add_men": 0, "add_women": 0, "has_waste_check": False, "waste_tons_input": 0.5,
-        "date_opt_0_widget": False, "date_opt_1_widget": False, "date_opt_2_widget": False,
-        "date_opt_3_widget": False, "date_opt_4_widget": False,
-        "tab3_date_opt_0_widget": False, "tab3_date_opt_1_widget": False, "tab3_date_opt_2_widget": False,
-        "tab3_date_opt_3_widget": False, "tab3_date_opt_4_widget": False,
-        "total_volume": 0.0, "total_weight": 0.0,
-        'pdf_data_customer': None, 'final_excel_data': None,
-        "deposit_amount": 0,
-        "adjustment_amount": 0,
-        "regional_ladder_surcharge": 0,
-        "via_point_surcharge": 0,
-        "tab3_deposit_amount": 0,
-        "tab3_adjustment_amount": 0,
-        "tab3_regional_ladder_surcharge": 0,
-        "remove_base_housewife": False,
-        "issue_tax_invoice": False,
-        "card_payment": False,
-        "prev_final_selected_vehicle": None,
-        "dispatched_1t": 0, "dispatched_2_5t": 0, "dispatched_3_5t": 0, "dispatched_5t": 0,
-        "gdrive_search_term": "", "gdrive_search_results": [],
-        "gdrive_file_options_map": {}, "gdrive_selected_filename": None,
-        "gdrive_selected_file_id": None,
-        "base_move_type_widget_tab1": MOVE_TYPE_OPTIONS[0] if MOVE_TYPE_OPTIONS else "가정 이사 🏠",
-        "base_move_type_widget_tab3": MOVE_TYPE_OPTIONS[0] if MOVE_TYPE_OPTIONS else "가정 이사 🏠",
-        "has_via_point": False,
-        "via_point_location": "",
-        "via_point_method": data.METHOD_OPTIONS[0] if hasattr(data, 'METHOD_OPTIONS') and data.METHOD_OPTIONS else "사다리차 🪜",
-        "uploaded_image_paths": [],
-        "_app_initialized": True
-    }
-    for key, value in defaults.items():
-        if key not in st.session_state:
-            st.session_state[key] = value
-
-    if st.session_state.base_move_type_widget_tab1 != st.session_state.base_move_type: st.session_state.base_move_type_widget_tab1 = st.session_state.base_move_type
-    if st.session_state.base_move_type_widget_tab3 != st.session_state.base_move_type: st.session_state.base_move_type_widget_tab3 = st.session_state.base_move_type
-
-    int_keys = ["storage_duration", "sky_hours_from", "sky_hours_final", "add_men", "add_women",
-                "deposit_amount", "adjustment_amount", "regional_ladder_surcharge",
-                "via_point_surcharge",
-                "tab3_deposit_amount", "tab3_adjustment_amount", "tab3_regional_ladder_surcharge",
-                "dispatched_1t", "dispatched_2_5t", "dispatched_3_5t", "dispatched_5t"]
-    float_keys = ["waste_tons_input"]
-    allow_negative_keys = ["adjustment_amount", "tab3_adjustment_amount"]
-    bool_keys = ["is_storage_move", "apply_long_distance", "has_waste_check",
-                 "remove_base_housewife", "issue_tax_invoice", "card_payment",
-                 "storage_use_electricity",
-                 "date_opt_0_widget", "date_opt_1_widget", "date_opt_2_widget", "date_opt_3_widget", "date_opt_4_widget",
-                 "tab3_date_opt_0_widget", "tab3_date_opt_1_widget", "tab3_date_opt_2_widget",
-                 "tab3_date_opt_3_widget", "tab3_date_opt_4_widget",
-                 "has_via_point"]
-    list_keys = ["uploaded_image_paths"]
-
-    for k in int_keys + float_keys + bool_keys + list_keys:
-        default_val_k = defaults.get(k)
-        if k not in st.session_state: st.session_state[k] = default_val_k
-
-        try:
-            val = st.session_state.get(k)
-            if val is None: st.session_state[k] = default_val_k; continue
-
-            if k in bool_keys:
-                 if isinstance(val, str): st.session_state[k] = val.lower() in ["true", "yes", "1", "on"]
-                 else: st.session_state[k] = bool(val)
-            elif k in int_keys:
-                 if isinstance(val, str) and val.strip() == "": st.session_state[k] = default_val_k; continue
-                 converted_val = int(val)
-                 if k in allow_negative_keys: st.session_state[k] = converted_val
-                 else: st.session_state[k] = max(0, converted_val)
-                 if k == "storage_duration": st.session_state[k] = max(1, st.session_state[k])
-            elif k in float_keys:
-                 if isinstance(val, str) and val.strip() == "": st.session_state[k] = default_val_k; continue
-                 converted_val = float(val)
-                 st.session_state[k] = max(0.0, converted_val)
-            elif k in list_keys:
-                if not isinstance(val, list): st.session_state[k] = default_val_k
-        except (ValueError, TypeError): st.session_state[k] = default_val_k
-        except KeyError: # Should not happen if defaults are comprehensive
-             if k in int_keys: st.session_state[k] = defaults.get(k, 0)
-             elif k in float_keys: st.session_state[k] = defaults.get(k, 0.0)
-             elif k in bool_keys: st.session_state[k] = defaults.get(k, False)
-             elif k in list_keys: st.session_state[k] = defaults.get(k, [])
+def _today_kst():
+    try: return datetime.now(pytz.timezone("Asia/Seoul")).date()
+    except Exception: return datetime.now().date()
 
-    # Ensure all item quantity keys are initialized
-    global STATE_KEYS_TO_SAVE # Make sure we are using the global one
-    processed_init_keys = set()
-    item_keys_to_save = [] # This will hold dynamically generated item keys
+def _compile_coercer(field):
+    """필드 정의로 값 변환 함수를 만듭니다. None은 기본값, 변환할 수 없는 값은 ValueError/TypeError."""
+    get_default, min_value = field.get_default, field.min_value
+    if field.kind in ("int", "float"):
+        cast = int if field.kind == "int" else float
+        def coerce(value):
+            if value is None or (isinstance(value, str) and value.strip() == ""): return get_default()
+            converted = cast(value)
+            return converted if min_value is None else max(min_value, converted)
+    elif field.kind == "bool":
+        def coerce(value):
+            if value is None: return get_default()
+            return value.lower() in _TRUE_STRINGS if isinstance(value, str) else bool(value)
+    elif field.kind == "list":
+        def coerce(value):
+            return value if isinstance(value, list) else get_default()
+    elif field.kind == "date":
+        def coerce(value):
+            if isinstance(value, str): return datetime.fromisoformat(value).date()
+            return value if isinstance(value, date) else get_default()
+    else:
+        def coerce(value):
+            return get_default() if value is None else value
+    return coerce
+
+class StateField:
+    """세션 상태 필드 정의. default가 호출 가능한 값이면 매번 새로 만듭니다 (날짜, 리스트 등)."""
+    __slots__ = ("key", "kind", "default", "min_value", "save", "always_save", "saved_as", "coerce")
+
+    def __init__(self, key, kind, default=None, min_value=None, save=False, always_save=False, saved_as=None):
+        self.key, self.kind, self.default, self.min_value = key, kind, default, min_value
+        self.save, self.always_save, self.saved_as = save or always_save, always_save, saved_as
+        self.coerce = _compile_coercer(self)
+
+    def get_default(self):
+        return self.default() if callable(self.default) else self.default
+
+    def coerce_or_default(self, value):
+        try: return self.coerce(value)
+        except (ValueError, TypeError): return self.get_default()
+
+_DEFAULT_MOVE_TYPE = MOVE_TYPE_OPTIONS[0] if MOVE_TYPE_OPTIONS else "가정 이사 🏠"
+_DEFAULT_METHOD = data.METHOD_OPTIONS[0] if getattr(data, "METHOD_OPTIONS", None) else "사다리차 🪜"
+_DEFAULT_STORAGE_TYPE = getattr(data, "DEFAULT_STORAGE_TYPE", "컨테이너 보관 📦")
+_DEFAULT_LONG_DISTANCE = data.long_distance_options[0] if getattr(data, "long_distance_options", None) else "선택 안 함"
+
+STATE_SCHEMA = (
+    # 저장 대상 (견적 파일)
+    StateField("base_move_type", "str", _DEFAULT_MOVE_TYPE, always_save=True),
+    StateField("is_storage_move", "bool", False, always_save=True),
+    StateField("storage_type", "str", _DEFAULT_STORAGE_TYPE, always_save=True),
+    StateField("apply_long_distance", "bool", False, always_save=True),
+    StateField("customer_name", "str", "", save=True),
+    StateField("customer_phone", "str", "", save=True),
+    StateField("customer_email", "str", "", save=True),
+    StateField("from_location", "str", "", save=True),
+    StateField("to_location", "str", "", save=True),
+    StateField("moving_date", "date", _today_kst, always_save=True),
+    StateField("arrival_date", "date", _today_kst, always_save=True),
+    StateField("from_floor", "str", "", always_save=True),
+    StateField("from_method", "str", _DEFAULT_METHOD, always_save=True),
+    StateField("to_floor", "str", "", always_save=True),
+    StateField("to_method", "str", _DEFAULT_METHOD, always_save=True),
+    StateField("special_notes", "str", "", save=True),
+    StateField("storage_duration", "int", 1, min_value=1, always_save=True),
+    StateField("storage_use_electricity", "bool", False, always_save=True),
+    StateField("long_distance_selector", "str", _DEFAULT_LONG_DISTANCE, always_save=True),
+    StateField("vehicle_select_radio", "str", "자동 추천 차량 사용", always_save=True),
+    StateField("manual_vehicle_select_value", "any", None, always_save=True),
+    StateField("final_selected_vehicle", "any", None, always_save=True),
+    StateField("sky_hours_from", "int", 1, min_value=0, always_save=True),
+    StateField("sky_hours_final", "int", 1, min_value=0, always_save=True),
+    StateField("add_men", "int", 0, min_value=0, always_save=True),
+    StateField("add_women", "int", 0, min_value=0, always_save=True),
+    StateField("has_waste_check", "bool", False, always_save=True),
+    StateField("waste_tons_input", "float", 0.5, min_value=0.0, always_save=True),
+    StateField("tab3_deposit_amount", "int", 0, min_value=0, always_save=True),
+    StateField("tab3_adjustment_amount", "int", 0, always_save=True), # 할인(음수) 허용
+    StateField("tab3_regional_ladder_surcharge", "int", 0, min_value=0, always_save=True),
+    *(StateField(f"tab3_date_opt_{i}_widget", "bool", False, always_save=True) for i in range(5)),
+    StateField("remove_base_housewife", "bool", False, always_save=True), # 기본 여성 인원 제외
+    StateField("issue_tax_invoice", "bool", False, always_save=True),     # 세금계산서 발행
+    StateField("card_payment", "bool", False, always_save=True),          # 카드 결제
+    StateField("prev_final_selected_vehicle", "any", None, save=True),
+    *(StateField(f"dispatched_{size}", "int", 0, min_value=0, save=True) for size in ("1t", "2_5t", "3_5t", "5t")),
+    StateField("has_via_point", "bool", False, always_save=True),
+    StateField("via_point_location", "str", "", save=True),
+    StateField("via_point_method", "str", _DEFAULT_METHOD, always_save=True),
+    StateField("via_point_surcharge", "int", 0, min_value=0, always_save=True),
+    StateField("uploaded_image_paths", "list", list, save=True),
+    # 견적 화면 입력값 (tab3_ 키로 저장)
+    *(StateField(f"date_opt_{i}_widget", "bool", False, saved_as=f"tab3_date_opt_{i}_widget") for i in range(5)),
+    StateField("deposit_amount", "int", 0, min_value=0, saved_as="tab3_deposit_amount"),
+    StateField("adjustment_amount", "int", 0, saved_as="tab3_adjustment_amount"), # 할인(음수) 허용
+    StateField("regional_ladder_surcharge", "int", 0, min_value=0, saved_as="tab3_regional_ladder_surcharge"),
+    # 세션 전용 (저장하지 않음)
+    StateField("recommended_vehicle_auto", "any", None),
+    StateField("recommended_fleet_auto", "any", None),
+    StateField("total_volume", "any", 0.0),
+    StateField("total_weight", "any", 0.0),
+    StateField("pdf_data_customer", "any", None),
+    StateField("final_excel_data", "any", None),
+    StateField("gdrive_search_term", "str", ""),
+    StateField("gdrive_search_results", "any", list),
+    StateField("gdrive_file_options_map", "any", dict),
+    StateField("gdrive_selected_filename", "any", None),
+    StateField("gdrive_selected_file_id", "any", None),
+    StateField("base_move_type_widget_tab1", "str", _DEFAULT_MOVE_TYPE),
+    StateField("base_move_type_widget_tab3", "str", _DEFAULT_MOVE_TYPE),
+    StateField("item_batch_entry_mode", "bool", False), # 품목 탭 일괄 입력 (폼, '수량 적용'을 눌러야 반영)
+    StateField("_app_initialized", "any", True),
+)
+STATE_FIELDS = {field.key: field for field in STATE_SCHEMA}
+_SAVED_FIELDS = tuple(field for field in STATE_SCHEMA if field.save)
+_INIT_COERCED_FIELDS = tuple(field for field in STATE_SCHEMA if field.kind in _INIT_COERCED_KINDS)
+_ITEM_QTY_FIELD = StateField(None, "int", 0, min_value=0) # 품목 수량 키(qty_...) 공통 정의
+
+# --- 키 목록 (모듈을 가져올 때 한 번만 계산, 이후 변경하지 않음) ---
+def _build_item_quantity_keys():
+    """품목 수량 위젯 키 목록 (qty_{이사유형}_{섹션}_{품목}, 폐기 품목 제외)."""
+    keys = []
     if hasattr(data, "item_definitions") and data.item_definitions:
         for move_type, sections in data.item_definitions.items():
             if isinstance(sections, dict):
@@ -168,162 +167,199 @@ def initialize_session_state(update_basket_callback=None):
                     if isinstance(item_list, list):
                         for item in item_list:
                             if hasattr(data, "items") and item in data.items: # Check if item is valid
-                                key = f"qty_{move_type}_{section}_{item}"
-                                item_keys_to_save.append(key)
-                                if key not in st.session_state and key not in processed_init_keys:
-                                    st.session_state[key] = 0 # Default to 0
-                                processed_init_keys.add(key)
-    # Add dynamically generated item keys to STATE_KEYS_TO_SAVE if they are not already there
-    # This step ensures that when saving state, these dynamic keys are included.
-    for item_key in item_keys_to_save:
-        if item_key not in STATE_KEYS_TO_SAVE:
-            STATE_KEYS_TO_SAVE.append(item_key)
+                                keys.append(f"qty_{move_type}_{section}_{item}")
+    return tuple(dict.fromkeys(keys))
+
+ITEM_QTY_KEYS = _build_item_quantity_keys()
+ITEM_QTY_KEY_SET = frozenset(ITEM_QTY_KEYS)
+SAVED_FIELD_KEYS = tuple(field.key for field in _SAVED_FIELDS) # 품목 수량 키 제외
+STATE_KEYS_TO_SAVE = SAVED_FIELD_KEYS + ITEM_QTY_KEYS
+STATE_KEY_SET_TO_SAVE = frozenset(STATE_KEYS_TO_SAVE)
+
+# --- 견적 스냅샷 ---
+# 저장 대상 키 외에 계산/PDF/Excel이 읽는 화면 전용 입력값과 파생값
+QUOTE_STATE_EXTRA_KEYS = [
+    "deposit_amount", "adjustment_amount", "regional_ladder_surcharge",
+    "date_opt_0_widget", "date_opt_1_widget", "date_opt_2_widget", "date_opt_3_widget", "date_opt_4_widget",
+    "total_volume", "total_weight", "recommended_vehicle_auto", "recommended_fleet_auto",
+]
+QUOTE_STATE_FIELDS = tuple(dict.fromkeys(SAVED_FIELD_KEYS + tuple(QUOTE_STATE_EXTRA_KEYS))) # 품목 수량(qty_) 키 제외
+_QUOTE_STATE_FIELD_SET = frozenset(QUOTE_STATE_FIELDS)
+_UNSET = object()
+
+class QuoteState(Mapping):
+    """
+    견적 한 건의 읽기 전용 스냅샷. st.session_state.to_dict() 대신 계산/PDF/Excel 생성에 넘깁니다.
+    QUOTE_STATE_FIELDS는 슬롯에, 품목 수량(qty_...) 키는 별도 딕셔너리에 담습니다.
+    원본에 없던 키는 dict와 마찬가지로 없는 키로 취급합니다. (값은 얕은 복사)
+    """
+    __slots__ = QUOTE_STATE_FIELDS + ("_item_quantities",)
+
+    @classmethod
+    def from_mapping(cls, source):
+        snapshot = cls.__new__(cls)
+        for key in QUOTE_STATE_FIELDS:
+            value = source.get(key, _UNSET)
+            if value is not _UNSET: object.__setattr__(snapshot, key, value)
+        object.__setattr__(snapshot, "_item_quantities",
+                           {key: source[key] for key in source.keys() if isinstance(key, str) and key.startswith("qty_")})
+        return snapshot
+
+    def __setattr__(self, key, value):
+        raise AttributeError("QuoteState는 읽기 전용입니다.")
+
+    def get(self, key, default=None):
+        if key in _QUOTE_STATE_FIELD_SET: return getattr(self, key, default)
+        return self._item_quantities.get(key, default)
+
+    def __getitem__(self, key):
+        value = self.get(key, _UNSET)
+        if value is _UNSET: raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _UNSET) is not _UNSET
+
+    def __iter__(self):
+        for key in QUOTE_STATE_FIELDS:
+            if hasattr(self, key): yield key
+        yield from self._item_quantities
+
+    def __len__(self):
+        return sum(1 for key in QUOTE_STATE_FIELDS if hasattr(self, key)) + len(self._item_quantities)
+
+    def __repr__(self):
+        return f"QuoteState({self.get('customer_name')!r}, {self.get('final_selected_vehicle')!r}, fields={len(self)})"
+
+    def to_dict(self):
+        return dict(self.items())
 
+def get_quote_state_snapshot():
+    """현재 세션의 견적 스냅샷 (QuoteState)."""
+    return QuoteState.from_mapping(st.session_state)
 
-    if "prev_final_selected_vehicle" not in st.session_state: st.session_state["prev_final_selected_vehicle"] = st.session_state.get("final_selected_vehicle")
+# 견적 화면의 일부 입력값은 저장 파일에 tab3_ 접두사 키로 저장됩니다. {화면 키: (저장 키, 기본값)}
+SAVED_UI_KEY_MAP = {field.key: (field.saved_as, field.default) for field in STATE_SCHEMA if field.saved_as}
+
+# --- 견적 저장 형식 ---
+# v2: always_save 필드는 항상, 나머지는 기본값과 다른 값만 저장하고, 품목 수량은 0이 아닌 것만
+#     "item_quantities"에 {키: 수량}으로 저장합니다.
+# 형식 버전 키가 없는 파일은 모든 키를 저장하던 기존(v1) 형식으로 읽습니다.
+SAVE_FORMAT_KEY = "_format_version"
+SAVE_FORMAT_VERSION = 2
+SPARSE_ITEMS_KEY = "item_quantities"
+
+def compact_saved_state(full_state):
+    """v1 형식 저장 데이터(prepare_state_for_save(compact=False))를 v2 형식으로 줄입니다."""
+    compact = {SAVE_FORMAT_KEY: SAVE_FORMAT_VERSION}
+    for field in _SAVED_FIELDS:
+        key = field.key
+        if key in full_state and (field.always_save or full_state[key] != field.get_default()):
+            compact[key] = full_state[key]
+    item_quantities = {key: full_state[key] for key in ITEM_QTY_KEYS if full_state.get(key)}
+    if item_quantities: compact[SPARSE_ITEMS_KEY] = item_quantities
+    return compact
+
+def is_sparse_saved_state(loaded_data):
+    return loaded_data.get(SAVE_FORMAT_KEY) is not None
+
+def expand_saved_state(loaded_data):
+    """저장 데이터를 v1 형식(모든 저장 키가 있는 dict)으로 펼칩니다. v1 데이터는 그대로 반환합니다."""
+    if not is_sparse_saved_state(loaded_data): return loaded_data
+    expanded = {field.key: field.get_default() for field in _SAVED_FIELDS}
+    expanded.update(dict.fromkeys(ITEM_QTY_KEYS, 0))
+    expanded.update((key, value) for key, value in loaded_data.items() if key not in (SAVE_FORMAT_KEY, SPARSE_ITEMS_KEY))
+    item_quantities = loaded_data.get(SPARSE_ITEMS_KEY)
+    if isinstance(item_quantities, dict): expanded.update(item_quantities)
+    return expanded
+
+def build_pricing_state_from_saved(loaded_data):
+    """저장된 견적 데이터(dict, v1/v2)를 가격 계산에 쓰는 state 형태로 바꿉니다. (세션 상태는 건드리지 않음)"""
+    loaded_data = expand_saved_state(loaded_data)
+    state = dict(loaded_data)
+    for ui_key, (saved_key, default) in SAVED_UI_KEY_MAP.items():
+        state[ui_key] = loaded_data.get(saved_key, default)
+    return state
+
+def initialize_session_state(update_basket_callback=None):
+    session = st.session_state
+    for field in STATE_SCHEMA:
+        if field.key not in session:
+            session[field.key] = field.get_default()
+
+    if session.base_move_type_widget_tab1 != session.base_move_type: session.base_move_type_widget_tab1 = session.base_move_type
+    if session.base_move_type_widget_tab3 != session.base_move_type: session.base_move_type_widget_tab3 = session.base_move_type
+
+    for field in _INIT_COERCED_FIELDS:
+        session[field.key] = field.coerce_or_default(session.get(field.key))
+
+    # Ensure all item quantity keys are initialized
+    for key in ITEM_QTY_KEYS:
+        if key not in session:
+            session[key] = 0 # Default to 0
+
+    if "prev_final_selected_vehicle" not in session: session["prev_final_selected_vehicle"] = session.get("final_selected_vehicle")
 
     if callable(update_basket_callback):
         update_basket_callback()
 
+def _serialize_for_save(value):
+    if isinstance(value, date): return value.isoformat()
+    if isinstance(value, (str, int, float, bool, list, dict)) or value is None: return value
+    return str(value) # 그 밖의 타입은 문자열로 저장
 
-def prepare_state_for_save():
+def serialize_state_for_save(source, compact=True):
+    """
+    source(세션 상태 또는 Mapping)에서 저장 데이터를 만듭니다. 세션 상태는 바꾸지 않습니다.
+    compact=True면 v2(기본값 생략, 품목 수량 희소) 형식, False면 모든 키를 담은 v1 형식.
+    """
+    # STATE_KEYS_TO_SAVE는 품목 수량 키까지 포함한 고정 튜플
     state_to_save = {}
-    keys_to_exclude = {
-        "_app_initialized", "base_move_type_widget_tab1", "base_move_type_widget_tab3",
-        "gdrive_selected_filename_widget", "pdf_data_customer", "final_excel_data",
-        "gdrive_search_results", "gdrive_file_options_map",
-        # UI-specific input fields that are mapped to tab3_ counterparts for saving
-        "deposit_amount", "adjustment_amount", "regional_ladder_surcharge",
-        # via_point_surcharge is directly saved via STATE_KEYS_TO_SAVE
-        "date_opt_0_widget", "date_opt_1_widget", "date_opt_2_widget",
-        "date_opt_3_widget", "date_opt_4_widget",
-    }
-    # Ensure mapping from UI keys to saveable keys
-    st.session_state.tab3_deposit_amount = st.session_state.get("deposit_amount", 0)
-    st.session_state.tab3_adjustment_amount = st.session_state.get("adjustment_amount", 0)
-    st.session_state.tab3_regional_ladder_surcharge = st.session_state.get("regional_ladder_surcharge", 0)
-    for i in range(5):
-        st.session_state[f"tab3_date_opt_{i}_widget"] = st.session_state.get(f"date_opt_{i}_widget", False)
-
-    # Use the global STATE_KEYS_TO_SAVE which now includes dynamic item keys
-    actual_keys_to_save = [key for key in STATE_KEYS_TO_SAVE if key not in keys_to_exclude]
-
-    for key in actual_keys_to_save:
-        if key in st.session_state:
-            value = st.session_state[key]
-            if isinstance(value, date):
-                try: state_to_save[key] = value.isoformat()
-                except Exception: print(f"Warning: Could not serialize date key '{key}' for saving.")
-            elif isinstance(value, (str, int, float, bool, list, dict)) or value is None:
-                 state_to_save[key] = value
-            else: # Attempt to convert other types to string, log if problematic
-                 try: state_to_save[key] = str(value)
-                 except Exception: print(f"Warning: Skipping non-serializable key '{key}' of type {type(value)} during save.")
+    for key in STATE_KEYS_TO_SAVE:
+        if key in source:
+            try: state_to_save[key] = _serialize_for_save(source[key])
+            except Exception: print(f"Warning: Skipping non-serializable key '{key}' during save.")
+    # 화면 입력값은 tab3_ 키로 저장
+    for ui_key, (saved_key, default) in SAVED_UI_KEY_MAP.items():
+        state_to_save[saved_key] = _serialize_for_save(source.get(ui_key, default))
     # Ensure uploaded_image_paths is always a list, even if empty
-    if "uploaded_image_paths" not in state_to_save or not isinstance(state_to_save.get("uploaded_image_paths"), list):
-        state_to_save["uploaded_image_paths"] = st.session_state.get("uploaded_image_paths", [])
-    return state_to_save
+    if not isinstance(state_to_save.get("uploaded_image_paths"), list):
+        state_to_save["uploaded_image_paths"] = source.get("uploaded_image_paths", [])
+    return compact_saved_state(state_to_save) if compact else state_to_save
+
+def prepare_state_for_save(compact=True):
+    """저장할 견적 데이터 (serialize_state_for_save 참고). 화면 입력값을 tab3_ 키에도 동기화합니다."""
+    session = st.session_state
+    # Ensure mapping from UI keys to saveable keys
+    for ui_key, (saved_key, default) in SAVED_UI_KEY_MAP.items():
+        session[saved_key] = session.get(ui_key, default)
+    return serialize_state_for_save(session, compact)
 
 def load_state_from_data(loaded_data, update_basket_callback):
     if not isinstance(loaded_data, dict):
         st.error("잘못된 형식의 파일입니다 (딕셔셔리가 아님).")
         return False
 
-    try: kst = pytz.timezone("Asia/Seoul"); default_date = datetime.now(kst).date()
-    except Exception: default_date = datetime.now().date()
-    current_move_type_options = globals().get("MOVE_TYPE_OPTIONS")
-    
-    # Re-initialize defaults here to ensure all keys are covered, especially dynamic ones
-    # This defaults_for_recovery should mirror the structure in initialize_session_state
-    defaults_for_recovery = {
-        "base_move_type": current_move_type_options[0] if current_move_type_options else "가정 이사 🏠",
-        "is_storage_move": False, "storage_type": data.DEFAULT_STORAGE_TYPE if hasattr(data, "DEFAULT_STORAGE_TYPE") else "컨테이너 보관 📦",
-        "apply_long_distance": False, "customer_name": "", "customer_phone": "", "customer_email": "",
-        "from_location": "", "to_location": "", "moving_date": default_date, "arrival_date": default_date,
-        "from_floor": "", "from_method": data.METHOD_OPTIONS[0] if hasattr(data, "METHOD_OPTIONS") else "사다리차 🪜",
-        "to_floor": "", "to_method": data.METHOD_OPTIONS[0] if hasattr(data, "METHOD_OPTIONS") else "사다리차 🪜",
-        "special_notes": "", "storage_duration": 1, "storage_use_electricity": False,
-        "long_distance_selector": data.long_distance_options[0] if hasattr(data, "long_distance_options") else "선택 안 함",
-        "vehicle_select_radio": "자동 추천 차량 사용", "manual_vehicle_select_value": None,
-        "final_selected_vehicle": None, "prev_final_selected_vehicle": None,
-        "sky_hours_from": 1, "sky_hours_final": 1, "add_men": 0, "add_women": 0,
-        "has_waste_check": False, "waste_tons_input": 0.5,
-        "tab3_date_opt_0_widget": False, "tab3_date_opt_1_widget": False, "tab3_date_opt_2_widget": False,
-        "tab3_date_opt_3_widget": False, "tab3_date_opt_4_widget": False,
-        "tab3_deposit_amount": 0, "tab3_adjustment_amount": 0, "tab3_regional_ladder_surcharge": 0,
-        "remove_base_housewife": False, "issue_tax_invoice": False, "card_payment": False,
-        "dispatched_1t": 0, "dispatched_2_5t": 0, "dispatched_3_5t": 0, "dispatched_5t": 0,
-        "has_via_point": False, "via_point_location": "",
-        "via_point_method": data.METHOD_OPTIONS[0] if hasattr(data, "METHOD_OPTIONS") else "사다리차 🪜",
-        "via_point_surcharge": 0, "uploaded_image_paths": [],
-    }
-    # Add dynamic item keys to defaults_for_recovery
-    if hasattr(data, "item_definitions") and data.item_definitions:
-        for move_type, sections in data.item_definitions.items():
-            if isinstance(sections, dict):
-                for section, item_list in sections.items():
-                    if section == "폐기 처리 품목 🗑️": continue
-                    if isinstance(item_list, list):
-                        for item in item_list:
-                            if hasattr(data, "items") and item in data.items:
-                                key = f"qty_{move_type}_{section}_{item}"
-                                if key not in defaults_for_recovery: defaults_for_recovery[key] = 0
-    
-    # Define type groups again for loading
-    int_keys_load = [k for k,v in defaults_for_recovery.items() if isinstance(v, int) and not isinstance(v, bool)] # Exclude bools which are ints
-    float_keys_load = [k for k,v in defaults_for_recovery.items() if isinstance(v, float)]
-    bool_keys_load = [k for k,v in defaults_for_recovery.items() if isinstance(v, bool)]
-    list_keys_load = [k for k,v in defaults_for_recovery.items() if isinstance(v, list)]
-    allow_negative_keys_load = ["tab3_adjustment_amount"] # Assuming this is the only one that can be negative int
-
-    # Iterate over all keys expected (from defaults_for_recovery as it's more comprehensive now)
-    for key in defaults_for_recovery.keys():
-        if key in loaded_data:
-            value = loaded_data[key]
-            try:
-                target_value = None
-                if key in ["moving_date", "arrival_date"]:
-                    if isinstance(value, str): target_value = datetime.fromisoformat(value).date()
-                    elif isinstance(value, date): target_value = value
-                    else: target_value = defaults_for_recovery.get(key, default_date)
-                elif key in int_keys_load: # Covers qty_ keys as well
-                    if isinstance(value, str) and value.strip() == "": target_value = defaults_for_recovery.get(key, 0)
-                    else: target_value = int(value)
-                    if key not in allow_negative_keys_load: target_value = max(0, target_value)
-                    if key == "storage_duration": target_value = max(1, target_value)
-                elif key in float_keys_load:
-                    if isinstance(value, str) and value.strip() == "": target_value = defaults_for_recovery.get(key, 0.0)
-                    else: target_value = float(value)
-                    target_value = max(0.0, target_value)
-                elif key in bool_keys_load:
-                    if isinstance(value, str): target_value = value.lower() in ["true", "yes", "1", "on"]
-                    else: target_value = bool(value)
-                elif key in list_keys_load: 
-                    target_value = value if isinstance(value, list) else defaults_for_recovery.get(key, [])
-                else: # For other types like string, directly assign or use default
-                    target_value = value if value is not None else defaults_for_recovery.get(key, "")
-                st.session_state[key] = target_value
-            except (ValueError, TypeError):
-                st.session_state[key] = defaults_for_recovery.get(key) # Fallback to default on error
-        else: # Key not in loaded_data, set to default
-            st.session_state[key] = defaults_for_recovery.get(key)
+    # 저장 대상 필드와 품목 수량 키를 한 번씩만 훑으며 스키마의 변환 함수로 값을 채웁니다 (없는 키는 기본값)
+    # v2 형식은 생략된 키가 곧 기본값이고, 품목 수량은 SPARSE_ITEMS_KEY 안에 있습니다.
+    session = st.session_state
+    item_quantities = (loaded_data.get(SPARSE_ITEMS_KEY) or {}) if is_sparse_saved_state(loaded_data) else loaded_data
+    if not isinstance(item_quantities, dict): item_quantities = {}
+    for field in _SAVED_FIELDS:
+        key = field.key
+        session[key] = field.coerce_or_default(loaded_data[key]) if key in loaded_data else field.get_default()
+    for key in ITEM_QTY_KEYS:
+        session[key] = _ITEM_QTY_FIELD.coerce_or_default(item_quantities[key]) if key in item_quantities else 0
 
     # Sync UI-specific keys from loaded 'tab3_' counterparts
-    st.session_state.deposit_amount = st.session_state.get("tab3_deposit_amount", 0)
-    st.session_state.adjustment_amount = st.session_state.get("tab3_adjustment_amount", 0)
-    st.session_state.regional_ladder_surcharge = st.session_state.get("tab3_regional_ladder_surcharge", 0)
-    for i in range(5):
-        st.session_state[f"date_opt_{i}_widget"] = st.session_state.get(f"tab3_date_opt_{i}_widget", False)
+    for ui_key, (saved_key, default) in SAVED_UI_KEY_MAP.items():
+        session[ui_key] = session.get(saved_key, default)
 
     # Sync base_move_type with tab-specific widgets
-    if "base_move_type" in st.session_state:
-        st.session_state.base_move_type_widget_tab1 = st.session_state.base_move_type
-        st.session_state.base_move_type_widget_tab3 = st.session_state.base_move_type
-
-    # Ensure uploaded_image_paths is correctly initialized as a list
-    if "uploaded_image_paths" not in st.session_state or not isinstance(st.session_state.uploaded_image_paths, list):
-        st.session_state.uploaded_image_paths = []
+    if "base_move_type" in session:
+        session.base_move_type_widget_tab1 = session.base_move_type
+        session.base_move_type_widget_tab3 = session.base_move_type
 
     if callable(update_basket_callback):
         update_basket_callback()
-    return True
\ No newline at end of file
+    return True
@@ -12,13 +12,14 @@ import re # re 모듈 임포트 (직접 사용할 경우 대비)
 try:
     import data
     import utils # utils 모듈 임포트
-    import google_drive_helper as gdrive
+    # google_drive_helper(googleapiclient)는 Drive 검색/불러오기/저장을 처음 쓸 때 불러옵니다 (첫 화면 로딩 시간 단축)
     from state_manager import (
         MOVE_TYPE_OPTIONS,
         prepare_state_for_save,
         load_state_from_data
     )
     import callbacks
+    import perf_monitor
 except ImportError as ie:
     st.error(f"UI Tab 1: 필수 모듈 로딩 실패 - {ie}")
     if hasattr(ie, 'name') and ie.name:
@@ -29,6 +30,23 @@ except Exception as e:
     traceback.print_exc()
     st.stop()
 
+try:
+    import session_journal # 로컬 작업 기록 복구 (선택 기능)
+except Exception as e_journal:
+    print(f"WARNING [ui_tab1]: 세션 저널 사용 불가 - {e_journal}")
+    session_journal = None
+
+try:
+    import autosave # Drive 자동 저장 (선택 기능)
+except Exception as e_autosave:
+    print(f"WARNING [ui_tab1]: 자동 저장 사용 불가 - {e_autosave}")
+    autosave = None
+
+AUTOSAVE_STATUS_LABELS = {
+    "pending": "⏳ 자동 저장 대기 중", "saving": "⏳ 자동 저장 중",
+    "saved": "✅ 자동 저장됨", "unchanged": "✅ 변경 없음", "error": "⚠️ 자동 저장 실패",
+}
+
 try:
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     UPLOAD_DIR = os.path.join(BASE_DIR, "uploads", "images")
@@ -59,9 +77,11 @@ def render_tab1():
     # 또는 별도의 최상위 키로 GOOGLE_DRIVE_FOLDER_ID를 사용할 경우:
     # if not gdrive_folder_id_from_secrets:
     #     gdrive_folder_id_from_secrets = st.secrets.get("GOOGLE_DRIVE_FOLDER_ID")
+    # 견적 파일 저장 인코딩 (secrets의 quote_save_encoding: "json"(기본) / "gzip" / "msgpack"). 불러오기는 형식과 무관
+    quote_save_encoding = utils.resolve_save_encoding(st.secrets.get("quote_save_encoding", "json"))
 
 
-    with st.container(border=True): # Google Drive Section
+    with st.container(border=True), perf_monitor.section("tab1.drive"): # Google Drive Section
         st.subheader("☁️ Google Drive 연동")
         if gdrive_folder_id_from_secrets:
             st.caption(f"Google Drive의 지정된 폴더에 견적 파일을 저장하고 불러옵니다.")
@@ -80,17 +100,18 @@ def render_tab1():
                 st.session_state.gdrive_selected_filename = None
                 search_term_strip = search_term.strip()
                 if search_term_strip:
+                    import google_drive_helper as gdrive # Drive 기능을 처음 쓸 때 불러옴
                     with st.spinner("🔄 Google Drive에서 JSON 검색 중..."):
                         all_gdrive_results = gdrive.find_files_by_name_contains(
                             search_term_strip,
-                            mime_types="application/json",
+                            mime_types=[mime for _ext, mime in utils.QUOTE_FILE_ENCODINGS.values()],
                             folder_id=gdrive_folder_id_from_secrets # 폴더 ID 전달
                         )
                     processed_results = []
                     if all_gdrive_results:
                         if len(search_term_strip) == 4 and search_term_strip.isdigit():
                             for r_item in all_gdrive_results:
-                                file_name_stem = os.path.splitext(r_item['name'])[0]
+                                file_name_stem = utils.strip_quote_file_extension(r_item['name'])
                                 if file_name_stem.endswith(search_term_strip):
                                     processed_results.append(r_item)
                         else: # 전체 번호 검색 또는 기타 검색어
@@ -142,10 +163,12 @@ def render_tab1():
                 json_file_id = st.session_state.get('gdrive_selected_file_id')
                 selected_filename_display = st.session_state.get('gdrive_selected_filename', '선택된 파일')
                 if json_file_id:
+                    import google_drive_helper as gdrive # Drive 기능을 처음 쓸 때 불러옴
                     with st.spinner(f"🔄 '{selected_filename_display}' 로딩 중..."):
                         loaded_content = gdrive.load_json_file(json_file_id)
                     if loaded_content:
-                        update_basket_callback_ref = getattr(callbacks, 'update_basket_quantities', lambda: None)
+                        # 불러온 수량 기준으로 부피/무게 전체 재계산 후 바구니 갱신 (handle_quote_loaded → handle_item_update)
+                        update_basket_callback_ref = getattr(callbacks, 'handle_quote_loaded', lambda: None)
                         if 'uploaded_image_paths' not in loaded_content or \
                            not isinstance(loaded_content.get('uploaded_image_paths'), list):
                             loaded_content['uploaded_image_paths'] = []
@@ -158,15 +181,52 @@ def render_tab1():
                     else: st.error(f"❌ '{selected_filename_display}' 파일 로딩 또는 JSON 파싱 실패.")
                 else: st.warning("⚠️ 불러올 파일을 선택해주세요.")
 
+            # 로컬 작업 기록에서 복구 (Drive 저장 전에 세션이 끊긴 경우, Drive 조회 없음)
+            if session_journal is not None:
+                st.markdown("**작업 기록 복구**")
+                restore_phone = st.text_input("전화번호", key="journal_restore_phone_tab1",
+                                              help="이 서버에 자동 기록된 해당 번호의 마지막 작업 상태를 불러옵니다.")
+                if st.button("♻️ 마지막 작업 복구", key="journal_restore_btn_tab1"):
+                    snapshot = None
+                    try: snapshot = session_journal.latest_snapshot(restore_phone)
+                    except Exception as e_restore:
+                        st.error(f"❌ 작업 기록 조회 실패: {e_restore}")
+                        snapshot = False
+                    if snapshot:
+                        journal_payload, recorded_at = snapshot
+                        update_basket_callback_ref = getattr(callbacks, 'handle_quote_loaded', lambda: None)
+                        if load_state_from_data(journal_payload, update_basket_callback_ref):
+                            st.session_state.image_uploader_key_counter += 1
+                            recorded_time_str = datetime.fromtimestamp(recorded_at, pytz.timezone("Asia/Seoul")).strftime("%m-%d %H:%M")
+                            st.success(f"✅ {recorded_time_str} 작업 상태를 복구했습니다.")
+                            st.rerun()
+                        else: st.error("❌ 작업 기록 형식 오류로 복구 실패.")
+                    elif snapshot is None:
+                        st.warning("⚠️ 해당 번호의 작업 기록이 없습니다." if restore_phone.strip() else "⚠️ 전화번호를 입력하세요.")
+
         with col_save:
             st.markdown("**현재 견적 저장**")
+            if autosave is not None:
+                st.checkbox("🔄 자동 저장 (입력이 바뀌면 잠시 뒤 Google Drive에 저장)", key=autosave.AUTOSAVE_ENABLED_KEY)
+                if st.session_state.get(autosave.AUTOSAVE_ENABLED_KEY):
+                    autosave_file_name = autosave.quote_file_name_for_session(st.session_state, quote_save_encoding)
+                    autosave_status = autosave.get_status(autosave_file_name) if autosave_file_name else None
+                    if not autosave_file_name:
+                        st.caption("유효한 고객 전화번호를 입력하면 자동 저장이 시작됩니다.")
+                    elif autosave_status:
+                        status_time_str = datetime.fromtimestamp(autosave_status["updated_at"], pytz.timezone("Asia/Seoul")).strftime("%H:%M:%S")
+                        status_label = AUTOSAVE_STATUS_LABELS.get(autosave_status["state"], autosave_status["state"])
+                        status_error = f" ({autosave_status['error']})" if autosave_status.get("error") else ""
+                        st.caption(f"{status_label} · `{autosave_file_name}` · {status_time_str}{status_error}")
+                    else:
+                        st.caption(f"`{autosave_file_name}` 자동 저장 준비됨")
             with st.form(key="save_quote_form_tab1"):
                 raw_phone_for_display = st.session_state.get('customer_phone', '').strip()
                 example_sanitized_phone = utils.sanitize_phone_number(raw_phone_for_display)
-                example_json_fname = f"{example_sanitized_phone}.json" if example_sanitized_phone else "전화번호입력후생성.json"
+                example_json_fname = utils.quote_file_name(example_sanitized_phone or "전화번호입력후생성", quote_save_encoding)
                 st.caption(f"JSON 파일명 예시: `{example_json_fname}` (같은 번호로 저장 시 덮어쓰기)")
 
-                submitted = st.form_submit_button("💾 Google Drive에 저장")
+                submitted = st.form_submit_button("💾 Google Drive에 저장", key="save_quote_submit_tab1")
                 if submitted:
                     raw_customer_phone = st.session_state.get('customer_phone', '').strip()
                     sanitized_customer_phone = utils.sanitize_phone_number(raw_customer_phone)
@@ -177,21 +237,20 @@ def render_tab1():
                     if not sanitized_customer_phone or not sanitized_customer_phone.isdigit() or len(sanitized_customer_phone) < 9: # 국내 유효번호 최소길이 등 고려
                         st.error("⚠️ 저장 실패: 유효한 고객 전화번호를 입력해주세요 (예: 01012345678 또는 021234567).")
                     else:
-                        json_filename = f"{sanitized_customer_phone}.json"
-                        state_data_to_save = prepare_state_for_save() # st.session_state.customer_phone이 이미 정규화됨
-                        
-                        if 'uploaded_image_paths' not in state_data_to_save or \
-                           not isinstance(state_data_to_save.get('uploaded_image_paths'), list):
-                             state_data_to_save['uploaded_image_paths'] = st.session_state.get('uploaded_image_paths', [])
+                        json_filename = utils.quote_file_name(sanitized_customer_phone, quote_save_encoding)
+                        state_data_to_save = prepare_state_for_save() # st.session_state.customer_phone이 이미 정규화됨 (v2 압축 형식)
                         try:
+                            import google_drive_helper as gdrive # Drive 기능을 처음 쓸 때 불러옴
                             with st.spinner(f"🔄 '{json_filename}' 저장 중..."):
                                 save_json_result = gdrive.save_json_file(
                                     json_filename,
                                     state_data_to_save,
-                                    folder_id=gdrive_folder_id_from_secrets # 폴더 ID 전달
+                                    folder_id=gdrive_folder_id_from_secrets, # 폴더 ID 전달
+                                    encoding=quote_save_encoding
                                 )
                             if save_json_result and save_json_result.get('id'):
                                 st.success(f"✅ '{json_filename}' 저장 완료.")
+                                if autosave is not None: autosave.mark_saved(json_filename, state_data_to_save)
                             else: st.error(f"❌ '{json_filename}' 저장 실패.")
                         except Exception as save_err:
                             st.error(f"❌ '{json_filename}' 저장 중 예외 발생: {save_err}")
@@ -241,7 +300,9 @@ def render_tab1():
         method_options_to = data.METHOD_OPTIONS if hasattr(data,'METHOD_OPTIONS') else []
         st.selectbox("🛠️ 도착지 작업 방법", method_options_to, key="to_method")
 
-    with st.container(border=True):
+    perf_monitor.checkpoint("tab1.customer_info")
+
+    with st.container(border=True), perf_monitor.section("tab1.payment_options"):
         st.subheader("💳 결제 관련 옵션")
         col_pay_opt_tab1_1, col_pay_opt_tab1_2 = st.columns(2)
         with col_pay_opt_tab1_1:
@@ -344,6 +405,7 @@ def render_tab1():
     kst_time_str = utils.get_current_kst_time_str() if hasattr(utils, 'get_current_kst_time_str') else ''
     st.caption(f"⏱️ 견적 생성일: {kst_time_str}")
     st.divider()
+    perf_monitor.checkpoint("tab1.images")
 
     if st.session_state.get('has_via_point'):
         with st.container(border=True):
@@ -374,5 +436,6 @@ def render_tab1():
     with st.container(border=True):
         st.header("🗒️ 고객 요구사항")
         st.text_area("기타 특이사항이나 요청사항을 입력해주세요.", height=100, key="special_notes")
+    perf_monitor.checkpoint("tab1.extra_info")
 
-# --- End of render_tab1 function ---
\ No newline at end of file
+# --- End of render_tab1 function ---
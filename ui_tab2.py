@@ -1,11 +1,15 @@
 # ui_tab2.py
 import streamlit as st
 import math
+import contextlib
 
 # Import necessary custom modules
 try:
     import data
+    import calculations
     import callbacks # Import the callbacks module
+    import perf_monitor
+    import session_recorder
 except ImportError as e:
     st.error(f"UI Tab 2: 필수 모듈 로딩 실패 - {e}")
     st.stop()
@@ -19,75 +23,119 @@ def render_tab2():
 
     st.header("📋 이사 품목 선택 ")
     st.caption(f"현재 선택된 기본 이사 유형: **{st.session_state.get("base_move_type", "N/A")}**")
-
+    _render_item_entry_fragment()
+
+# 비용 탭에도 보이는 값의 마지막 표시 상태 (품목 입력 fragment만 다시 실행될 때 비교용)
+CROSS_TAB_SIGNATURE_KEY = "_tab2_cross_tab_signature"
+
+def _cross_tab_signature():
+    """비용 탭에 보이는 값: 최종/추천 차량, 바구니 수량, 실제 투입 차량 대수."""
+    session = st.session_state
+    catalog = calculations.get_item_catalog(session.get("base_move_type")) or {}
+    keys = tuple(catalog.get("basket_keys", ())) + tuple((getattr(data, "DISPATCH_VEHICLE_KEYS", None) or {}).values())
+    return (session.get("final_selected_vehicle"), session.get("recommended_vehicle_auto")) + tuple(session.get(key) for key in keys)
+
+@callbacks.as_fragment
+def _render_item_entry_fragment():
+    """품목 수량 입력 + 예상 물량. 이 안의 입력이 바뀌면 이 부분만 다시 실행됩니다."""
+    fragment_rerun = callbacks.is_fragment_rerun("tab2_items")
+    with session_recorder.recording(st.session_state, scope="fragment:tab2_items", active=fragment_rerun):
+        if fragment_rerun:
+            # 부분 재실행에서는 app.py를 거치지 않으므로 여기서 파생값을 계산하고,
+            # 비용 탭에 보이는 값(차량/바구니 등)이 바뀌었으면 전체를 다시 실행합니다.
+            perf_monitor.begin_run(st.session_state, scope="fragment:tab2_items")
+            callbacks.ensure_derived_state()
+            perf_monitor.checkpoint("tab2.derived_state")
+            if _cross_tab_signature() != st.session_state.get(CROSS_TAB_SIGNATURE_KEY):
+                st.rerun()
+        _render_item_entry()
+        st.session_state[CROSS_TAB_SIGNATURE_KEY] = _cross_tab_signature()
+        if fragment_rerun:
+            callbacks.persist_session_state()
+            perf_monitor.checkpoint("tab2.persist")
+            perf_monitor.end_run(st.session_state)
+
+def _render_item_entry():
     # --- Item Quantity Inputs ---
-    with st.container(border=True):
+    with st.container(border=True), perf_monitor.section("tab2.item_grid"):
         st.subheader("품목별 수량 입력")
         current_move_type = st.session_state.get("base_move_type")
         if not current_move_type:
             st.warning("이사 유형이 선택되지 않았습니다.")
             return # Stop rendering if no move type
 
-        # Ensure callbacks.handle_item_update is available
-        handle_item_update_callback = getattr(callbacks, "handle_item_update", None)
-        if not callable(handle_item_update_callback):
-            st.error("오류: 실시간 업데이트 콜백 함수(handle_item_update)를 찾을 수 없습니다. callbacks.py를 확인하세요.")
+        # 수량 변경은 표시만 하고(mark_items_dirty), 부피/무게/추천 차량/바구니는
+        # 다음 실행 시작 시 callbacks.ensure_derived_state에서 한 번만 계산합니다.
+        mark_items_dirty_callback = getattr(callbacks, "mark_items_dirty", None)
+        if not callable(mark_items_dirty_callback):
+            st.error("오류: 품목 변경 콜백 함수(mark_items_dirty)를 찾을 수 없습니다. callbacks.py를 확인하세요.")
             # Optionally, disable on_change or stop if critical
             # return
 
+        # 일괄 입력: 폼 안에서 여러 품목을 입력한 뒤 '수량 적용'을 누를 때 한 번만 다시 계산
+        batch_entry = st.checkbox("일괄 입력 (여러 품목을 입력한 뒤 '수량 적용'을 눌러 한 번에 계산)", key="item_batch_entry_mode")
+        if batch_entry:
+            st.caption("⚠️ 일괄 입력 중에는 '✅ 수량 적용'을 누르기 전까지 입력한 수량이 물량/추천 차량/견적에 반영되지 않습니다.")
+        item_input_area = st.form("item_entry_form_tab2", border=False) if batch_entry else contextlib.nullcontext()
+
         item_category_to_display = data.item_definitions.get(current_move_type, {})
         basket_section_name_check = "포장 자재 📦" # Used to identify the basket section
 
-        for section, item_list in item_category_to_display.items():
-            if section == "폐기 처리 품목 🗑️": continue # Skip waste section
-
-            valid_items_in_section = [item for item in item_list if hasattr(data, "items") and data.items is not None and item in data.items]
-            if not valid_items_in_section: continue
-
-            expander_label = f"{section} 품목 선택"
-            expanded_default = section == basket_section_name_check
-
-            with st.expander(expander_label, expanded=expanded_default):
-                if section == basket_section_name_check:
-                    selected_truck_tab2 = st.session_state.get("final_selected_vehicle")
-                    if selected_truck_tab2 and hasattr(data, "default_basket_quantities") and data.default_basket_quantities is not None and selected_truck_tab2 in data.default_basket_quantities:
-                        defaults = data.default_basket_quantities[selected_truck_tab2]
-                        basket_qty = defaults.get("바구니", 0)
-                        med_box_qty = defaults.get("중박스", defaults.get("중자바구니", 0))
-                        book_qty = defaults.get("책바구니", 0)
-                        st.info(f"💡 **{selected_truck_tab2}** 추천 기본값: 바구니 {basket_qty}개, 중박스 {med_box_qty}개, 책바구니 {book_qty}개 (현재 값이며, 직접 수정 가능합니다)")
-                    else:
-                        st.info("💡 비용 탭에서 차량 선택 시 추천 기본 바구니 개수가 여기에 표시됩니다.")
-
-                num_columns = 2
-                cols = st.columns(num_columns)
-                num_items = len(valid_items_in_section)
-                items_per_col = math.ceil(num_items / len(cols)) if num_items > 0 and len(cols) > 0 else 1
-
-                for idx, item in enumerate(valid_items_in_section):
-                    col_index = idx // items_per_col if items_per_col > 0 else 0
-                    if col_index < len(cols):
-                        with cols[col_index]:
-                            unit = "칸" if item == "장롱" else "개"
-                            key_prefix = "qty"
-                            widget_key = f"{key_prefix}_{current_move_type}_{section}_{item}"
-
-                            if widget_key not in st.session_state:
-                                st.session_state[widget_key] = 0
-                                # print(f"Warning: Initialized missing item key in Tab 2: {widget_key}")
-
-                            st.number_input(
-                                label=f"{item}",
-                                min_value=0,
-                                step=1,
-                                key=widget_key,
-                                help=f"{item}의 수량 ({unit})",
-                                on_change=handle_item_update_callback # Connect the callback
-                            )
+        with item_input_area:
+            for section, item_list in item_category_to_display.items():
+                if section == "폐기 처리 품목 🗑️": continue # Skip waste section
+
+                valid_items_in_section = [item for item in item_list if hasattr(data, "items") and data.items is not None and item in data.items]
+                if not valid_items_in_section: continue
+
+                expander_label = f"{section} 품목 선택"
+                expanded_default = section == basket_section_name_check
+
+                with st.expander(expander_label, expanded=expanded_default):
+                    if section == basket_section_name_check:
+                        selected_truck_tab2 = st.session_state.get("final_selected_vehicle")
+                        if selected_truck_tab2 and hasattr(data, "default_basket_quantities") and data.default_basket_quantities is not None and selected_truck_tab2 in data.default_basket_quantities:
+                            defaults = data.default_basket_quantities[selected_truck_tab2]
+                            basket_qty = defaults.get("바구니", 0)
+                            med_box_qty = defaults.get("중박스", defaults.get("중자바구니", 0))
+                            book_qty = defaults.get("책바구니", 0)
+                            st.info(f"💡 **{selected_truck_tab2}** 추천 기본값: 바구니 {basket_qty}개, 중박스 {med_box_qty}개, 책바구니 {book_qty}개 (현재 값이며, 직접 수정 가능합니다)")
+                        else:
+                            st.info("💡 비용 탭에서 차량 선택 시 추천 기본 바구니 개수가 여기에 표시됩니다.")
+
+                    num_columns = 2
+                    cols = st.columns(num_columns)
+                    num_items = len(valid_items_in_section)
+                    items_per_col = math.ceil(num_items / len(cols)) if num_items > 0 and len(cols) > 0 else 1
+
+                    for idx, item in enumerate(valid_items_in_section):
+                        col_index = idx // items_per_col if items_per_col > 0 else 0
+                        if col_index < len(cols):
+                            with cols[col_index]:
+                                unit = "칸" if item == "장롱" else "개"
+                                key_prefix = "qty"
+                                widget_key = f"{key_prefix}_{current_move_type}_{section}_{item}"
+
+                                if widget_key not in st.session_state:
+                                    st.session_state[widget_key] = 0
+                                    # print(f"Warning: Initialized missing item key in Tab 2: {widget_key}")
+
+                                st.number_input(
+                                    label=f"{item}",
+                                    min_value=0,
+                                    step=1,
+                                    key=widget_key,
+                                    help=f"{item}의 수량 ({unit})",
+                                    on_change=None if batch_entry else mark_items_dirty_callback, # 폼 안에서는 on_change 불가
+                                    args=None if batch_entry else (widget_key,) # 변경된 키만 증분 계산
+                                )
+
+            if batch_entry:
+                st.form_submit_button("✅ 수량 적용", key="item_batch_submit_tab2", on_click=getattr(callbacks, "commit_item_batch", None), use_container_width=True)
 
     st.write("---")
 
-    with st.container(border=True):
+    with st.container(border=True), perf_monitor.section("tab2.item_summary"):
         st.subheader("📊 선택 품목 및 예상 물량")
         move_selection_display = {}
         processed_items_summary_move = set()
@@ -141,6 +189,10 @@ def render_tab2():
                       st.info("💡 비용계산 탭에서 차량을 최종 선택해주세요.")
             elif recommended_vehicle_display and "초과" in recommended_vehicle_display:
                  st.error(f"❌ 추천 차량: **{recommended_vehicle_display}**. 선택된 물량이 너무 많습니다. 물량을 줄이거나 더 큰 차량을 수동 선택해야 합니다.")
+                 recommended_fleet_display = st.session_state.get("recommended_fleet_auto")
+                 if recommended_fleet_display and recommended_fleet_display.get("trucks"):
+                     fleet_text = " + ".join(f"{truck} {count}대" for truck, count in recommended_fleet_display["trucks"].items())
+                     st.info(f"🚚 추천 차량 조합: **{fleet_text}** (차량 운임 합계 {recommended_fleet_display.get('total_price', 0):,.0f}원, 최대 {recommended_fleet_display.get('total_capacity', 0)}m³) - 비용 탭의 실제 투입 차량 중 직접 입력하지 않은 칸에 반영되었습니다.")
                  if final_vehicle_tab2_display:
                      st.info(f"ℹ️ 현재 비용계산 탭에서 **{final_vehicle_tab2_display}** 차량이 수동 선택되어 있습니다.")
             else:
@@ -1,6 +1,5 @@
 # ui_tab3.py (결제 옵션 UI 제거, 요약 정보 표시 수정은 유지, Excel 및 이미지 생성/다운로드 통합)
 import streamlit as st
-import pandas as pd
 import io
 import pytz
 from datetime import datetime, date
@@ -12,18 +11,12 @@ try:
     import data
     import utils
     import calculations
-    import pdf_generator # PDF 생성 및 이미지 변환에 필요
-    import excel_filler
-    import email_utils
     import callbacks
-    from state_manager import MOVE_TYPE_OPTIONS
-    import mms_utils # MMS 발송에 필요
+    import perf_monitor
+    import session_recorder
+    from state_manager import MOVE_TYPE_OPTIONS, get_quote_state_snapshot
 except ImportError as e:
     st.error(f"UI Tab 3: 필수 모듈 로딩 실패 - {e}")
-    if hasattr(e, "name"):
-        if e.name == "email_utils": st.warning("email_utils.py 로드 실패. 이메일 발송 비활성화.")
-        elif e.name == "mms_utils": st.warning("mms_utils.py 로드 실패. MMS 발송 비활성화.")
-        elif e.name == "pdf_generator": st.error("pdf_generator.py 로드 실패. PDF/이미지 생성 비활성화.")
     if "MOVE_TYPE_OPTIONS" not in globals(): MOVE_TYPE_OPTIONS = ["가정 이사 🏠", "사무실 이사 🏢"]
     if not all(module_name in globals() for module_name in ["data", "utils", "calculations", "callbacks", "state_manager"]):
         st.error("UI Tab 3: 핵심 데이터/유틸리티 모듈 로딩 실패.")
@@ -33,6 +26,16 @@ except Exception as e:
     if "MOVE_TYPE_OPTIONS" not in globals(): MOVE_TYPE_OPTIONS = ["가정 이사 🏠", "사무실 이사 🏢"]
     st.stop()
 
+# PDF(reportlab), 이미지 변환(pdf2image, Pillow), Excel(openpyxl), MMS(requests), 이메일 모듈과 pandas는
+# 버튼을 처음 누르거나 비용 표를 처음 그릴 때 불러옵니다 (첫 화면 로딩 시간 단축).
+# 버튼 표시 여부는 모듈을 불러오지 않고 설치 여부만 확인합니다. 로컬 모듈 파일만으로는 부족하므로
+# 각 모듈이 쓰는 외부 라이브러리(reportlab, openpyxl, requests 등)도 함께 확인합니다.
+_PDF_AVAILABLE = utils.module_available("pdf_generator", "reportlab")
+_IMAGE_CONVERSION_AVAILABLE = _PDF_AVAILABLE and utils.module_available("pdf2image", "PIL")
+_EXCEL_AVAILABLE = utils.module_available("excel_filler", "openpyxl")
+_MMS_AVAILABLE = utils.module_available("mms_utils", "requests")
+_EMAIL_AVAILABLE = utils.module_available("email_utils", "smtplib", "ssl")
+
 def render_tab3():
     st.header("💰 계산 및 옵션 ")
     update_basket_quantities_callback = getattr(callbacks, "update_basket_quantities", None)
@@ -63,18 +66,14 @@ def render_tab3():
     )
     st.divider()
 
-    with st.container(border=True): # 차량 선택
+    with st.container(border=True), perf_monitor.section("tab3.vehicle_select"): # 차량 선택
         st.subheader("🚚 차량 선택")
         col_v1_widget, col_v2_widget = st.columns([1, 2])
         with col_v1_widget:
             st.radio("차량 선택 방식:", ["자동 추천 차량 사용", "수동으로 차량 선택"], key="vehicle_select_radio", on_change=update_basket_quantities_callback)
         with col_v2_widget:
             current_move_type_widget = st.session_state.get('base_move_type')
-            vehicle_prices_options_widget, available_trucks_widget = {}, []
-            if current_move_type_widget and hasattr(data, 'vehicle_prices') and isinstance(data.vehicle_prices, dict):
-                vehicle_prices_options_widget = data.vehicle_prices.get(current_move_type_widget, {})
-            if vehicle_prices_options_widget and hasattr(data, 'vehicle_specs') and isinstance(data.vehicle_specs, dict):
-                available_trucks_widget = sorted([truck for truck in vehicle_prices_options_widget.keys() if truck in data.vehicle_specs], key=lambda x: data.vehicle_specs.get(x, {}).get("capacity", 0))
+            available_trucks_widget = calculations.get_available_trucks(current_move_type_widget) if current_move_type_widget else []
 
             use_auto_widget = st.session_state.get('vehicle_select_radio') == "자동 추천 차량 사용"
             recommended_vehicle_auto_from_state = st.session_state.get('recommended_vehicle_auto')
@@ -116,8 +115,25 @@ def render_tab3():
                             st.caption(f"선택차량 최대 용량: {spec_manual.get('capacity', 'N/A')}m³, {spec_manual.get('weight_capacity', 'N/A'):,}kg")
                             st.caption(f"현재 이사짐 예상: {current_total_volume:.2f}m³, {current_total_weight:.2f}kg")
     st.divider()
-
-    with st.container(border=True): # 작업 조건 및 추가 옵션
+    _render_cost_panel_fragment()
+
+@callbacks.as_fragment
+def _render_cost_panel_fragment():
+    """
+    작업 조건/추가 옵션, 수기 조정, 최종 견적 결과. 이 안의 입력이 바뀌면 이 부분만 다시 실행됩니다.
+    (이사 유형/차량 선택은 다른 탭에도 영향을 주므로 fragment 밖에 두어 전체 실행)
+    """
+    fragment_rerun = callbacks.is_fragment_rerun("tab3_cost")
+    with session_recorder.recording(st.session_state, scope="fragment:tab3_cost", active=fragment_rerun):
+        if fragment_rerun: perf_monitor.begin_run(st.session_state, scope="fragment:tab3_cost")
+        _render_cost_panel()
+        if fragment_rerun:
+            callbacks.persist_session_state()
+            perf_monitor.checkpoint("tab3.persist")
+            perf_monitor.end_run(st.session_state)
+
+def _render_cost_panel():
+    with st.container(border=True), perf_monitor.section("tab3.options"): # 작업 조건 및 추가 옵션
         st.subheader("🛠️ 작업 조건 및 추가 옵션")
         sky_from, sky_to = (st.session_state.get("from_method") == "스카이 🏗️"), (st.session_state.get("to_method") == "스카이 🏗️")
         if sky_from or sky_to:
@@ -185,7 +201,7 @@ def render_tab3():
             cols_date[i].checkbox(option, key=date_keys[i], help=f"{surcharge:,}원 할증" if surcharge > 0 else "")
     st.divider()
 
-    with st.container(border=True):
+    with st.container(border=True), perf_monitor.section("tab3.adjustments"):
         st.subheader("💰 수기 조정 및 계약금")
         cols_adj_new = st.columns(2)
         with cols_adj_new[0]:
@@ -214,7 +230,7 @@ def render_tab3():
                 m_dt, a_dt = st.session_state.get("moving_date"), st.session_state.get("arrival_date")
                 st.session_state.storage_duration = max(1, (a_dt - m_dt).days + 1) if isinstance(m_dt, date) and isinstance(a_dt, date) and a_dt >= m_dt else 1
 
-            current_state_dict = st.session_state.to_dict()
+            current_state_dict = get_quote_state_snapshot()
             if hasattr(calculations, "calculate_total_moving_cost") and callable(calculations.calculate_total_moving_cost):
                 total_cost_display, cost_items_display, personnel_info_display = calculations.calculate_total_moving_cost(current_state_dict)
                 st.session_state.update({
@@ -227,6 +243,7 @@ def render_tab3():
                 st.error("최종 비용 계산 함수 로드 실패."); has_cost_error = True
                 st.session_state.update({"calculated_cost_items_for_pdf": [], "total_cost_for_pdf": 0, "personnel_info_for_pdf": {}})
 
+            perf_monitor.checkpoint("tab3.cost_calculation")
             total_cost_num = int(total_cost_display) if isinstance(total_cost_display, (int, float)) else 0
             deposit_val = st.session_state.get("deposit_amount", 0)
             deposit_amount_num = int(deposit_val) if deposit_val is not None else 0
@@ -238,6 +255,7 @@ def render_tab3():
             st.write("")
 
             st.subheader("📊 비용 상세 내역")
+            import pandas as pd # 비용 표를 그릴 때 불러옴
             if has_cost_error:
                 err_item = next((item for item in cost_items_display if isinstance(item, (list, tuple)) and len(item)>0 and str(item[0]) == "오류"), None)
                 st.error(f"비용 계산 오류: {err_item[2] if err_item and len(err_item) > 2 else '알 수 없는 오류'}")
@@ -249,6 +267,21 @@ def render_tab3():
             else: st.info("ℹ️ 계산된 비용 항목 없음.")
             st.write("")
 
+            if not has_cost_error and hasattr(calculations, "calculate_price_matrix"):
+                with st.expander("🔍 차량·날짜 할증 조합별 견적 비교", expanded=False):
+                    try:
+                        price_matrix = calculations.calculate_price_matrix(st.session_state)
+                        combo_labels = [" + ".join(opt.split(" ")[0] for opt in combo) if combo else "할증 없음" for combo in price_matrix["date_combinations"]]
+                        matrix_rows = {vehicle: row for vehicle, row in zip(price_matrix["vehicles"], price_matrix["totals"]) if row is not None}
+                        if matrix_rows:
+                            matrix_df = pd.DataFrame.from_dict(matrix_rows, orient="index", columns=combo_labels)
+                            st.caption(f"현재 선택 조건(인원, 작업 방법, 보관, 결제 옵션 등)은 그대로 두고 차량과 날짜 할증만 바꾼 총 견적 비용입니다. (현재 차량: {final_selected_vehicle_calc})")
+                            st.dataframe(matrix_df.style.format("{:,.0f}"), use_container_width=True)
+                        else: st.info("ℹ️ 비교할 수 있는 차량이 없습니다.")
+                    except Exception as matrix_err:
+                        st.error(f"비교 견적 계산 중 오류: {matrix_err}")
+            st.write("")
+
             special_notes = st.session_state.get('special_notes')
             if special_notes and special_notes.strip(): st.subheader("📝 고객요구사항"); st.info(special_notes)
 
@@ -383,17 +416,20 @@ def render_tab3():
             else: st.info("ℹ️ 비용 계산 오류로 요약 정보 표시 불가.")
             st.divider()
 
+            perf_monitor.checkpoint("tab3.summary")
             st.subheader("📄 견적서 생성, 발송 및 다운로드")
             can_generate_anything = bool(final_selected_vehicle_calc) and not has_cost_error and st.session_state.get("calculated_cost_items_for_pdf") and st.session_state.get("total_cost_for_pdf", 0) > 0
             cols_actions_main = st.columns([1, 1, 1]); cols_actions_email = st.columns(1)
 
             with cols_actions_main[0]: # MMS
                 st.markdown("**① 이미지 견적서 (MMS)**")
-                mms_possible = (hasattr(mms_utils, "send_mms_with_image") and hasattr(pdf_generator, "generate_pdf") and hasattr(pdf_generator, "generate_quote_image_from_pdf") and can_generate_anything and st.session_state.get("customer_phone"))
+                mms_possible = (_MMS_AVAILABLE and _PDF_AVAILABLE and can_generate_anything and st.session_state.get("customer_phone"))
                 if mms_possible:
                     if st.button("🖼️ MMS 발송", key="mms_send_button_main"):
+                        import pdf_generator # 처음 쓸 때 불러옴
+                        import mms_utils
                         customer_phone_mms, customer_name_mms = st.session_state.get("customer_phone"), st.session_state.get("customer_name", "고객")
-                        pdf_args_mms = {"state_data": st.session_state.to_dict(), "calculated_cost_items": st.session_state.get("calculated_cost_items_for_pdf", []), "total_cost": st.session_state.get("total_cost_for_pdf", 0), "personnel_info": st.session_state.get("personnel_info_for_pdf", {})}
+                        pdf_args_mms = {"state_data": get_quote_state_snapshot(), "calculated_cost_items": st.session_state.get("calculated_cost_items_for_pdf", []), "total_cost": st.session_state.get("total_cost_for_pdf", 0), "personnel_info": st.session_state.get("personnel_info_for_pdf", {})}
                         with st.spinner("견적서 PDF 생성 중..."): pdf_bytes_mms = pdf_generator.generate_pdf(**pdf_args_mms)
                         if pdf_bytes_mms:
                             with st.spinner("PDF를 이미지로 변환 중..."): image_bytes_mms = pdf_generator.generate_quote_image_from_pdf(pdf_bytes_mms, poppler_path=None)
@@ -405,17 +441,18 @@ def render_tab3():
                                     else: st.error("❌ MMS 발송 실패.")
                             else: st.error("❌ 견적서 이미지 생성 실패.")
                         else: st.error("❌ 견적서 PDF 생성 실패 (MMS용).")
-                elif not (hasattr(mms_utils, "send_mms_with_image") and hasattr(pdf_generator, "generate_pdf") and hasattr(pdf_generator, "generate_quote_image_from_pdf")): st.caption("MMS/PDF/이미지 생성 모듈 오류")
+                elif not (_MMS_AVAILABLE and _PDF_AVAILABLE): st.caption("MMS/PDF/이미지 생성 모듈 오류")
                 elif not can_generate_anything: st.caption("견적 내용 확인 필요")
                 elif not st.session_state.get("customer_phone"): st.caption("고객 전화번호 필요")
                 else: st.caption("MMS 발송 불가")
 
             with cols_actions_main[1]: # PDF
                 st.markdown("**② 고객용 견적서 (PDF)**")
-                pdf_possible = hasattr(pdf_generator, "generate_pdf") and can_generate_anything
+                pdf_possible = _PDF_AVAILABLE and can_generate_anything
                 if pdf_possible:
                     if st.button("📄 PDF 생성 및 다운로드", key="pdf_customer_download_main"):
-                        pdf_args_download = {"state_data": st.session_state.to_dict(), "calculated_cost_items": st.session_state.get("calculated_cost_items_for_pdf", []), "total_cost": st.session_state.get("total_cost_for_pdf", 0), "personnel_info": st.session_state.get("personnel_info_for_pdf", {})}
+                        import pdf_generator # 처음 쓸 때 불러옴
+                        pdf_args_download = {"state_data": get_quote_state_snapshot(), "calculated_cost_items": st.session_state.get("calculated_cost_items_for_pdf", []), "total_cost": st.session_state.get("total_cost_for_pdf", 0), "personnel_info": st.session_state.get("personnel_info_for_pdf", {})}
                         with st.spinner("PDF 생성 중..."): pdf_data_cust_download = pdf_generator.generate_pdf(**pdf_args_download)
                         if pdf_data_cust_download:
                             st.session_state['pdf_data_customer_for_download'] = pdf_data_cust_download
@@ -427,7 +464,7 @@ def render_tab3():
                         fname_pdf_dl = f"견적서_{st.session_state.get('customer_name', '고객')}_{utils.get_current_kst_time_str('%y%m%d')}.pdf"
                         st.download_button(label="📥 다운로드 (PDF)", data=st.session_state['pdf_data_customer_for_download'], file_name=fname_pdf_dl, mime="application/pdf", key='dl_btn_pdf_main')
                     elif 'pdf_data_customer_for_download' not in st.session_state and pdf_possible : st.caption("생성 버튼을 눌러주세요.")
-                elif not hasattr(pdf_generator, "generate_pdf"): st.caption("PDF 생성 모듈 오류")
+                elif not _PDF_AVAILABLE: st.caption("PDF 생성 모듈 오류")
                 elif not can_generate_anything: st.caption("견적 내용 확인 필요")
                 else: st.caption("PDF 생성 불가")
 
@@ -436,9 +473,9 @@ def render_tab3():
             with cols_actions_main[2]:
                 st.markdown("**③ 견적서 파일 생성 (Excel, 이미지)**")
 
-                excel_possible = hasattr(excel_filler, "fill_final_excel_template") and bool(final_selected_vehicle_calc)
-                pdf_possible_for_image = hasattr(pdf_generator, "generate_pdf") and can_generate_anything
-                image_conversion_possible = hasattr(pdf_generator, "generate_quote_image_from_pdf") and pdf_generator._PDF2IMAGE_AVAILABLE and pdf_generator._PILLOW_AVAILABLE
+                excel_possible = _EXCEL_AVAILABLE and bool(final_selected_vehicle_calc)
+                pdf_possible_for_image = _PDF_AVAILABLE and can_generate_anything
+                image_conversion_possible = _IMAGE_CONVERSION_AVAILABLE
 
                 if st.button("📊 Excel 및 견적 이미지 생성", key="generate_excel_and_image_main"):
                     actions_success_excel = False
@@ -446,9 +483,11 @@ def render_tab3():
 
                     # 1. Excel 생성
                     if excel_possible:
-                        latest_total_cost_excel, latest_cost_items_excel, latest_personnel_info_excel = calculations.calculate_total_moving_cost(st.session_state.to_dict())
+                        import excel_filler # 처음 쓸 때 불러옴
+                        quote_state_excel = get_quote_state_snapshot()
+                        latest_total_cost_excel, latest_cost_items_excel, latest_personnel_info_excel = calculations.calculate_total_moving_cost(quote_state_excel)
                         with st.spinner("Excel 파일 생성 중..."):
-                            filled_excel_data_dl = excel_filler.fill_final_excel_template(st.session_state.to_dict(), latest_cost_items_excel, latest_total_cost_excel, latest_personnel_info_excel)
+                            filled_excel_data_dl = excel_filler.fill_final_excel_template(quote_state_excel, latest_cost_items_excel, latest_total_cost_excel, latest_personnel_info_excel)
                         if filled_excel_data_dl:
                             st.session_state['final_excel_data_for_download'] = filled_excel_data_dl
                             st.success("✅ Excel 생성 완료!")
@@ -461,9 +500,10 @@ def render_tab3():
 
                     # 2. PDF 생성 및 이미지 변환
                     if pdf_possible_for_image and image_conversion_possible:
+                        import pdf_generator # 처음 쓸 때 불러옴
                         customer_name_img = st.session_state.get("customer_name", "고객")
                         pdf_args_img = {
-                            "state_data": st.session_state.to_dict(),
+                            "state_data": get_quote_state_snapshot(),
                             "calculated_cost_items": st.session_state.get("calculated_cost_items_for_pdf", []),
                             "total_cost": st.session_state.get("total_cost_for_pdf", 0),
                             "personnel_info": st.session_state.get("personnel_info_for_pdf", {})
@@ -531,11 +571,13 @@ def render_tab3():
 
             with cols_actions_email[0]: # Email
                 st.markdown("**④ 견적서 이메일 발송 (PDF 첨부)**")
-                email_possible = (hasattr(email_utils, "send_quote_email") and hasattr(pdf_generator, "generate_pdf") and can_generate_anything and st.session_state.get("customer_email"))
+                email_possible = (_EMAIL_AVAILABLE and _PDF_AVAILABLE and can_generate_anything and st.session_state.get("customer_email"))
                 if email_possible:
                     if st.button("📧 이메일 발송", key="email_send_button_main"):
+                        import pdf_generator # 처음 쓸 때 불러옴
+                        import email_utils
                         recipient_email_send, customer_name_send = st.session_state.get("customer_email"), st.session_state.get("customer_name", "고객")
-                        pdf_args_email = {"state_data": st.session_state.to_dict(), "calculated_cost_items": st.session_state.get("calculated_cost_items_for_pdf", []), "total_cost": st.session_state.get("total_cost_for_pdf", 0), "personnel_info": st.session_state.get("personnel_info_for_pdf", {})}
+                        pdf_args_email = {"state_data": get_quote_state_snapshot(), "calculated_cost_items": st.session_state.get("calculated_cost_items_for_pdf", []), "total_cost": st.session_state.get("total_cost_for_pdf", 0), "personnel_info": st.session_state.get("personnel_info_for_pdf", {})}
                         with st.spinner("이메일 발송용 PDF 생성 중..."): pdf_email_bytes_send = pdf_generator.generate_pdf(**pdf_args_email)
                         if pdf_email_bytes_send:
                             subject_send, body_send, pdf_filename_send = f"[{customer_name_send}님] 이삿날 이사 견적서입니다.", f"{customer_name_send}님,\n\n요청하신 이사 견적서를 첨부 파일로 보내드립니다.\n\n감사합니다.\n이삿날 드림", f"견적서_{customer_name_send}_{utils.get_current_kst_time_str('%Y%m%d')}.pdf"
@@ -544,7 +586,7 @@ def render_tab3():
                             if email_sent_status: st.success(f"✅ 이메일 발송 성공!")
                             else: st.error("❌ 이메일 발송 실패.")
                         else: st.error("❌ 첨부 PDF 생성 실패 (이메일용).")
-                elif not (hasattr(email_utils, "send_quote_email") and hasattr(pdf_generator, "generate_pdf")): st.caption("이메일/PDF 생성 모듈 오류")
+                elif not (_EMAIL_AVAILABLE and _PDF_AVAILABLE): st.caption("이메일/PDF 생성 모듈 오류")
                 elif not can_generate_anything: st.caption("견적 내용 확인 필요")
                 elif not st.session_state.get("customer_email"): st.caption("고객 이메일 필요")
                 else: st.caption("이메일 발송 불가")
@@ -554,5 +596,6 @@ def render_tab3():
             traceback.print_exc()
     else: # 차량 미선택 시
         st.warning("⚠️ **차량을 먼저 선택해주세요.** 비용 계산, 요약 정보 표시 및 다운로드는 차량 선택 후 가능합니다.")
+    perf_monitor.checkpoint("tab3.actions")
 
 # --- End of render_tab3 function ---
\ No newline at end of file
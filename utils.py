@@ -1,9 +1,21 @@
 # utils.py
 
 import re
+import gzip
+import json
+import sys
+import functools
+import importlib.util
 from datetime import datetime
 import pytz # 시간대 처리를 위해 필요
 
+try:
+    import msgpack # 선택: 견적 파일을 msgpack으로 저장할 때만 필요
+    _MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    _MSGPACK_AVAILABLE = False
+
 # data 모듈 임포트 시도 (get_item_qty에서 필요)
 try:
     import data
@@ -11,6 +23,20 @@ except ImportError:
     print("Warning [utils.py]: data.py not found, get_item_qty might not work correctly.")
     data = None
 
+@functools.lru_cache(maxsize=None)
+def module_available(*names):
+    """
+    모듈을 불러오지 않고 설치 여부만 확인합니다 (importlib.util.find_spec). 이름을 여러 개 주면 모두 있어야 True.
+    PDF/Excel/Drive/MMS처럼 무거운 모듈은 기능을 처음 쓸 때 불러오고, 화면에서는 이 함수로 버튼 표시 여부만 정합니다.
+    로컬 모듈(pdf_generator 등)은 파일만 있어도 찾아지므로, 그 모듈이 쓰는 외부 라이브러리 이름도 함께 넘겨야 합니다.
+    """
+    return all(_find_module(name) for name in names)
+
+def _find_module(name):
+    if name in sys.modules: return sys.modules[name] is not None
+    try: return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError): return False
+
 def get_current_kst_time_str(format="%Y-%m-%d %H:%M"):
     """
     현재 한국 표준시(KST) 기준의 날짜와 시간을 지정된 형식의 문자열로 반환합니다.
@@ -45,6 +71,13 @@ def sanitize_phone_number(phone_str):
         return ""  # 유효하지 않은 입력이면 빈 문자열 반환
     return re.sub(r'\D', '', phone_str)
 
+MIN_QUOTE_PHONE_DIGITS = 9 # 견적 저장에 쓰는 전화번호의 최소 자릿수 (국내 유효번호 최소 길이, 수동 저장과 같은 규칙)
+
+def quote_phone_number(phone_str):
+    """견적 파일명/작업 기록 키로 쓸 전화번호 (숫자만). 자릿수가 모자라면 빈 문자열 (입력 중인 번호 등)."""
+    phone = sanitize_phone_number(phone_str)
+    return phone if len(phone) >= MIN_QUOTE_PHONE_DIGITS else ""
+
 # --- !!! get_item_qty 함수 정의 추가 !!! ---
 def get_item_qty(state_data, item_name_to_find):
     """
@@ -88,4 +121,49 @@ def get_item_qty(state_data, item_name_to_find):
     # 모든 섹션에서 못 찾았으면 0 반환
     # print(f"Warning [get_item_qty]: Item '{item_name_to_find}' not found in any section for move type '{current_move_type}'.")
     return 0
-# --- !!! 함수 추가 완료 !!! ---
\ No newline at end of file
+# --- !!! 함수 추가 완료 !!! ---
+
+# --- 견적 파일 인코딩 ---
+# {인코딩: (파일 확장자, mime type)}. 불러올 때는 확장자가 아니라 내용으로 형식을 판별합니다.
+QUOTE_FILE_ENCODINGS = {
+    "json": (".json", "application/json"),
+    "gzip": (".json.gz", "application/gzip"),
+    "msgpack": (".msgpack", "application/x-msgpack"),
+}
+_GZIP_MAGIC = b"\x1f\x8b"
+
+def resolve_save_encoding(encoding):
+    """실제로 사용할 저장 인코딩. 알 수 없는 값은 json, msgpack 패키지가 없으면 gzip."""
+    if encoding == "msgpack" and not _MSGPACK_AVAILABLE: return "gzip"
+    return encoding if encoding in QUOTE_FILE_ENCODINGS else "json"
+
+def quote_file_name(stem, encoding="json"):
+    return stem + QUOTE_FILE_ENCODINGS[resolve_save_encoding(encoding)][0]
+
+def strip_quote_file_extension(file_name):
+    """'01012345678.json.gz' -> '01012345678' (견적 파일 확장자가 아니면 마지막 확장자만 제거)."""
+    for ext, _mime in sorted(QUOTE_FILE_ENCODINGS.values(), key=lambda v: -len(v[0])):
+        if file_name.endswith(ext): return file_name[:-len(ext)]
+    return file_name.rsplit(".", 1)[0] if "." in file_name else file_name
+
+def encode_json_payload(data_dict, encoding="json"):
+    """dict를 저장용 bytes로 바꿉니다. JSON은 들여쓰기 없이 저장합니다. 반환: (bytes, mime type)."""
+    encoding = resolve_save_encoding(encoding)
+    if encoding == "msgpack":
+        payload = msgpack.packb(data_dict, use_bin_type=True)
+    else:
+        payload = json.dumps(data_dict, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if encoding == "gzip": payload = gzip.compress(payload)
+    return payload, QUOTE_FILE_ENCODINGS[encoding][1]
+
+def decode_json_payload(raw_bytes):
+    """JSON(BOM 포함)/gzip/msgpack bytes를 내용으로 판별해 읽습니다. 읽을 수 없으면 ValueError."""
+    try:
+        if raw_bytes[:2] == _GZIP_MAGIC: raw_bytes = gzip.decompress(raw_bytes)
+    except (OSError, EOFError) as e:
+        raise ValueError(f"gzip 압축 해제 실패: {e}") from e
+    first_byte = raw_bytes[0] if raw_bytes else None
+    if first_byte is not None and (0x80 <= first_byte <= 0x8f or first_byte in (0xde, 0xdf)): # msgpack map
+        if not _MSGPACK_AVAILABLE: raise ValueError("msgpack 형식 파일을 읽으려면 msgpack 패키지가 필요합니다.")
+        return msgpack.unpackb(raw_bytes, raw=False)
+    return json.loads(raw_bytes.decode("utf-8-sig"))